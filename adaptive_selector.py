@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+adaptive_selector.py
+--------------------
+Adaptive next-question selection from precomputed difficulty tables.
+
+Items of each skill are bucketed by difficulty x score band (score_band_range_cd), and
+the buckets are ordered into a ladder from easiest to hardest. A session keeps a level
+estimate on that ladder: a correct answer moves it up by step * (1 - target), a miss
+moves it down by step * target, and the step shrinks as answers come in. The estimate
+therefore settles where the student answers about `target` of questions correctly.
+Picking the next item is a lookup of the rung at round(level) plus a cursor into its
+pre-shuffled bucket, so selection cost does not grow with the bank.
+
+Usage:
+  python adaptive_selector.py ./data --export ./data/adaptive.json   # tables for the client
+  python adaptive_selector.py ./data --simulate 2000                 # convergence benchmark
+
+  from adaptive_selector import SelectionTables, AdaptiveSession
+  tables = SelectionTables.from_items(items)
+  session = AdaptiveSession(tables, "WIC")
+  uid = session.next_item(); session.record(correct=True)
+"""
+import json, math, os, random, statistics, sys, time, argparse
+from collections import defaultdict
+
+DIFFICULTY_RANK = {"E": 0, "M": 1, "H": 2}
+# Band assumed for items without score_band_range_cd
+DIFFICULTY_BAND = {"E": 2, "M": 4, "H": 6}
+
+def rung_key(x):
+  """(band, difficulty rank, label) for an item; None if neither field is usable."""
+  difficulty = x.get("difficulty") or ""
+  band = x.get("score_band_range_cd")
+  try:
+    band = int(band)
+  except (TypeError, ValueError):
+    band = DIFFICULTY_BAND.get(difficulty)
+  if band is None:
+    return None
+  return (band, DIFFICULTY_RANK.get(difficulty, 1), f"{difficulty or '?'}{band}")
+
+class SelectionTables:
+  """Per-skill buckets on a shared difficulty ladder.
+
+  ladder:  rung labels from easiest to hardest, e.g. ["E1", "E2", "E3", "M4", ...]
+  buckets: {skill: [[uId, ...] per rung]}, each bucket shuffled once with the seed
+  nearest: {skill: [rung index of the closest non-empty bucket, per rung]}"""
+
+  def __init__(self, ladder, buckets, seed=0):
+    self.ladder = ladder
+    self.buckets = buckets
+    self.seed = seed
+    self.nearest = {skill: self._nearest(rungs) for skill, rungs in buckets.items()}
+
+  @staticmethod
+  def _nearest(rungs):
+    filled = [i for i, bucket in enumerate(rungs) if bucket]
+    if not filled:
+      return [None] * len(rungs)
+    # Ties go to the easier rung
+    return [min(filled, key=lambda j: (abs(j - i), j)) for i in range(len(rungs))]
+
+  @classmethod
+  def from_items(cls, items, seed=0):
+    keyed = defaultdict(list)
+    rungs = {}
+    for x in items:
+      key = rung_key(x)
+      if key is None or not x.get("skill_cd"):
+        continue
+      rungs[key[:2]] = key[2]
+      keyed[(x["skill_cd"], key[:2])].append(x["uId"])
+    order = sorted(rungs)
+    index = {k: i for i, k in enumerate(order)}
+    buckets = {}
+    for (skill, k), ids in sorted(keyed.items(), key=lambda kv: (kv[0][0], kv[0][1])):
+      ids = sorted(ids, key=str)
+      random.Random(f"{seed}:{skill}:{rungs[k]}").shuffle(ids)
+      buckets.setdefault(skill, [[] for _ in order])[index[k]] = ids
+    return cls([rungs[k] for k in order], buckets, seed)
+
+  def to_json(self):
+    """Compact table for the client: the same ladder, buckets and nearest-rung arrays."""
+    return {"ladder": self.ladder, "seed": self.seed,
+            "skills": {skill: {"buckets": rungs, "nearest": self.nearest[skill]}
+                       for skill, rungs in sorted(self.buckets.items())}}
+
+  @classmethod
+  def from_json(cls, data):
+    return cls(data["ladder"], {skill: t["buckets"] for skill, t in data["skills"].items()}, data.get("seed", 0))
+
+class AdaptiveSession:
+  """Running level estimate for one student on one skill."""
+
+  def __init__(self, tables, skill, target=0.7, step=2.0, min_step=0.5, decay=0.85, start=None, seed=None):
+    if skill not in tables.buckets:
+      raise KeyError(f"No items for skill {skill}")
+    self.rungs = tables.buckets[skill]
+    self.nearest = tables.nearest[skill]
+    self.target = target
+    self.step = step
+    self.min_step = min_step
+    self.decay = decay
+    self.level = (len(self.rungs) - 1) / 2 if start is None else start
+    self.answered = 0
+    self.correct = 0
+    self.seen = set()
+    # Sessions start at different offsets into the shared shuffled buckets
+    rng = random.Random(seed)
+    self.cursor = [rng.randrange(len(bucket)) if bucket else 0 for bucket in self.rungs]
+    self.last_rung = None
+
+  @property
+  def accuracy(self):
+    return self.correct / self.answered if self.answered else None
+
+  def _take(self, i):
+    bucket = self.rungs[i]
+    for _ in range(len(bucket)):
+      uid = bucket[self.cursor[i] % len(bucket)]
+      self.cursor[i] += 1
+      if uid not in self.seen:
+        return uid
+    return None
+
+  def next_item(self):
+    """uId of the next question, or None once the skill is exhausted."""
+    want = min(max(int(round(self.level)), 0), len(self.rungs) - 1)
+    start = self.nearest[want]
+    if start is None:
+      return None
+    # Walk outward only when the closest bucket has been used up
+    for d in range(len(self.rungs)):
+      for i in ((start,) if d == 0 else (start - d, start + d)):
+        if 0 <= i < len(self.rungs) and self.rungs[i]:
+          uid = self._take(i)
+          if uid is not None:
+            self.seen.add(uid)
+            self.last_rung = i
+            return uid
+    return None
+
+  def record(self, correct):
+    """Update the level estimate with the answer to the last item."""
+    self.answered += 1
+    self.correct += bool(correct)
+    self.level += self.step * (1 - self.target) if correct else -self.step * self.target
+    self.level = min(max(self.level, 0.0), len(self.rungs) - 1.0)
+    self.step = max(self.min_step, self.step * self.decay)
+
+def load_items(path):
+  """Items from a prepare_data.py build dir or a single JSON chunk file."""
+  if os.path.isdir(path):
+    from prepare_data import load_chunks
+    return list(load_chunks(path))
+  with open(path, "r", encoding="utf-8") as f:
+    return json.load(f)
+
+def simulate(tables, students=1000, questions=40, target=0.7, seed=0):
+  """Simulated students with a hidden ability on the ladder answer correctly with
+  probability sigmoid(ability - rung). Returns convergence and throughput figures."""
+  rng = random.Random(seed)
+  skills = [s for s, rungs in tables.buckets.items() if sum(map(len, rungs)) >= questions]
+  if not skills:
+    raise SystemExit(f"No skill has {questions} items to simulate with")
+  offset = math.log(target / (1 - target))  # rung where P(correct) == target
+  converged_at = []
+  final_error = []
+  selections = 0
+  elapsed = 0.0
+  for n in range(students):
+    skill = rng.choice(skills)
+    top = len(tables.ladder) - 1
+    ability = rng.uniform(0, top)
+    expected = min(max(ability - offset, 0.0), top)
+    session = AdaptiveSession(tables, skill, target=target, seed=n)
+    trace = []
+    for _ in range(questions):
+      t = time.perf_counter()
+      uid = session.next_item()
+      elapsed += time.perf_counter() - t
+      if uid is None:
+        break
+      selections += 1
+      p = 1 / (1 + math.exp(session.last_rung - ability))
+      session.record(rng.random() < p)
+      trace.append(abs(session.level - expected))
+    # Converged: the estimate stays within one rung of the equilibrium from here on
+    settled = len(trace)
+    for i in range(len(trace) - 1, -1, -1):
+      if trace[i] > 1.0:
+        break
+      settled = i
+    converged_at.append(settled + 1 if settled < len(trace) else None)
+    final_error.append(trace[-1] if trace else None)
+
+  done = sorted(c for c in converged_at if c is not None)
+  pct = lambda q: done[min(len(done) - 1, int(q * len(done)))] if done else None
+  return {
+    "students": students,
+    "questions_per_student": questions,
+    "target_accuracy": target,
+    "ladder": tables.ladder,
+    "converged": len(done),
+    "questions_to_converge": {"mean": round(statistics.mean(done), 2) if done else None,
+                              "median": pct(0.5), "p90": pct(0.9)},
+    "mean_final_error_rungs": round(statistics.mean(e for e in final_error if e is not None), 3),
+    "selections": selections,
+    "selection_us": round(elapsed / max(selections, 1) * 1e6, 2),
+  }
+
+def main():
+  ap = argparse.ArgumentParser(description="Adaptive selection tables: export for the client or simulate convergence")
+  ap.add_argument("source", help="prepare_data.py build dir or a chunk JSON file")
+  ap.add_argument("--export", metavar="PATH", help="write the selection tables as JSON")
+  ap.add_argument("--simulate", type=int, metavar="STUDENTS", help="run the convergence benchmark")
+  ap.add_argument("--questions", type=int, default=40, help="questions per simulated student")
+  ap.add_argument("--target", type=float, default=0.7, help="accuracy the level estimate settles at")
+  ap.add_argument("--seed", type=int, default=0)
+  args = ap.parse_args()
+  if not args.export and not args.simulate:
+    ap.error("nothing to do: give --export and/or --simulate")
+
+  t = time.perf_counter()
+  tables = SelectionTables.from_items(load_items(args.source), seed=args.seed)
+  build_ms = (time.perf_counter() - t) * 1000
+  if args.export:
+    with open(args.export, "w", encoding="utf-8") as f:
+      json.dump(tables.to_json(), f, separators=(",",":"))
+    print(f"Wrote selection tables for {len(tables.buckets)} skills over ladder {' '.join(tables.ladder)} "
+          f"to {args.export} ({build_ms:.1f} ms to build)")
+  if args.simulate:
+    json.dump(simulate(tables, args.simulate, args.questions, args.target, args.seed), sys.stdout, indent=2)
+    print()
+
+if __name__ == "__main__":
+  main()
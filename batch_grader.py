@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+batch_grader.py
+---------------
+Scores many submitted responses at once against the answer keys of a build: MCQ items
+by choice index, grid-in items by numeric equivalence with their normalized keys.
+
+normalize() stores grid-in keys twice: answer_keys as written upstream ("2/3", ".6666",
+".6667") and numeric_keys as reduced fractions ("2/3", "3333/5000", "6667/10000").
+A response is correct when it parses to one of those exact values, so "1.5", "3/2"
+and "6/4" all match a key of 3/2.
+
+With NumPy the keys become padded integer arrays and a batch is graded with a handful
+of array comparisons. Each distinct response string is parsed only once. Without
+NumPy the same rules run in a plain Python loop.
+
+Usage:
+  python batch_grader.py ./data responses.csv --out scores.csv       # student_id,uId,response
+  python batch_grader.py ./data responses.jsonl --by-skill --json
+
+  from batch_grader import AnswerKey, grade, student_scores
+  key = AnswerKey.from_items(items)
+  marks = grade(key, uids, responses)        # 1 correct, 0 wrong, -1 not gradable
+"""
+import csv, json, os, re, sys, time, argparse
+from collections import defaultdict
+from fractions import Fraction
+
+try:
+  import numpy as np
+  NUMPY_AVAILABLE = True
+except ImportError:
+  NUMPY_AVAILABLE = False
+
+_NUMERIC = re.compile(r"[+-]?(?:\d+/\d+|\d+\.?\d*|\.\d+)")
+_LETTER = re.compile(r"[A-Za-z]")
+INT64_MAX = 2**63 - 1
+
+def parse_numeric(value):
+  """Exact value of a grid-in answer ("3/2", "1.5", ".6667", "-4", "1,200"), else None."""
+  if isinstance(value, bool) or value is None:
+    return None
+  if isinstance(value, int):
+    return Fraction(value)
+  if isinstance(value, float):
+    return Fraction(repr(value))
+  text = str(value).strip().replace("−", "-").replace(",", "").replace(" ", "")
+  if not _NUMERIC.fullmatch(text):
+    return None
+  try:
+    return Fraction(text)
+  except ZeroDivisionError:
+    return None
+
+def canonical(value):
+  return str(value.numerator) if value.denominator == 1 else f"{value.numerator}/{value.denominator}"
+
+def numeric_keys(keys):
+  """Distinct reduced-fraction forms of the numeric keys, in key order (None if none parse)."""
+  out = []
+  for k in keys:
+    value = parse_numeric(k)
+    if value is not None and canonical(value) not in out:
+      out.append(canonical(value))
+  return out or None
+
+def choice_index(value):
+  """Choice index of an MCQ response: 0-based int, digit string or letter A-Z."""
+  if isinstance(value, bool) or value is None:
+    return None
+  if isinstance(value, int):
+    return value
+  text = str(value).strip()
+  if text.isdigit():
+    return int(text)
+  if _LETTER.fullmatch(text):
+    return ord(text.upper()) - ord("A")
+  return None
+
+class AnswerKey:
+  """Per-item keys in id order: MCQ choice index (-1 if none) and numeric key fractions."""
+
+  def __init__(self, uids, mcq, numeric, skills):
+    self.uids = uids
+    self.index = {uid: i for i, uid in enumerate(uids)}
+    self.mcq = mcq
+    self.numeric = numeric        # per item: [(numerator, denominator), ...]
+    self.skills = skills
+    self._arrays = None
+
+  @classmethod
+  def from_items(cls, items):
+    uids, mcq, numeric, skills = [], [], [], []
+    for x in items:
+      uids.append(x["uId"])
+      index = x.get("correct_choice_index")
+      mcq.append(index if isinstance(index, int) else -1)
+      values = [Fraction(k) for k in x.get("numeric_keys") or []]
+      numeric.append([(v.numerator, v.denominator) for v in values
+                      if abs(v.numerator) <= INT64_MAX and v.denominator <= INT64_MAX])
+      skills.append(x.get("skill_cd") or "")
+    return cls(uids, mcq, numeric, skills)
+
+  def arrays(self):
+    """(mcq, key numerators, key denominators) with keys padded to the widest item; 0/0 pads."""
+    if self._arrays is None:
+      width = max((len(k) for k in self.numeric), default=0) or 1
+      num = np.zeros((len(self.uids) + 1, width), dtype=np.int64)
+      den = np.zeros((len(self.uids) + 1, width), dtype=np.int64)
+      for i, keys in enumerate(self.numeric):
+        for j, (n, d) in enumerate(keys):
+          num[i, j], den[i, j] = n, d
+      # Row len(uids) stays empty and absorbs responses to unknown items
+      self._arrays = (np.array(self.mcq + [-1], dtype=np.int64), num, den)
+    return self._arrays
+
+def _parsed(response):
+  value = parse_numeric(response)
+  if value is None or abs(value.numerator) > INT64_MAX or value.denominator > INT64_MAX:
+    n, d = 0, -1  # never equals a key (denominators are positive)
+  else:
+    n, d = value.numerator, value.denominator
+  choice = choice_index(response)
+  return -2 if choice is None else choice, n, d
+
+def _grade_numpy(key, uids, responses):
+  mcq, key_num, key_den = key.arrays()
+  unknown = len(key.uids)
+  item = np.fromiter((key.index.get(u, unknown) for u in uids), dtype=np.int64, count=len(uids))
+  # Parse each distinct response once, then gather
+  distinct = {}
+  codes = np.fromiter((distinct.setdefault(r, len(distinct)) for r in responses), dtype=np.int64, count=len(responses))
+  parsed = np.array([_parsed(r) for r in distinct], dtype=np.int64).reshape(-1, 3)
+  choice, num, den = parsed[codes, 0], parsed[codes, 1], parsed[codes, 2]
+
+  item_mcq = mcq[item]
+  is_mcq = item_mcq >= 0
+  has_numeric = key_den[item, 0] > 0
+  numeric_ok = ((key_num[item] == num[:, None]) & (key_den[item] == den[:, None])).any(axis=1)
+  marks = np.where(is_mcq, choice == item_mcq, numeric_ok).astype(np.int8)
+  marks[~(is_mcq | has_numeric)] = -1
+  return marks
+
+def _grade_python(key, uids, responses):
+  marks = []
+  parsed = {}
+  for uid, response in zip(uids, responses):
+    i = key.index.get(uid)
+    if i is None:
+      marks.append(-1)
+      continue
+    if response not in parsed:
+      parsed[response] = _parsed(response)
+    choice, n, d = parsed[response]
+    if key.mcq[i] >= 0:
+      marks.append(int(choice == key.mcq[i]))
+    elif key.numeric[i]:
+      marks.append(int((n, d) in key.numeric[i]))
+    else:
+      marks.append(-1)
+  return marks
+
+def grade(key, uids, responses, use_numpy=None):
+  """Mark each (uId, response) pair: 1 correct, 0 wrong, -1 unknown item or no key.
+  Returns an int8 array with NumPy, else a list."""
+  if len(uids) != len(responses):
+    raise ValueError(f"{len(uids)} item ids but {len(responses)} responses")
+  if use_numpy is None:
+    use_numpy = NUMPY_AVAILABLE
+  if use_numpy and not NUMPY_AVAILABLE:
+    raise RuntimeError("NumPy is not installed (pip install numpy)")
+  return _grade_numpy(key, uids, responses) if use_numpy else _grade_python(key, uids, responses)
+
+def student_scores(key, students, uids, marks, by_skill=False):
+  """{student: {"answered", "correct", "ungraded", "percent"[, "skills": {skill: [correct, answered]}]}}"""
+  scores = {}
+  for student, uid, mark in zip(students, uids, marks.tolist() if hasattr(marks, "tolist") else marks):
+    s = scores.get(student)
+    if s is None:
+      s = scores[student] = {"answered": 0, "correct": 0, "ungraded": 0}
+      if by_skill:
+        s["skills"] = defaultdict(lambda: [0, 0])
+    if mark < 0:
+      s["ungraded"] += 1
+      continue
+    s["answered"] += 1
+    s["correct"] += mark
+    if by_skill:
+      tally = s["skills"][key.skills[key.index[uid]]]
+      tally[0] += mark
+      tally[1] += 1
+  for s in scores.values():
+    s["percent"] = round(100 * s["correct"] / s["answered"], 1) if s["answered"] else None
+    if by_skill:
+      s["skills"] = dict(sorted(s["skills"].items()))
+  return scores
+
+def read_responses(path):
+  """(students, uids, responses) from a CSV with student_id,uId,response columns or JSON lines."""
+  students, uids, responses = [], [], []
+  with open(path, "r", encoding="utf-8", newline="") as f:
+    if path.endswith((".jsonl", ".ndjson", ".json")):
+      rows = (json.loads(line) for line in f if line.strip())
+    else:
+      rows = csv.DictReader(f)
+    for row in rows:
+      students.append(row["student_id"])
+      uids.append(row["uId"])
+      responses.append(row["response"])
+  return students, uids, responses
+
+def load_items(path):
+  """Items from a prepare_data.py build dir or a single JSON chunk file."""
+  if os.path.isdir(path):
+    from prepare_data import load_chunks
+    return list(load_chunks(path))
+  with open(path, "r", encoding="utf-8") as f:
+    return json.load(f)
+
+def main():
+  ap = argparse.ArgumentParser(description="Grade a batch of responses against a build's answer keys")
+  ap.add_argument("source", help="prepare_data.py build dir or a chunk JSON file")
+  ap.add_argument("responses", help="CSV (student_id,uId,response) or JSON lines with the same keys")
+  ap.add_argument("--out", help="write per-student scores as CSV")
+  ap.add_argument("--by-skill", action="store_true", help="include per-skill tallies")
+  ap.add_argument("--json", action="store_true", help="print per-student scores as JSON")
+  ap.add_argument("--pure-python", action="store_true", help="grade without NumPy")
+  args = ap.parse_args()
+
+  key = AnswerKey.from_items(load_items(args.source))
+  students, uids, responses = read_responses(args.responses)
+  t = time.perf_counter()
+  marks = grade(key, uids, responses, use_numpy=False if args.pure_python else None)
+  graded_s = time.perf_counter() - t
+  scores = student_scores(key, students, uids, marks, args.by_skill)
+
+  if args.out:
+    with open(args.out, "w", encoding="utf-8", newline="") as f:
+      w = csv.writer(f)
+      w.writerow(["student_id", "answered", "correct", "ungraded", "percent"])
+      for student, s in scores.items():
+        w.writerow([student, s["answered"], s["correct"], s["ungraded"], s["percent"]])
+  if args.json:
+    json.dump(scores, sys.stdout, indent=2)
+    print()
+  engine = "NumPy" if NUMPY_AVAILABLE and not args.pure_python else "pure Python"
+  print(f"Graded {len(responses)} responses from {len(scores)} students in {graded_s * 1000:.1f} ms ({engine})",
+        file=sys.stderr)
+
+if __name__ == "__main__":
+  main()
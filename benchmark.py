@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+benchmark.py
+------------
+Self-contained benchmarks for the data build and the lesson tools. Synthetic question
+banks are generated in every layout load_any accepts (JSON array, JSON object keyed by
+id, keyed entries without braces, NDJSON), and synthetic lessons with a given number
+of slides, so no server, network or real bank is needed.
+
+Timed stages:
+  bank:    load_any (per layout), normalize, write_chunks, build_lookup,
+           grade (10 responses per item; NumPy and pure Python)
+  lessons: LessonConverter json_to_text / text_to_json / json_to_word / word_to_json,
+           generate_lesson (PPTX + reveal.js HTML + PDF)
+Stages whose optional packages (python-docx, python-pptx, reportlab, numpy) are missing are
+recorded under "skipped" instead of failing the run.
+
+Usage:
+  python benchmark.py                                  # 1k/10k/100k items, 10/100/1000 slides
+  python benchmark.py --sizes 1000,10000 --slides 10,100 --repeat 5
+  python benchmark.py --out bench/new.json --compare bench/old.json
+"""
+import argparse, contextlib, io, json, os, platform, random, shutil, statistics, subprocess, sys, tempfile, time
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(REPO_ROOT, "scripts"))
+sys.path.insert(0, os.path.join(REPO_ROOT, "lesson_generator"))
+
+from batch_grader import NUMPY_AVAILABLE, AnswerKey, grade
+from prepare_data import build_lookup, load_any, normalize, write_chunks
+
+try:
+  with contextlib.redirect_stdout(io.StringIO()):
+    from lesson_converter import DOCX_AVAILABLE, LessonConverter
+  CONVERTER_AVAILABLE = True
+except (ImportError, NameError):  # the bank benchmarks must still run without it
+  CONVERTER_AVAILABLE = DOCX_AVAILABLE = False
+
+try:
+  from generate_lessons import generate_lesson
+  GENERATOR_AVAILABLE = True
+except ImportError:
+  GENERATOR_AVAILABLE = False
+
+SHAPES = ("json-array", "json-object", "keyed", "ndjson")
+
+RW_SKILLS = [("Craft and Structure", "WIC", "Words in Context"),
+             ("Information and Ideas", "CID", "Central Ideas and Details"),
+             ("Standard English Conventions", "BOU", "Boundaries"),
+             ("Expression of Ideas", "TRA", "Transitions")]
+MATH_SKILLS = [("Algebra", "H.A.", "Linear equations in one variable"),
+               ("Advanced Math", "P.C.", "Nonlinear functions"),
+               ("Geometry and Trigonometry", "S.A.", "Area and volume")]
+BANDS = {"E": (1, 2, 3), "M": (4, 5), "H": (6, 7)}
+WORDS = ("the author argues that researchers found evidence suggesting a significant pattern in "
+         "data collected across several regions while critics contend this interpretation overlooks "
+         "historical context and alternative explanations for the observed increase").split()
+
+def sentence(rng, n):
+  return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+def synthetic_raw_item(rng, i):
+  """One raw item shaped like the upstream export (R&W MCQ, math grid-in or math MCQ)."""
+  uid = f"bench-{i:07d}"
+  difficulty = rng.choice("EMH")
+  common = {"questionId": f"{i:08x}", "difficulty": difficulty,
+            "score_band_range_cd": rng.choice(BANDS[difficulty])}
+  if rng.random() < 0.6:
+    domain, code, desc = rng.choice(RW_SKILLS)
+    options = [{"id": f"{uid}-{j}", "content": f"<p>{sentence(rng, 5)}</p>"} for j in range(4)]
+    return uid, {**common, "module": "english", "primary_class_cd_desc": domain, "skill_cd": code,
+                 "skill_desc": desc,
+                 "content": {"stimulus": "<p>" + " ".join(sentence(rng, 14) for _ in range(5)) + "</p>",
+                             "stem": "<p>Which choice best states the main idea of the text?</p>",
+                             "answerOptions": options, "keys": [options[rng.randrange(4)]["id"]],
+                             "rationale": f"<p>Choice {'ABCD'[rng.randrange(4)]} is the best answer. {sentence(rng, 30)}</p>"}}
+  domain, code, desc = rng.choice(MATH_SKILLS)
+  raw = {**common, "module": "math", "primary_class_cd_desc": domain, "skill_cd": code, "skill_desc": desc}
+  a, b = rng.randint(2, 9), rng.randint(1, 40)
+  stem = f"<p>If {a}x + {b} = {a * 3 + b}, what is the value of x?</p>"
+  if rng.random() < 0.5:
+    raw["content"] = {"stem": stem, "keys": ["3", "3.0"], "rationale": f"<p>{sentence(rng, 20)}</p>"}
+  else:
+    choices = {k: {"body": f"<p>{v}</p>"} for k, v in zip("abcd", (1, 3, 5, 7))}
+    raw["content"] = {"prompt": stem, "answer": {"choices": choices, "correct_choice": "b",
+                                                 "rationale": f"<p>{sentence(rng, 20)}</p>"}}
+  return uid, raw
+
+def write_bank(path, shape, pairs):
+  with open(path, "w", encoding="utf-8") as f:
+    if shape == "json-array":
+      json.dump([{**raw, "uId": uid} for uid, raw in pairs], f)
+    elif shape == "json-object":
+      json.dump(dict(pairs), f)
+    elif shape == "keyed":
+      for uid, raw in pairs:
+        f.write(f"{json.dumps(uid)}: {json.dumps(raw)},\n")
+    else:
+      for uid, raw in pairs:
+        f.write(json.dumps({**raw, "uId": uid}) + "\n")
+
+def synthetic_lesson(slides, rng):
+  """A lesson JSON with `slides` slides cycling through the converter's slide types."""
+  types = LessonConverter().supported_slide_types
+  out = []
+  for n in range(slides):
+    slide = {"id": f"slide_{n + 1:04d}", "type": types[n % len(types)], "title": sentence(rng, 4),
+             "duration_estimate": 120,
+             "content": {"heading": sentence(rng, 5), "text": sentence(rng, 25),
+                         "bullet_points": [sentence(rng, 8) for _ in range(3)],
+                         "strategy_steps": [{"step": k + 1, "title": sentence(rng, 3), "description": sentence(rng, 10)}
+                                            for k in range(2)]}}
+    out.append(slide)
+  return {"id": f"bench_{slides}", "title": f"Benchmark lesson ({slides} slides)", "subtitle": "", "level": "",
+          "duration": "", "skill_codes": ["WIC"], "learning_objectives": [sentence(rng, 8)],
+          "success_criteria": {"mastery_threshold": 0.75}, "slides": out}
+
+def synthetic_markdown(sections, rng):
+  lines = ["# SAT Skill: Benchmark", ""]
+  for n in range(sections):
+    lines += [f"## Section {n + 1}", sentence(rng, 30), "", f"1. {sentence(rng, 8)}", f"2. {sentence(rng, 8)}",
+              "", f"- {sentence(rng, 6)}", ""]
+  return "\n".join(lines)
+
+class Runner:
+  def __init__(self, repeat, only):
+    self.repeat = repeat
+    self.only = only
+    self.results = []
+    self.skipped = []
+
+  def run(self, name, fn, setup=None, **labels):
+    """Time fn() `repeat` times (setup() runs untimed before each) and record min/median."""
+    key = " ".join([name] + [f"{k}={v}" for k, v in labels.items()])
+    if self.only and not any(o in key for o in self.only):
+      return None
+    times = []
+    value = None
+    for _ in range(self.repeat):
+      arg = setup() if setup else None
+      with contextlib.redirect_stdout(io.StringIO()):
+        t = time.perf_counter()
+        value = fn(arg) if setup else fn()
+        times.append(time.perf_counter() - t)
+    entry = {"name": name, **labels, "runs": len(times), "min_s": round(min(times), 6),
+             "median_s": round(statistics.median(times), 6)}
+    n = labels.get("items") or labels.get("slides")
+    if n:
+      entry["per_unit_us"] = round(min(times) / n * 1e6, 3)
+    self.results.append(entry)
+    print(f"  {key:<48} min {entry['min_s']*1000:10.2f} ms   median {entry['median_s']*1000:10.2f} ms")
+    return value
+
+  def skip(self, name, reason, **labels):
+    self.skipped.append({"name": name, **labels, "reason": reason})
+
+def bench_bank(runner, size, tmp, seed):
+  rng = random.Random(seed)
+  pairs = [synthetic_raw_item(rng, i) for i in range(size)]
+  raw = None
+  for shape in SHAPES:
+    path = os.path.join(tmp, f"bank-{size}.{shape}.json")
+    write_bank(path, shape, pairs)
+    loaded = runner.run("load_any", lambda: load_any(path), items=size, shape=shape,
+                        bytes=os.path.getsize(path))
+    raw = raw or loaded
+    os.remove(path)
+  if raw is None:  # load_any filtered out with --only
+    raw = [{**x, "uId": uid} for uid, x in pairs]
+  items = runner.run("normalize", lambda: [normalize(x) for x in raw], items=size)
+  if items is None:
+    items = [normalize(x) for x in raw]
+
+  def fresh_dir(_=None):
+    out = os.path.join(tmp, f"out-{size}")
+    shutil.rmtree(out, ignore_errors=True)
+    os.makedirs(os.path.join(out, "chunks"))
+    return out
+  runner.run("write_chunks", lambda out: write_chunks(items, out, 1000, {"chunks": []}), setup=fresh_dir, items=size)
+  runner.run("write_chunks", lambda out: write_chunks(items, out, 1000, {"chunks": []}, chunk_bytes=64 * 1024),
+             setup=fresh_dir, items=size, packing="gzip-64k")
+  runner.run("build_lookup", lambda: build_lookup(items), items=size)
+  shutil.rmtree(os.path.join(tmp, f"out-{size}"), ignore_errors=True)
+
+  key = AnswerKey.from_items(items)
+  picks = [rng.randrange(size) for _ in range(10 * size)]
+  uids = [items[i]["uId"] for i in picks]
+  answers = [rng.choice(("3", "3.0", "6/2", "2.5")) if items[i]["numeric_keys"] else rng.choice("ABCD") for i in picks]
+  runner.run("grade", lambda: grade(key, uids, answers, use_numpy=False), items=len(uids), engine="python")
+  if NUMPY_AVAILABLE:
+    runner.run("grade", lambda: grade(key, uids, answers, use_numpy=True), items=len(uids), engine="numpy")
+  else:
+    runner.skip("grade", "numpy not installed", items=len(uids), engine="numpy")
+
+def bench_converter(runner, slides, lesson_dir, rng):
+  converter = LessonConverter()
+  json_path = os.path.join(lesson_dir, "lesson.json")
+  with open(json_path, "w", encoding="utf-8") as f:
+    json.dump(synthetic_lesson(slides, rng), f)
+
+  txt_path = os.path.join(lesson_dir, "lesson.txt")
+  runner.run("json_to_text", lambda: converter.json_to_text(json_path, txt_path), slides=slides)
+  if os.path.exists(txt_path):
+    runner.run("text_to_json", lambda: converter.text_to_json(txt_path, os.path.join(lesson_dir, "from_text.json")),
+               slides=slides)
+  if DOCX_AVAILABLE:
+    docx_path = os.path.join(lesson_dir, "lesson.docx")
+    runner.run("json_to_word", lambda: converter.json_to_word(json_path, docx_path), slides=slides)
+    if os.path.exists(docx_path):
+      runner.run("word_to_json", lambda: converter.word_to_json(docx_path, os.path.join(lesson_dir, "from_word.json")),
+                 slides=slides)
+  else:
+    runner.skip("json_to_word", "python-docx not installed", slides=slides)
+    runner.skip("word_to_json", "python-docx not installed", slides=slides)
+
+def bench_lessons(runner, slides, tmp, seed):
+  rng = random.Random(seed)
+  lesson_dir = os.path.join(tmp, f"lesson-{slides}")
+  os.makedirs(lesson_dir, exist_ok=True)
+  if CONVERTER_AVAILABLE:
+    bench_converter(runner, slides, lesson_dir, rng)
+  else:
+    for name in ("json_to_text", "text_to_json", "json_to_word", "word_to_json"):
+      runner.skip(name, "lesson_converter could not be imported", slides=slides)
+
+  if GENERATOR_AVAILABLE:
+    md_path = os.path.join(lesson_dir, "lesson.md")
+    with open(md_path, "w", encoding="utf-8") as f:
+      f.write(synthetic_markdown(slides, rng))
+    runner.run("generate_lesson", lambda: generate_lesson(md_path), slides=slides)
+  else:
+    runner.skip("generate_lesson", "python-pptx/reportlab not installed", slides=slides)
+
+def git_commit():
+  try:
+    return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                          text=True, timeout=10).stdout.strip() or None
+  except (OSError, subprocess.SubprocessError):
+    return None
+
+def compare(current, baseline_path):
+  """Print min-time ratios against an earlier results file."""
+  with open(baseline_path, "r", encoding="utf-8") as f:
+    baseline = json.load(f)
+  key = lambda r: tuple((k, r[k]) for k in ("name", "items", "slides", "shape", "packing", "engine") if k in r)
+  before = {key(r): r for r in baseline.get("results", [])}
+  print(f"\nCompared with {baseline_path} (commit {baseline.get('meta', {}).get('commit')}):")
+  for r in current:
+    old = before.get(key(r))
+    if old and old["min_s"]:
+      ratio = r["min_s"] / old["min_s"]
+      flag = "  <-- slower" if ratio > 1.1 else ("  faster" if ratio < 0.9 else "")
+      label = " ".join(f"{v}" for _, v in key(r))
+      print(f"  {label:<40} {old['min_s']*1000:10.2f} ms -> {r['min_s']*1000:10.2f} ms  x{ratio:.2f}{flag}")
+
+def main():
+  ap = argparse.ArgumentParser(description="Benchmark the data build and lesson conversion tools")
+  ap.add_argument("--sizes", default="1000,10000,100000", help="synthetic bank sizes (comma separated)")
+  ap.add_argument("--slides", default="10,100,1000", help="synthetic lesson slide counts (comma separated)")
+  ap.add_argument("--repeat", type=int, default=3, help="timed runs per stage (min and median are reported)")
+  ap.add_argument("--only", action="append", help="run only stages whose label contains this text (repeatable)")
+  ap.add_argument("--seed", type=int, default=0)
+  ap.add_argument("--out", default="benchmark-results.json", help="results JSON path")
+  ap.add_argument("--compare", metavar="BASELINE", help="earlier results JSON to compare against")
+  args = ap.parse_args()
+
+  sizes = [int(s) for s in args.sizes.split(",") if s]
+  slide_counts = [int(s) for s in args.slides.split(",") if s]
+  runner = Runner(max(1, args.repeat), args.only)
+  tmp = tempfile.mkdtemp(prefix="satify-bench-")
+  started = time.perf_counter()
+  try:
+    for size in sizes:
+      print(f"Question bank, {size} items:")
+      bench_bank(runner, size, tmp, args.seed)
+    for slides in slide_counts:
+      print(f"Lesson, {slides} slides:")
+      bench_lessons(runner, slides, tmp, args.seed)
+  finally:
+    shutil.rmtree(tmp, ignore_errors=True)
+
+  report = {
+    "meta": {"commit": git_commit(), "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+             "python": platform.python_version(), "platform": platform.platform(),
+             "repeat": runner.repeat, "seed": args.seed, "total_s": round(time.perf_counter() - started, 3)},
+    "results": runner.results,
+    "skipped": runner.skipped,
+  }
+  os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+  with open(args.out, "w", encoding="utf-8") as f:
+    json.dump(report, f, indent=2)
+    f.write("\n")
+  for s in runner.skipped:
+    print(f"  skipped {s['name']}: {s['reason']}")
+  print(f"Wrote {len(runner.results)} results to {args.out}")
+  if args.compare:
+    compare(runner.results, args.compare)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,151 @@
+"""
+build_metrics.py
+----------------
+Per-stage metrics for prepare_data.py runs: wall and CPU time, how far each stage
+raised the process's peak RSS, items per second and bytes written under the output
+dir, with optional cProfile capture. The JSON written by --metrics-out is flat enough
+for build dashboards to ingest directly.
+
+  metrics = StageMetrics("./data", enabled=True, profile="auto")
+  with metrics.stage("normalize") as s:
+    items = [normalize(x) for x in raw]
+    s.items = len(items)
+  metrics.write("metrics.json")
+"""
+import cProfile, io, json, os, pstats, sys, time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+  import resource
+  RESOURCE_AVAILABLE = True
+except ImportError:  # Windows
+  RESOURCE_AVAILABLE = False
+
+def peak_rss_bytes():
+  """Peak resident set size of this process so far (None where unsupported)."""
+  if not RESOURCE_AVAILABLE:
+    return None
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return peak if sys.platform == "darwin" else peak * 1024  # Linux reports KiB
+
+def dir_snapshot(root):
+  """{path: (size, mtime_ns)} of every file under root."""
+  snap = {}
+  for dirpath, _, filenames in os.walk(root):
+    for name in filenames:
+      path = os.path.join(dirpath, name)
+      try:
+        st = os.stat(path)
+      except OSError:
+        continue
+      snap[path] = (st.st_size, st.st_mtime_ns)
+  return snap
+
+class Stage:
+  def __init__(self, name, items=None):
+    self.name = name
+    self.items = items
+    self.result = {}
+
+class StageMetrics:
+  """Collects one record per `with metrics.stage(name):` block.
+
+  profile=None disables cProfile, a stage name profiles just that stage, and "auto"
+  profiles every stage and keeps the statistics of the slowest one."""
+
+  def __init__(self, out_dir, enabled=True, profile=None):
+    self.out_dir = out_dir
+    self.enabled = enabled or bool(profile)
+    self.profile = profile
+    self.stages = []
+    self.profiles = {}
+    self.started = time.perf_counter()
+    self.cpu_started = time.process_time()
+    self._snapshot = None  # the previous stage's closing snapshot doubles as the next baseline
+
+  @contextmanager
+  def stage(self, name, items=None):
+    stage = Stage(name, items)
+    if not self.enabled:
+      yield stage
+      return
+    before = self._snapshot if self._snapshot is not None else dir_snapshot(self.out_dir)
+    rss_before = peak_rss_bytes()
+    profiler = cProfile.Profile() if self.profile in ("auto", name) else None
+    wall, cpu = time.perf_counter(), time.process_time()
+    if profiler:
+      profiler.enable()
+    try:
+      yield stage
+    finally:
+      if profiler:
+        profiler.disable()
+      wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+      after = self._snapshot = dir_snapshot(self.out_dir)
+      rss_after = peak_rss_bytes()
+      written = [p for p, meta in after.items() if before.get(p) != meta]
+      record = {
+        "stage": name,
+        "wall_s": round(wall, 6),
+        "cpu_s": round(cpu, 6),
+        # ru_maxrss is a process-wide high-water mark, so a stage only "owns" the amount
+        # it pushed that mark up; the cumulative value is kept under an explicit name.
+        "peak_rss_growth_bytes": rss_after - rss_before if rss_after is not None else None,
+        "process_peak_rss_bytes": rss_after,
+        "items": stage.items,
+        "items_per_s": round(stage.items / wall, 1) if stage.items and wall > 0 else None,
+        "files_written": len(written),
+        "bytes_written": sum(after[p][0] for p in written),
+        **stage.result,
+      }
+      self.stages.append(record)
+      if profiler:
+        self.profiles[name] = profiler
+
+  def hot_stage(self):
+    profiled = [s for s in self.stages if s["stage"] in self.profiles]
+    return max(profiled, key=lambda s: s["wall_s"])["stage"] if profiled else None
+
+  def profile_summary(self, name, limit=25):
+    """Top functions of a profiled stage by cumulative time, as JSON-friendly rows."""
+    stats = pstats.Stats(self.profiles[name], stream=io.StringIO())
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _) in sorted(stats.stats.items(), key=lambda kv: -kv[1][3])[:limit]:
+      rows.append({"function": f"{os.path.basename(filename)}:{line}({func})", "calls": nc,
+                   "tottime_s": round(tt, 6), "cumtime_s": round(ct, 6)})
+    return rows
+
+  def report(self):
+    hot = self.hot_stage()
+    return {
+      "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+      "argv": sys.argv[1:],
+      "total_wall_s": round(time.perf_counter() - self.started, 6),
+      "total_cpu_s": round(time.process_time() - self.cpu_started, 6),
+      "peak_rss_bytes": peak_rss_bytes(),
+      "bytes_written": sum(s["bytes_written"] for s in self.stages),
+      "stages": self.stages,
+      "profile": {"stage": hot, "top": self.profile_summary(hot)} if hot else None,
+    }
+
+  def write(self, metrics_path=None, profile_path=None):
+    """Write the JSON report and, if profiling, the hot stage's pstats dump."""
+    report = self.report()
+    if metrics_path:
+      with open(metrics_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    if profile_path and report["profile"]:
+      self.profiles[report["profile"]["stage"]].dump_stats(profile_path)
+    return report
+
+  def print_summary(self):
+    print(f"{'stage':<16}{'wall s':>10}{'cpu s':>10}{'items/s':>12}{'written':>12}{'peak RSS +':>12}")
+    for s in self.stages:
+      rate = f"{s['items_per_s']:,.0f}" if s["items_per_s"] else "-"
+      rss = f"{s['peak_rss_growth_bytes'] / 2**20:.0f} MiB" if s["peak_rss_growth_bytes"] is not None else "-"
+      print(f"{s['stage']:<16}{s['wall_s']:>10.3f}{s['cpu_s']:>10.3f}{rate:>12}"
+            f"{s['bytes_written'] / 2**10:>9.0f} KiB{rss:>12}")
+    if self.stages and self.stages[-1]["process_peak_rss_bytes"]:
+      print(f"process peak RSS: {self.stages[-1]['process_peak_rss_bytes'] / 2**20:.0f} MiB")
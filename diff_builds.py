@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+diff_builds.py
+--------------
+Compare two question banks by uId: two prepare_data.py output dirs, two raw exports
+(cb-digital-questions.json), or one of each. Raw exports are normalized first so both
+sides are compared in the shape the app ships.
+
+Usage:
+  python diff_builds.py old/data new/data
+  python diff_builds.py old/cb-digital-questions.json new/cb-digital-questions.json --values
+  python diff_builds.py old/data new/cb-digital-questions.json --json > diff.json
+
+Reports added, removed and modified uIds, the fields that changed on each modified item,
+and per-skill / per-domain / per-difficulty count deltas (the build_lookup_and_stats
+counts written to stats.json). Only per-field fingerprints of the old side are kept in
+memory; with --values the old side is read a second time for the modified items alone.
+"""
+import json, os, sys, argparse
+
+from prepare_data import build_lookup_and_stats, load_any, load_chunks, normalize
+
+def load_side(path):
+  """Yield normalized items from a build dir (manifest.json) or a raw export file."""
+  if os.path.isdir(path):
+    yield from load_chunks(path)
+  else:
+    for x in load_any(path):
+      if x.get("uId") or x.get("id") or x.get("questionId"):
+        yield normalize(x)
+
+def fingerprint(value):
+  """In-process hash of a JSON value. Both sides are indexed in the same run, so
+  Python's per-process string hashing is consistent; the type tag keeps 1, 1.0 and
+  True apart."""
+  if isinstance(value, list):
+    return hash(("list",) + tuple(fingerprint(v) for v in value))
+  if isinstance(value, dict):
+    return hash(("dict",) + tuple((k, fingerprint(v)) for k, v in sorted(value.items())))
+  return hash((type(value).__name__, value))
+
+class HashIndex:
+  """uId -> (item hash, field names, per-field hashes) for one side."""
+
+  def __init__(self):
+    self.entries = {}
+    self.duplicates = 0
+    self._names = {}  # interned field-name tuples; most items share one schema
+
+  def add(self, x):
+    uid = x.get("uId")
+    fields = tuple(sorted(x))
+    fields = self._names.setdefault(fields, fields)
+    field_hashes = tuple(fingerprint(x[f]) for f in fields)
+    if uid in self.entries:
+      self.duplicates += 1
+    self.entries[uid] = (hash(field_hashes), fields, field_hashes)
+
+  def indexing(self, items):
+    """Pass items through unchanged while indexing them (feeds build_lookup_and_stats)."""
+    for x in items:
+      self.add(x)
+      yield x
+
+def changed_fields(old, new):
+  """Names of fields whose hash differs, including fields only one side has."""
+  _, old_fields, old_hashes = old
+  _, new_fields, new_hashes = new
+  old_map = dict(zip(old_fields, old_hashes))
+  new_map = dict(zip(new_fields, new_hashes))
+  return sorted(f for f in old_map.keys() | new_map.keys() if old_map.get(f) != new_map.get(f))
+
+def count_deltas(old, new):
+  """{key: {"old", "new", "delta"}} for keys whose count differs."""
+  deltas = {}
+  for key in sorted(old.keys() | new.keys()):
+    a, b = old.get(key, 0), new.get(key, 0)
+    if a != b:
+      deltas[key] = {"old": a, "new": b, "delta": b - a}
+  return deltas
+
+def facet_deltas(old_stats, new_stats):
+  def difficulty(stats):
+    totals = {}
+    for d in stats["domains"].values():
+      for level, n in d["difficulty"].items():
+        totals[level] = totals.get(level, 0) + n
+    return totals
+  return {
+    "skill": count_deltas({k: v["count"] for k, v in old_stats["skills"].items()},
+                          {k: v["count"] for k, v in new_stats["skills"].items()}),
+    "domain": count_deltas({k: v["count"] for k, v in old_stats["domains"].items()},
+                           {k: v["count"] for k, v in new_stats["domains"].items()}),
+    "difficulty": count_deltas(difficulty(old_stats), difficulty(new_stats)),
+  }
+
+def diff_banks(old_path, new_path, values=False):
+  """Diff two banks; returns a JSON-serializable report."""
+  old_index, new_index = HashIndex(), HashIndex()
+  _, old_stats = build_lookup_and_stats([("", old_index.indexing(load_side(old_path)))])
+
+  # The new side is streamed against the old index; only modified items are kept
+  modified = {}
+  new_items = {}
+  def new_stream():
+    for x in load_side(new_path):
+      new_index.add(x)
+      uid = x.get("uId")
+      old = old_index.entries.get(uid)
+      if old is not None and old[0] != new_index.entries[uid][0]:
+        modified[uid] = changed_fields(old, new_index.entries[uid])
+        if values:
+          new_items[uid] = x
+      yield x
+  _, new_stats = build_lookup_and_stats([("", new_stream())])
+
+  added = sorted((u for u in new_index.entries if u not in old_index.entries), key=str)
+  removed = sorted((u for u in old_index.entries if u not in new_index.entries), key=str)
+  changes = {uid: {"fields": fields} for uid, fields in sorted(modified.items(), key=lambda kv: str(kv[0]))}
+
+  if values and changes:
+    for x in load_side(old_path):
+      change = changes.get(x.get("uId"))
+      if change is not None:
+        new = new_items[x["uId"]]
+        change["values"] = {f: {"old": x.get(f), "new": new.get(f)} for f in change["fields"]}
+
+  return {
+    "old": {"path": old_path, "count": old_stats["count"], "duplicates": old_index.duplicates},
+    "new": {"path": new_path, "count": new_stats["count"], "duplicates": new_index.duplicates},
+    "added": added,
+    "removed": removed,
+    "modified": changes,
+    "unchanged": len(old_index.entries) - len(removed) - len(changes),
+    "facets": facet_deltas(old_stats, new_stats),
+  }
+
+def print_report(report, limit):
+  print(f"{report['old']['path']} ({report['old']['count']} items) -> {report['new']['path']} ({report['new']['count']} items)")
+  for side in ("old", "new"):
+    if report[side]["duplicates"]:
+      print(f"  warning: {report[side]['duplicates']} duplicate uIds in {side} side (last one wins)")
+  print(f"  added {len(report['added'])}, removed {len(report['removed'])}, "
+        f"modified {len(report['modified'])}, unchanged {report['unchanged']}")
+
+  for label in ("added", "removed"):
+    if report[label]:
+      shown = report[label][:limit]
+      more = f" (+{len(report[label]) - len(shown)} more)" if len(report[label]) > len(shown) else ""
+      print(f"\n{label}: {', '.join(map(str, shown))}{more}")
+
+  if report["modified"]:
+    print("\nmodified:")
+    for uid, change in list(report["modified"].items())[:limit]:
+      print(f"  {uid}: {', '.join(change['fields'])}")
+      for field, v in change.get("values", {}).items():
+        print(f"    {field}: {json.dumps(v['old'], ensure_ascii=False)[:120]} -> {json.dumps(v['new'], ensure_ascii=False)[:120]}")
+    if len(report["modified"]) > limit:
+      print(f"  (+{len(report['modified']) - limit} more)")
+
+  for facet, deltas in report["facets"].items():
+    if deltas:
+      print(f"\n{facet} counts:")
+      for key, d in deltas.items():
+        print(f"  {key or '(none)'}: {d['old']} -> {d['new']} ({d['delta']:+d})")
+
+def main():
+  ap = argparse.ArgumentParser(description="Diff two question banks (build dirs or raw exports) by uId")
+  ap.add_argument("old", help="old build dir or raw export")
+  ap.add_argument("new", help="new build dir or raw export")
+  ap.add_argument("--values", action="store_true", help="include old/new values of changed fields")
+  ap.add_argument("--json", action="store_true", help="print the full report as JSON")
+  ap.add_argument("--limit", type=int, default=50, help="max uIds listed per section in text output")
+  args = ap.parse_args()
+  for path in (args.old, args.new):
+    if not os.path.exists(path):
+      ap.error(f"not found: {path}")
+
+  report = diff_banks(args.old, args.new, values=args.values)
+  if args.json:
+    json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+    print()
+  else:
+    print_report(report, args.limit)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,162 @@
+"""
+facets.py
+---------
+Canonical facet dictionary for the question bank. Domains and skills come from
+data/sat-taxonomy.json and the skillMappings of skill-practice-config.json. Values
+only the bank knows (math domains and skills) are appended, so every item gets a code.
+
+Bank strings are matched case- and whitespace-insensitively ("Cross-text Connections"
+and "Cross-Text Connections " are the same skill), and skills are matched by skill_cd
+first. Each item then carries "f": [module, domain, skill, difficulty] integer codes
+into the dictionary written to facets.json.
+
+  dictionary = FacetDictionary.build(items, taxonomy, skill_mappings)
+  item = dictionary.encode(item)   # canonical titles + "f" codes
+"""
+import json, os, re
+
+FACET_FIELDS = ("module", "domain", "skill", "difficulty")
+MODULE_TITLES = {"math": "Math", "reading-writing": "Reading and Writing"}
+DIFFICULTY_TITLES = {"E": "Easy", "M": "Medium", "H": "Hard"}
+
+def match_key(text):
+  """Casefolded, whitespace-collapsed form used to match facet strings."""
+  return re.sub(r"\s+", " ", str(text or "")).strip().casefold()
+
+def slug(text):
+  return re.sub(r"[^a-z0-9]+", "_", match_key(text)).strip("_")
+
+class FacetDictionary:
+  """Ordered canonical entries per facet plus the lookup tables used to encode items."""
+
+  def __init__(self):
+    self.entries = {field: [] for field in FACET_FIELDS}
+    self._by_key = {field: {} for field in FACET_FIELDS}
+    self._skill_by_cd = {}
+
+  def add(self, field, id, title, aliases=(), **extra):
+    """Add an entry (or return the existing one's code) and register its match keys."""
+    keys = self._by_key[field]
+    code = keys.get(match_key(id))
+    if code is None:
+      code = len(self.entries[field])
+      self.entries[field].append({"code": code, "id": id, "title": title, **extra})
+    for key in (id, title, *aliases):
+      keys.setdefault(match_key(key), code)
+      # "Boundaries (Punctuation)" should also match "Boundaries"
+      keys.setdefault(match_key(re.sub(r"\s*\([^)]*\)", "", key)), code)
+    return code
+
+  @classmethod
+  def build(cls, items, taxonomy=None, skill_mappings=None):
+    """Taxonomy and skillMappings entries first (in their order), then bank-only values."""
+    d = cls()
+    for module, title in MODULE_TITLES.items():
+      d.add("module", module, title)
+    for level, title in DIFFICULTY_TITLES.items():
+      d.add("difficulty", level, title)
+
+    taxonomy_skills = {}
+    for section in (taxonomy or {}).values():
+      if not isinstance(section, dict):
+        continue
+      for domain_id, domain in section.get("domains", {}).items():
+        d.add("domain", domain_id, domain.get("title", domain_id))
+        for skill_id, skill in domain.get("skills", {}).items():
+          taxonomy_skills[skill_id] = (skill.get("title", skill_id), domain_id)
+
+    for skill_cd, m in (skill_mappings or {}).items():
+      skill_id = m.get("skillId") or slug(m.get("skillTitle") or skill_cd)
+      tax_title, tax_domain = taxonomy_skills.get(skill_id, (None, None))
+      domain_id = m.get("domainId") or tax_domain or ""
+      if domain_id:
+        d.add("domain", domain_id, m.get("domainTitle") or domain_id)
+      d._skill_by_cd[skill_cd] = d.add("skill", skill_id, m.get("skillTitle") or tax_title or skill_cd,
+                                       aliases=[a for a in (tax_title,) if a], skill_cd=skill_cd, domain=domain_id)
+    for skill_id, (title, domain_id) in taxonomy_skills.items():
+      d.add("skill", skill_id, title, skill_cd=None, domain=domain_id)
+
+    # Bank values the taxonomy does not cover, first spelling wins as the title
+    for x in items:
+      domain = x.get("primary_class_cd_desc") or ""
+      domain_code = d.code("domain", domain)
+      if domain and domain_code is None:
+        domain_code = d.add("domain", slug(domain), re.sub(r"\s+", " ", domain).strip())
+      skill_cd = x.get("skill_cd") or ""
+      if d.skill_code(x) is None and (skill_cd or x.get("skill_desc")):
+        desc = re.sub(r"\s+", " ", x.get("skill_desc") or skill_cd).strip()
+        code = d.add("skill", slug(desc), desc, skill_cd=skill_cd or None,
+                     domain=d.entries["domain"][domain_code]["id"] if domain_code is not None else "")
+        if skill_cd:
+          d._skill_by_cd[skill_cd] = code
+      module = x.get("module") or ""
+      if module and d.code("module", module) is None:
+        d.add("module", module, module)
+      difficulty = x.get("difficulty") or ""
+      if difficulty and d.code("difficulty", difficulty) is None:
+        d.add("difficulty", difficulty, difficulty)
+    return d
+
+  def code(self, field, value):
+    return self._by_key[field].get(match_key(value)) if value else None
+
+  def skill_code(self, x):
+    code = self._skill_by_cd.get(x.get("skill_cd") or "")
+    return code if code is not None else self.code("skill", x.get("skill_desc"))
+
+  def encode(self, x):
+    """Item with canonical domain/skill titles and "f" codes (None where a facet is empty)."""
+    codes = [self.code("module", x.get("module")), self.code("domain", x.get("primary_class_cd_desc")),
+             self.skill_code(x), self.code("difficulty", x.get("difficulty"))]
+    out = dict(x)
+    if codes[1] is not None:
+      out["primary_class_cd_desc"] = self.entries["domain"][codes[1]]["title"]
+    if codes[2] is not None:
+      out["skill_desc"] = self.entries["skill"][codes[2]]["title"]
+    out["f"] = codes
+    return out
+
+  def to_json(self):
+    return {"fields": list(FACET_FIELDS), **self.entries}
+
+  @classmethod
+  def from_json(cls, data):
+    d = cls()
+    for field in FACET_FIELDS:
+      for entry in data.get(field, []):
+        d.entries[field].append(entry)
+        d._by_key[field].setdefault(match_key(entry["id"]), entry["code"])
+        d._by_key[field].setdefault(match_key(entry["title"]), entry["code"])
+        if field == "skill" and entry.get("skill_cd"):
+          d._skill_by_cd[entry["skill_cd"]] = entry["code"]
+    return d
+
+# Fields left out of chunk items when codes are present; decode() restores them
+CODED_FIELDS = ("primary_class_cd_desc", "skill_desc")
+
+def strip_coded(x):
+  return {k: v for k, v in x.items() if k not in CODED_FIELDS}
+
+def decode(x, dictionary):
+  """Restore the titles strip_coded removed (dictionary is facets.json as loaded) and
+  drop the codes, so a loaded item matches the same item from an uncoded build."""
+  codes = x.get("f")
+  if not codes:
+    return x
+  out = {k: v for k, v in x.items() if k != "f"}
+  domain, skill = codes[1], codes[2]
+  out["primary_class_cd_desc"] = dictionary["domain"][domain]["title"] if domain is not None else ""
+  out["skill_desc"] = dictionary["skill"][skill]["title"] if skill is not None else ""
+  return out
+
+def load_sources(taxonomy_path, config_path):
+  """(taxonomy, skillMappings) from their JSON files; missing files give empty sources."""
+  taxonomy, mappings = {}, {}
+  if taxonomy_path and os.path.exists(taxonomy_path):
+    with open(taxonomy_path, "r", encoding="utf-8") as f:
+      taxonomy = json.load(f)
+  if config_path and os.path.exists(config_path):
+    with open(config_path, "r", encoding="utf-8") as f:
+      config = json.load(f)
+    mappings = config.get("skillPracticeConfig", config).get("skillMappings", {})
+  return taxonomy, mappings
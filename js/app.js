@@ -41,16 +41,26 @@ class SATApp {
     // Data Loading
     async loadQuestions() {
         try {
-            const manifest = await this.fetchJSON('data/manifest.json');
+            // Builds made with --versioned live under data/versions/<hash>/ and never change;
+            // only the small current.json pointer is revalidated
+            this.dataBase = await this.resolveDataBase();
+            const manifest = await this.fetchJSON(`${this.dataBase}manifest.json`);
             const questionArrays = [];
+            // Builds made with --passage-pool store shared passages once; fields reference them by index
+            const passages = manifest.passages ? await this.fetchJSON(`${this.dataBase}${manifest.passages.path}`) : null;
+            // Builds made with --split-rationales keep explanations in separate shards, fetched on demand
+            this.rationales = manifest.rationales || null;
+            this.rationaleShards = new Map();
+            // Builds made with --facet-codes store integer facet codes; titles come from facets.json
+            this.facets = manifest.facets ? await this.fetchJSON(`${this.dataBase}${manifest.facets.path}`) : null;
             
             for (const chunk of manifest.chunks) {
-                const questions = await this.fetchJSON(`data/${chunk.path}`);
-                questionArrays.push(...questions);
+                const questions = await this.fetchJSON(`${this.dataBase}${chunk.path}`);
+                questionArrays.push(...(passages ? questions.map(q => this.resolvePooled(q, passages)) : questions));
             }
             
             this.questions = questionArrays.map(q => ({
-                ...q,
+                ...(this.facets ? this.decodeFacets(q) : q),
                 attempts: 0,
                 correctAttempts: 0,
                 lastAttempted: null,
@@ -65,6 +75,30 @@ class SATApp {
         }
     }
 
+    // Directory of the published build: the version data/current.json points at, or data/ itself
+    async resolveDataBase() {
+        try {
+            const response = await fetch('data/current.json', { cache: 'no-cache' });
+            if (response.ok) {
+                const pointer = await response.json();
+                return `data/${pointer.path}/`;
+            }
+        } catch (error) {
+            console.warn('No data/current.json, loading the unversioned build:', error);
+        }
+        return 'data/';
+    }
+
+    resolvePooled(question, passages) {
+        const resolved = { ...question };
+        for (const field of ['stem_html', 'explanation_html']) {
+            if (Array.isArray(resolved[field])) {
+                resolved[field] = resolved[field].map(seg => typeof seg === 'number' ? passages[seg] : seg).join('');
+            }
+        }
+        return resolved;
+    }
+
     async fetchJSON(url) {
         const response = await fetch(url);
         if (!response.ok) {
@@ -495,15 +529,39 @@ class SATApp {
         });
         
         // Show explanation if available
-        if (question.explanation_html) {
-            this.showExplanation(question.explanation_html);
-        }
+        this.loadExplanation(question).then(explanation => {
+            if (explanation) {
+                this.showExplanation(explanation);
+            }
+        }).catch(error => console.warn('Could not load explanation:', error));
         
         // Show feedback toast
         const message = question.correct ? 'Correct! ✅' : 'Incorrect ❌';
         this.showToast(message, question.correct ? 'success' : 'error');
     }
 
+    decodeFacets(question) {
+        if (!question.f) return question;
+        const [, domain, skill] = question.f;
+        return {
+            ...question,
+            primary_class_cd_desc: domain !== null ? this.facets.domain[domain].title : '',
+            skill_desc: skill !== null ? this.facets.skill[skill].title : ''
+        };
+    }
+
+    async loadExplanation(question) {
+        if (question.explanation_html || question.ordinal === undefined || !this.rationales) {
+            return question.explanation_html;
+        }
+        const shard = Math.floor(question.ordinal / this.rationales.per_shard);
+        if (!this.rationaleShards.has(shard)) {
+            this.rationaleShards.set(shard, this.fetchJSON(`${this.dataBase}${this.rationales.shards[shard].path}`));
+        }
+        const texts = await this.rationaleShards.get(shard);
+        return texts[question.ordinal % this.rationales.per_shard];
+    }
+
     showExplanation(explanationHTML) {
         document.getElementById('explanationContent').innerHTML = explanationHTML;
         document.getElementById('explanationPanel').classList.remove('hidden');
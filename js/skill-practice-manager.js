@@ -8,6 +8,10 @@ class SkillPracticeManager {
     constructor() {
         this.config = null;
         this.questionData = null;
+        this.loadedShards = new Set();
+        this.passagePool = null;
+        this.facets = null;
+        this.duplicateClusters = null;
         this.currentSession = null;
         this.strategyEngine = null;
         this.questionEngine = null;
@@ -44,7 +48,14 @@ class SkillPracticeManager {
 
     async loadConfig() {
         try {
-            const response = await fetch('data/skill-practice-config.json?v=' + Date.now());
+            // A --versioned build ships its own immutable config, found through the current.json
+            // pointer; otherwise the shared config is revalidated rather than cache-busted
+            const pointer = await fetch('data/current.json', { cache: 'no-cache' })
+                .then(response => response.ok ? response.json() : null, () => null);
+            this.dataVersion = pointer && pointer.config ? pointer.version : null;
+            const response = this.dataVersion
+                ? await fetch(`data/${pointer.config}`)
+                : await fetch('data/skill-practice-config.json', { cache: 'no-cache' });
             if (!response.ok) {
                 throw new Error(`Failed to load config: ${response.status}`);
             }
@@ -57,16 +68,18 @@ class SkillPracticeManager {
 
     async loadQuestionData() {
         try {
-            const response = await fetch(`${this.config.skillPracticeConfig.dataSettings.primaryDataSource}?v=${Date.now()}`);
+            const primarySource = this.config.skillPracticeConfig.dataSettings.primaryDataSource;
+            const response = await fetch(primarySource, this.dataVersion ? {} : { cache: 'no-cache' });
             if (!response.ok) {
                 throw new Error(`Failed to load question data: ${response.status}`);
             }
             const data = await response.json();
 
             // Filter for reading-writing questions only
-            this.questionData = data.filter(question =>
+            this.questionData = await this.decodeFacets(await this.resolvePooled(data.filter(question =>
                 question.module === 'reading-writing'
-            );
+            )));
+            this.loadedShards.add(primarySource);
 
             console.log(`Loaded ${this.questionData.length} reading-writing questions`);
         } catch (error) {
@@ -75,6 +88,96 @@ class SkillPracticeManager {
         }
     }
 
+    // Fetch the shards prepare_data.py routed these skills to, if not already loaded
+    async ensureSkillsLoaded(skillCodes) {
+        const routing = this.config.skillPracticeConfig.dataSettings.skillShards || {};
+        const missing = [...new Set(skillCodes.flatMap(code => routing[code] || []))]
+            .filter(path => !this.loadedShards.has(path));
+
+        await Promise.all(missing.map(async path => {
+            const response = await fetch(path);
+            if (!response.ok) {
+                throw new Error(`Failed to load question shard ${path}: ${response.status}`);
+            }
+            const data = await response.json();
+            this.questionData.push(...await this.decodeFacets(
+                await this.resolvePooled(data.filter(question => question.module === 'reading-writing'))));
+            this.loadedShards.add(path);
+        }));
+    }
+
+    // Expand stem/explanation segment lists from a --passage-pool build into plain strings
+    async resolvePooled(questions) {
+        const poolPath = this.config.skillPracticeConfig.dataSettings.passagePool;
+        if (!poolPath || !questions.some(q => Array.isArray(q.stem_html) || Array.isArray(q.explanation_html))) {
+            return questions;
+        }
+        if (!this.passagePool) {
+            this.passagePool = fetch(poolPath).then(response => {
+                if (!response.ok) {
+                    throw new Error(`Failed to load passage pool: ${response.status}`);
+                }
+                return response.json();
+            });
+        }
+        const passages = await this.passagePool;
+        const join = value => Array.isArray(value)
+            ? value.map(seg => typeof seg === 'number' ? passages[seg] : seg).join('')
+            : value;
+        return questions.map(q => ({ ...q, stem_html: join(q.stem_html), explanation_html: join(q.explanation_html) }));
+    }
+
+    // Restore domain/skill titles from the facets.json dictionary of a --facet-codes build
+    async decodeFacets(questions) {
+        const facetsPath = this.config.skillPracticeConfig.dataSettings.facets;
+        if (!facetsPath || !questions.some(q => q.f)) {
+            return questions;
+        }
+        if (!this.facets) {
+            this.facets = fetch(facetsPath).then(response => {
+                if (!response.ok) {
+                    throw new Error(`Failed to load facet dictionary: ${response.status}`);
+                }
+                return response.json();
+            });
+        }
+        const facets = await this.facets;
+        return questions.map(q => {
+            if (!q.f) return q;
+            const [, domain, skill] = q.f;
+            return {
+                ...q,
+                primary_class_cd_desc: domain !== null ? facets.domain[domain].title : '',
+                skill_desc: skill !== null ? facets.skill[skill].title : ''
+            };
+        });
+    }
+
+    // Questions of a practice set precomputed by prepare_data.py --practice-sets, in set order.
+    // Returns null (caller shuffles the skill pool instead) if no sets were built for the skill.
+    async getPracticeSet(skillCode, setIndex) {
+        const practiceSets = this.config.skillPracticeConfig.dataSettings.practiceSets;
+        const entry = practiceSets && practiceSets.skills[skillCode];
+        if (!entry || !entry.count) return null;
+
+        const index = Number.isInteger(setIndex) ? setIndex % entry.count : Math.floor(Math.random() * entry.count);
+        try {
+            const response = await fetch(`${entry.dir}/set-${String(index).padStart(3, '0')}.json`);
+            if (!response.ok) {
+                throw new Error(`Failed to load practice set: ${response.status}`);
+            }
+            const set = await response.json();
+            const byId = new Map(this.questionData.map(question => [question.uId, question]));
+            const questions = set.ids.map(id => byId.get(id)).filter(Boolean);
+            if (questions.length === 0) return null;
+            questions.setIndex = index;
+            return questions;
+        } catch (error) {
+            console.warn(`Practice set ${index} for ${skillCode} unavailable, shuffling instead:`, error);
+            return null;
+        }
+    }
+
     // Check if skill practice is enabled via feature flags
     isSkillPracticeEnabled() {
         if (!this.config) return false;
@@ -159,13 +262,24 @@ class SkillPracticeManager {
             questionLimit: options.questionLimit || this.config.skillPracticeConfig.dataSettings.maxQuestionsPerSession
         };
 
+        // Make sure the shards holding the target skills are loaded
+        const targetSkills = practiceType === 'domain'
+            ? (this.config.skillPracticeConfig.domainOrganization[targetId] || {}).skills || []
+            : [targetId];
+        await this.ensureSkillsLoaded(targetSkills);
+
         // Get questions for session
         let questions;
         if (practiceType === 'skill') {
-            questions = this.getQuestionsForSkill(targetId, { shuffle: true });
+            questions = await this.getPracticeSet(targetId, options.setIndex);
+            if (questions) {
+                sessionConfig.practiceSet = questions.setIndex;
+            } else {
+                questions = await this.dropNearDuplicates(this.getQuestionsForSkill(targetId, { shuffle: true }));
+            }
             sessionConfig.skillInfo = this.config.skillPracticeConfig.skillMappings[targetId];
         } else if (practiceType === 'domain') {
-            questions = this.getQuestionsForDomain(targetId, { shuffle: true });
+            questions = await this.dropNearDuplicates(this.getQuestionsForDomain(targetId, { shuffle: true }));
             sessionConfig.domainInfo = this.config.skillPracticeConfig.domainOrganization[targetId];
         }
 
@@ -288,6 +402,52 @@ class SkillPracticeManager {
         };
     }
 
+    // Close siblings of a question in the same skill, from the neighbors/<skill>.json shard of a --neighbors build
+    async getSimilarQuestions(question, limit = 3) {
+        const shards = this.config.skillPracticeConfig.dataSettings.neighbors;
+        const path = shards && shards[question.skill_cd];
+        if (!path) {
+            return [];
+        }
+        this.neighborShards = this.neighborShards || new Map();
+        if (!this.neighborShards.has(path)) {
+            this.neighborShards.set(path, fetch(path).then(response => response.ok ? response.json() : {}));
+        }
+        const neighbors = (await this.neighborShards.get(path))[question.uId] || [];
+        await this.ensureSkillsLoaded([question.skill_cd]);
+        const byId = new Map(this.questionData.map(q => [q.uId, q]));
+        return neighbors
+            .map(([uId, score]) => byId.has(uId) ? { ...byId.get(uId), similarity: score } : null)
+            .filter(Boolean)
+            .slice(0, limit);
+    }
+
+    // Keep the first question of each near-duplicate cluster (clusters.json of a --near-duplicates build)
+    async dropNearDuplicates(questions) {
+        const clustersPath = this.config.skillPracticeConfig.dataSettings.duplicateClusters;
+        if (!clustersPath) {
+            return questions;
+        }
+        if (!this.duplicateClusters) {
+            this.duplicateClusters = fetch(clustersPath)
+                .then(response => response.ok ? response.json() : { clusters: [] })
+                .then(data => {
+                    const clusterOf = new Map();
+                    data.clusters.forEach((cluster, index) => cluster.forEach(uId => clusterOf.set(uId, index)));
+                    return clusterOf;
+                });
+        }
+        const clusterOf = await this.duplicateClusters;
+        const seen = new Set();
+        return questions.filter(question => {
+            const cluster = clusterOf.get(question.uId);
+            if (cluster === undefined) return true;
+            if (seen.has(cluster)) return false;
+            seen.add(cluster);
+            return true;
+        });
+    }
+
     // Utility function to shuffle array
     shuffleArray(array) {
         const shuffled = [...array];
@@ -364,18 +524,23 @@ class StrategyEngine {
 
         try {
             // Look for strategy slides in lesson files
-            const manifestResponse = await fetch('lessons/manifest.json?v=' + Date.now());
+            const manifestResponse = await fetch('lessons/manifest.json', { cache: 'no-cache' });
             if (manifestResponse.ok) {
                 const manifest = await manifestResponse.json();
 
-                // Find lessons that match the skill
-                const matchingLessons = Object.values(manifest.lessons || {}).filter(lesson =>
-                    lesson.filepath.includes(skillMapping.skillId) ||
-                    lesson.filepath.includes(skillMapping.domainId)
-                );
+                // Resolve through the precomputed skill index, falling back to a scan for older manifests
+                const indexedIds = (manifest.skill_index || {})[skillCode] || [];
+                const matchingLessons = indexedIds.length > 0
+                    ? indexedIds.map(id => manifest.lessons[id]).filter(Boolean)
+                    : Object.values(manifest.lessons || {}).filter(lesson =>
+                        lesson.filepath.includes(skillMapping.skillId) ||
+                        lesson.filepath.includes(skillMapping.domainId)
+                    );
 
                 if (matchingLessons.length > 0) {
-                    const lessonResponse = await fetch(matchingLessons[0].filepath + '?v=' + Date.now());
+                    // Lesson files are versioned by content hash so the browser can cache them
+                    const lesson = matchingLessons[0];
+                    const lessonResponse = await fetch(lesson.filepath + '?v=' + (lesson.hash || Date.now()));
                     if (lessonResponse.ok) {
                         const lessonData = await lessonResponse.json();
                         return this.extractStrategyFromLesson(lessonData);
@@ -392,7 +557,7 @@ class StrategyEngine {
     async loadDomainStrategy(domainId) {
         // For domain-level strategy, look for fundamentals lesson
         try {
-            const manifestResponse = await fetch('lessons/manifest.json?v=' + Date.now());
+            const manifestResponse = await fetch('lessons/manifest.json', { cache: 'no-cache' });
             if (manifestResponse.ok) {
                 const manifest = await manifestResponse.json();
 
@@ -402,7 +567,7 @@ class StrategyEngine {
                 );
 
                 if (fundamentalsLesson) {
-                    const lessonResponse = await fetch(fundamentalsLesson.filepath + '?v=' + Date.now());
+                    const lessonResponse = await fetch(fundamentalsLesson.filepath + '?v=' + (fundamentalsLesson.hash || Date.now()));
                     if (lessonResponse.ok) {
                         const lessonData = await lessonResponse.json();
                         return this.extractStrategyFromLesson(lessonData);
@@ -456,15 +621,49 @@ class QuestionEngine {
         };
     }
 
-    validateAnswer(question, answerIndex) {
+    validateAnswer(question, answer) {
         if (question.question_type === 'mcq') {
-            return answerIndex === question.correct_choice_index;
+            return answer === question.correct_choice_index;
         }
-        // For numerical questions, validation would be different
-        return false;
+        // Grid-in answers match a key of equal value: "1.5", "3/2" and "6/4" are all 3/2
+        const response = this.parseNumeric(answer);
+        return Boolean(response && question.numeric_keys && question.numeric_keys.some(key => {
+            const value = this.parseNumeric(key);
+            return value && response[0] * value[1] === value[0] * response[1];
+        }));
     }
 
-    getExplanation(question) {
+    // [numerator, denominator] as BigInts for "3/2", "-1.5", ".6667", "1,200"; null otherwise
+    parseNumeric(text) {
+        if (text === null || text === undefined) return null;
+        const value = String(text).trim().replace(/\u2212/g, '-').replace(/[,\s]/g, '');
+        let match = value.match(/^([+-]?\d+)\/(\d+)$/);
+        if (match) {
+            return BigInt(match[2]) === 0n ? null : [BigInt(match[1]), BigInt(match[2])];
+        }
+        match = value.match(/^([+-]?)(\d*)(?:\.(\d*))?$/);
+        if (!match || !(match[2] || match[3])) return null;
+        const fraction = match[3] || '';
+        return [BigInt(match[1] + (match[2] || '0') + fraction), 10n ** BigInt(fraction.length)];
+    }
+
+    // Explanations of a --split-rationales build live in shards fetched on first use
+    async getExplanation(question) {
+        const rationales = this.config.skillPracticeConfig.dataSettings.rationales;
+        if (!question.explanation_html && question.ordinal !== undefined && rationales) {
+            this.rationaleShards = this.rationaleShards || new Map();
+            const shard = Math.floor(question.ordinal / rationales.perShard);
+            if (!this.rationaleShards.has(shard)) {
+                this.rationaleShards.set(shard, fetch(rationales.shards[shard]).then(response => {
+                    if (!response.ok) {
+                        throw new Error(`Failed to load rationale shard: ${response.status}`);
+                    }
+                    return response.json();
+                }));
+            }
+            const texts = await this.rationaleShards.get(shard);
+            return texts[question.ordinal % rationales.perShard] || 'No explanation available';
+        }
         return question.explanation_html || 'No explanation available';
     }
 }
@@ -21,8 +21,12 @@ class WordsInContextPractice {
 
     async loadQuestions() {
         try {
-            const response = await fetch('data/chunks/words-in-context.json');
-            this.questions = await response.json();
+            // Curated sets of a --versioned build live in the version data/current.json points at
+            const pointer = await fetch('data/current.json', { cache: 'no-cache' })
+                .then(response => response.ok ? response.json() : null, () => null);
+            const base = `data/${pointer ? pointer.path + '/' : ''}`;
+            const response = await fetch(`${base}chunks/words-in-context.json`);
+            this.questions = await this.resolvePooled(await response.json(), base);
             console.log(`Loaded ${this.questions.length} Words in Context questions`);
         } catch (error) {
             console.error('Error loading Words in Context questions:', error);
@@ -30,6 +34,26 @@ class WordsInContextPractice {
         }
     }
 
+    // Builds made with --passage-pool store shared passages once; stem/explanation fields are
+    // then segment lists in which numbers index chunks/passages.json (see SATApp.resolvePooled)
+    async resolvePooled(questions, base) {
+        const fields = ['stem_html', 'explanation_html'];
+        if (!questions.some(q => fields.some(field => Array.isArray(q[field])))) {
+            return questions;
+        }
+        const manifest = await (await fetch(`${base}manifest.json`)).json();
+        const passages = await (await fetch(`${base}${manifest.passages.path}`)).json();
+        return questions.map(question => {
+            const resolved = { ...question };
+            for (const field of fields) {
+                if (Array.isArray(resolved[field])) {
+                    resolved[field] = resolved[field].map(seg => typeof seg === 'number' ? passages[seg] : seg).join('');
+                }
+            }
+            return resolved;
+        });
+    }
+
     setupEventListeners() {
         // Navigation events
         document.addEventListener('click', (e) => {
@@ -0,0 +1,156 @@
+
+import argparse
+import html
+import json
+import os
+import re
+import sys
+from pptx import Presentation
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import BaseDocTemplate, Flowable, Frame, PageBreak, PageTemplate, Paragraph
+from reportlab.platypus.tableofcontents import TableOfContents
+
+from generate_lessons import parse_markdown, pdf_styles, section_flowables
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_INDEX = os.path.join(REPO_ROOT, "data", "topics", "index.json")
+DEFAULT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def slugify(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+def read_title(md_path):
+    """Return the lesson's top-level '# ' heading, falling back to its directory name."""
+    with open(md_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("# "):
+                return re.sub(r"^SAT Skill:\s*", "", line[2:].strip())
+    return os.path.basename(os.path.dirname(md_path))
+
+def topic_order(index_path):
+    """Map topic slugs to their position in data/topics/index.json."""
+    order = {}
+    if not os.path.exists(index_path):
+        return order
+    with open(index_path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    for category in index.get("categories", {}).values():
+        for topic in category.get("topics", []):
+            pos = len(order)
+            order.setdefault(topic["id"], pos)
+            order.setdefault(slugify(topic["name"]), pos)
+    return order
+
+def find_lessons(root, index_path=DEFAULT_INDEX):
+    """List (title, lesson.md path) under root, in topic index order then by title."""
+    order = topic_order(index_path)
+    lessons = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in ("vendor", "workflows"))
+        for name in filenames:
+            if name.endswith(".md") and not name.lower().startswith("readme"):
+                md_path = os.path.join(dirpath, name)
+                lessons.append((read_title(md_path), md_path))
+    return sorted(lessons, key=lambda l: (order.get(slugify(l[0]), len(order)), l[0].lower(), l[1]))
+
+class BookTemplate(BaseDocTemplate):
+    """Letter-size doc that reports the page each lesson starts on to the table of contents."""
+
+    def __init__(self, filename, **kw):
+        super().__init__(filename, pagesize=letter, leftMargin=50, rightMargin=50,
+                         topMargin=50, bottomMargin=50, **kw)
+        frame = Frame(self.leftMargin, self.bottomMargin, self.width, self.height, id="body")
+        self.addPageTemplates([PageTemplate(id="page", frames=[frame], onPage=self._page_number)])
+
+    def _page_number(self, canv, doc):
+        canv.setFont("Helvetica", 9)
+        canv.drawRightString(letter[0] - 50, 30, str(doc.page))
+
+    def afterFlowable(self, flowable):
+        if isinstance(flowable, Paragraph) and flowable.style.name == "LessonTitle":
+            self.notify("TOCEntry", (0, flowable.getPlainText(), self.page))
+
+class Lesson(Flowable):
+    """Stand-in for one lesson in the book story. It never fits, so the frame asks it to
+    split, and only then is lesson.md read and parsed into flowables. Every layout pass
+    re-reads the lesson, so at most one lesson's content is in memory at a time. The
+    first split also adds the lesson's slides to prs."""
+
+    def __init__(self, lesson_title, md_path, prs=None):
+        super().__init__()
+        self.lesson_title = lesson_title
+        self.md_path = md_path
+        self.prs = prs
+
+    def wrap(self, availWidth, availHeight):
+        return availWidth, availHeight + 1
+
+    def split(self, availWidth, availHeight):
+        sections = parse_markdown(self.md_path)
+        if self.prs is not None:
+            add_lesson_slides(self.prs, self.lesson_title, sections)
+            self.prs = None
+        styles = pdf_styles()
+        # Starts with a PageBreak, which the doc inserts into the story without fitting it first
+        story = [PageBreak(), Paragraph(f"SAT Skill: {html.escape(self.lesson_title, quote=False)}", styles["title"])]
+        for section, content in sections.items():
+            story += section_flowables(section, content)
+        return story
+
+def table_of_contents():
+    toc = TableOfContents()
+    toc.levelStyles = [ParagraphStyle("TOCLesson", fontName="Helvetica", fontSize=11, leading=16)]
+    return toc
+
+def book_story(title, lessons, prs=None):
+    """Title, table of contents and one Lesson stand-in per (title, lesson.md path)."""
+    styles = pdf_styles()
+    book_title = ParagraphStyle("BookTitle", parent=styles["title"], fontSize=20, leading=24)
+    story = [Paragraph(html.escape(title, quote=False), book_title), table_of_contents()]
+    return story + [Lesson(lesson_title, md_path, prs) for lesson_title, md_path in lessons]
+
+def add_lesson_slides(prs, lesson_title, sections):
+    prs.slides.add_slide(prs.slide_layouts[0]).shapes.title.text = f"SAT Skill: {lesson_title}"
+    for section, content in sections.items():
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = section
+        slide.placeholders[1].text = content.strip()
+
+def build_book(root, out_dir, title="SAT Strategy Book", index_path=DEFAULT_INDEX):
+    """Write book.pdf (with a table of contents) and book.pptx covering every lesson under root.
+
+    multiBuild lays the book out until the table of contents' page numbers settle
+    (usually two passes). Each pass reads and parses the lessons one at a time; only
+    titles and page numbers carry over between passes. The first pass also feeds each
+    parsed lesson into book.pptx."""
+    lessons = find_lessons(root, index_path)
+    if not lessons:
+        raise SystemExit(f"No lesson markdown found under {root}")
+    os.makedirs(out_dir, exist_ok=True)
+
+    prs = Presentation()
+    prs.slides.add_slide(prs.slide_layouts[0]).shapes.title.text = title
+    pdf_path = os.path.join(out_dir, "book.pdf")
+    doc = BookTemplate(pdf_path, title=title)
+    doc.multiBuild(book_story(title, lessons, prs))
+    pptx_path = os.path.join(out_dir, "book.pptx")
+    prs.save(pptx_path)
+
+    print(f"Built book from {len(lessons)} lessons ({doc.page} PDF pages):")
+    print(" -", pptx_path)
+    print(" -", pdf_path)
+    return pdf_path, pptx_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge every lesson.md under a topic tree into one PDF and PPTX")
+    parser.add_argument("root", nargs="?", default=DEFAULT_ROOT,
+                        help="directory to scan for lesson markdown (default: lesson_generator/, where lesson-*.md live)")
+    parser.add_argument("--out", default=".", help="output directory for book.pdf and book.pptx")
+    parser.add_argument("--title", default="SAT Strategy Book")
+    parser.add_argument("--index", default=DEFAULT_INDEX, help="topic index used for lesson ordering")
+    args = parser.parse_args()
+    if not os.path.isdir(args.root):
+        print("Directory not found:", args.root)
+        sys.exit(1)
+    build_book(args.root, args.out, title=args.title, index_path=args.index)
@@ -1,9 +1,138 @@
 
+import argparse
+import html
 import os
+import re
 import sys
+import time
+from functools import lru_cache
 from pptx import Presentation
 from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.pdfbase import pdfmetrics
+from reportlab.platypus import Paragraph, SimpleDocTemplate
+
+REVEAL_VERSION = "5.1.0"
+REVEAL_CDN = f"https://unpkg.com/reveal.js@{REVEAL_VERSION}/dist"
+
+def section_blocks(content):
+    """Split section text into ("p" | "ol" | "ul", text) blocks."""
+    for line in content.strip().split("\n"):
+        line = line.strip()
+        ordered = re.match(r"^\d+[.)]\s+(.*)$", line)
+        bullet = re.match(r"^[-*•]\s+(.*)$", line)
+        if ordered:
+            yield "ol", ordered.group(1)
+        elif bullet:
+            yield "ul", bullet.group(1)
+        elif line:
+            yield "p", line
+
+def render_section_html(content):
+    """Render section text as paragraphs and ordered/unordered lists."""
+    parts = []
+    list_tag = None
+    for kind, text in section_blocks(content):
+        tag = kind if kind != "p" else None
+        if tag != list_tag:
+            if list_tag:
+                parts.append(f"</{list_tag}>")
+            if tag:
+                parts.append(f"<{tag}>")
+            list_tag = tag
+        if tag:
+            parts.append(f"<li>{html.escape(text)}</li>")
+        else:
+            parts.append(f"<p>{html.escape(text)}</p>")
+    if list_tag:
+        parts.append(f"</{list_tag}>")
+    return "".join(parts)
+
+def minify_html(markup):
+    """Collapse the template indentation and inter-tag whitespace."""
+    markup = re.sub(r">\s+<", "><", markup)
+    return re.sub(r"\s*\n\s*", " ", markup).strip()
+
+def build_deck_html(skill_name, sections):
+    """Build the minified reveal.js deck against the pinned CDN release."""
+    title = html.escape(skill_name.capitalize())
+    slides = f"<section><h2>SAT Skill: {title}</h2></section>"
+    for heading, content in sections.items():
+        slides += f"<section><h3>{html.escape(heading)}</h3>{render_section_html(content)}</section>"
+
+    return minify_html(f"""
+    <!doctype html>
+    <html lang="en">
+    <head>
+      <meta charset="utf-8">
+      <title>{title} - SAT Skill</title>
+      <link rel="stylesheet" href="{REVEAL_CDN}/reveal.css">
+      <link rel="stylesheet" href="{REVEAL_CDN}/theme/white.css">
+    </head>
+    <body>
+      <div class="reveal">
+        <div class="slides">{slides}</div>
+      </div>
+      <script src="{REVEAL_CDN}/reveal.js"></script>
+      <script>Reveal.initialize();</script>
+    </body>
+    </html>
+    """)
+
+@lru_cache(maxsize=None)
+def pdf_styles():
+    """Paragraph styles (and their font metrics) built once per process."""
+    for font in ("Helvetica", "Helvetica-Bold"):
+        pdfmetrics.getFont(font)
+    base = getSampleStyleSheet()
+    return {
+        "title": ParagraphStyle("LessonTitle", parent=base["Title"], fontName="Helvetica-Bold",
+                                fontSize=14, leading=18, spaceAfter=20),
+        "heading": ParagraphStyle("SectionHeading", parent=base["Heading2"], fontName="Helvetica-Bold",
+                                  fontSize=12, leading=15, spaceBefore=10, spaceAfter=6, keepWithNext=1),
+        "body": ParagraphStyle("SectionBody", parent=base["BodyText"], fontName="Helvetica",
+                               fontSize=10, leading=12, spaceAfter=4),
+        "item": ParagraphStyle("SectionItem", parent=base["BodyText"], fontName="Helvetica",
+                               fontSize=10, leading=12, leftIndent=20, bulletIndent=6, spaceAfter=2),
+    }
+
+def section_flowables(title, content):
+    """Yield wrapped flowables for one section; headings stay with the text that follows."""
+    styles = pdf_styles()
+    yield Paragraph(html.escape(title, quote=False), styles["heading"])
+    number = 0
+    for kind, text in section_blocks(content):
+        text = html.escape(text, quote=False)
+        if kind == "ol":
+            number += 1
+            yield Paragraph(text, styles["item"], bulletText=f"{number}.")
+        elif kind == "ul":
+            yield Paragraph(text, styles["item"], bulletText="•")
+        else:
+            number = 0
+            yield Paragraph(text, styles["body"])
+
+def write_strategy_pdf(pdf_path, skill_name, sections):
+    """Lay out the strategy sheet with platypus so long lines wrap and pages break cleanly."""
+    doc = SimpleDocTemplate(pdf_path, pagesize=letter, leftMargin=50, rightMargin=50,
+                            topMargin=50, bottomMargin=50, title=f"SAT Skill: {skill_name.capitalize()}")
+    story = [Paragraph(f"SAT Skill: {html.escape(skill_name.capitalize(), quote=False)}", pdf_styles()["title"])]
+    for title, content in sections.items():
+        story.extend(section_flowables(title, content))
+    doc.build(story)
+    return doc.page
+
+def bench_strategy_pdf(pages, pdf_path):
+    """Time write_strategy_pdf on a synthetic handout of roughly `pages` pages."""
+    paragraph = " ".join(["Read the sentence before and after the blank, then predict a word."] * 6)
+    sections = {}
+    for i in range(pages * 4):
+        sections[f"Section {i + 1}"] = f"{paragraph}\n1. Read before and after\n2. Predict your own word\n- Trap: {paragraph}\n"
+    start = time.perf_counter()
+    page_count = write_strategy_pdf(pdf_path, "benchmark", sections)
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {page_count} pages in {elapsed:.2f}s ({page_count / elapsed:.1f} pages/s) -> {pdf_path}")
+    return elapsed
 
 def parse_markdown(md_path):
     """Parse lesson.md into sections dictionary."""
@@ -44,65 +173,15 @@ def generate_lesson(md_path):
     prs.save(pptx_path)
 
     # -------- HTML (reveal.js) --------
-    html_content = f"""
-    <!doctype html>
-    <html lang="en">
-    <head>
-      <meta charset="utf-8">
-      <title>{skill_name.capitalize()} - SAT Skill</title>
-      <link rel="stylesheet" href="https://unpkg.com/reveal.js/dist/reveal.css">
-      <link rel="stylesheet" href="https://unpkg.com/reveal.js/dist/theme/white.css">
-    </head>
-    <body>
-      <div class="reveal">
-        <div class="slides">
-          <section><h2>SAT Skill: {skill_name.capitalize()}</h2></section>
-    """
-
-    for title, content in sections.items():
-        html_content += f"<section><h3>{title}</h3><pre>{content.strip()}</pre></section>"
-
-    html_content += """
-        </div>
-      </div>
-      <script src="https://unpkg.com/reveal.js/dist/reveal.js"></script>
-      <script>Reveal.initialize();</script>
-    </body>
-    </html>
-    """
+    html_content = build_deck_html(skill_name, sections)
 
     html_path = os.path.join(skill_dir, "deck.html")
-    with open(html_path, "w") as f:
+    with open(html_path, "w", encoding="utf-8") as f:
         f.write(html_content)
 
     # -------- PDF --------
     pdf_path = os.path.join(skill_dir, "strategy.pdf")
-    c = canvas.Canvas(pdf_path, pagesize=letter)
-    width, height = letter
-
-    y = height - 50
-    c.setFont("Helvetica-Bold", 14)
-    c.drawCentredString(width/2, y, f"SAT Skill: {skill_name.capitalize()}")
-
-    y -= 40
-    for title, content in sections.items():
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(50, y, title)
-        y -= 20
-        c.setFont("Helvetica", 10)
-        text_obj = c.beginText(50, y)
-        for line in content.strip().split("\n"):
-            text_obj.textLine(line)
-            y -= 12
-            if y < 100:
-                c.drawText(text_obj)
-                c.showPage()
-                y = height - 50
-                text_obj = c.beginText(50, y)
-        c.drawText(text_obj)
-        y -= 20
-
-    c.save()
+    write_strategy_pdf(pdf_path, skill_name, sections)
 
     print("Generated files:")
     print(" -", pptx_path)
@@ -110,11 +189,18 @@ def generate_lesson(md_path):
     print(" -", pdf_path)
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python generate_lessons.py path/to/lesson.md")
+    parser = argparse.ArgumentParser(description="Generate PPTX, HTML and PDF from a lesson.md")
+    parser.add_argument("md_path", nargs="?", help="path/to/lesson.md")
+    parser.add_argument("--bench-pdf", type=int, metavar="PAGES",
+                        help="benchmark the PDF layout on a synthetic handout of about PAGES pages")
+    args = parser.parse_args()
+    if args.bench_pdf:
+        bench_strategy_pdf(args.bench_pdf, args.md_path or "bench-strategy.pdf")
+        sys.exit(0)
+    if not args.md_path:
+        parser.print_usage()
         sys.exit(1)
-    md_path = sys.argv[1]
-    if not os.path.exists(md_path):
-        print("File not found:", md_path)
+    if not os.path.exists(args.md_path):
+        print("File not found:", args.md_path)
         sys.exit(1)
-    generate_lesson(md_path)
+    generate_lesson(args.md_path)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+load_test.py
+------------
+Concurrent keep-alive load generator for question_server.py (stdlib asyncio only).
+
+Opens --concurrency connections and has each send requests back to back until
+--requests have completed. The URL mix is built from the server's /facets: skill and
+skill/difficulty listings, item lookups, searches, seeded practice sets and
+If-None-Match revalidations. Reports throughput, latency percentiles and status counts.
+
+Usage:
+  python question_server.py ./data --port 8081 &
+  python load_test.py http://127.0.0.1:8081 --concurrency 1000 --requests 50000
+  python load_test.py http://127.0.0.1:8081 --json > load.json
+"""
+import asyncio, json, random, statistics, sys, time, argparse
+from collections import Counter
+from urllib.parse import quote, urlsplit
+
+SEARCH_WORDS = ("triangle", "area", "circle", "passage", "author", "text", "value", "equation", "student", "claim")
+
+async def request(reader, writer, host, path, etag=None):
+  """One GET on an open connection; returns (status, etag, body bytes)."""
+  extra = f"If-None-Match: {etag}\r\n" if etag else ""
+  writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept-Encoding: gzip\r\n{extra}\r\n".encode("latin-1"))
+  head = await reader.readuntil(b"\r\n\r\n")
+  lines = head.decode("latin-1").split("\r\n")
+  status = int(lines[0].split(" ", 2)[1])
+  headers = {}
+  for line in lines[1:]:
+    name, _, value = line.partition(":")
+    headers[name.strip().lower()] = value.strip()
+  body = await reader.readexactly(int(headers.get("content-length", 0)))
+  return status, headers.get("etag"), body
+
+async def fetch_json(host, port, path):
+  reader, writer = await asyncio.open_connection(host, port)
+  writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode("latin-1"))
+  data = await reader.read()
+  writer.close()
+  return json.loads(data.partition(b"\r\n\r\n")[2])
+
+async def url_mix(host, port, rng):
+  """Weighted request paths drawn from the server's own facets and items."""
+  facets = await fetch_json(host, port, "/facets")
+  skills = list(facets["skill"])
+  levels = list(facets["difficulty"])
+  uids = []
+  for skill in skills:
+    page = await fetch_json(host, port, f"/skills/{quote(skill)}?size=20")
+    uids += [x["uId"] for x in page["items"]]
+  makers = [
+    (30, lambda: f"/items/{rng.choice(uids)}"),
+    (25, lambda: f"/skills/{quote(rng.choice(skills))}?difficulty={rng.choice(levels)}"),
+    (15, lambda: f"/skills/{quote(rng.choice(skills))}?page={rng.randrange(3)}&size=20"),
+    (15, lambda: f"/search?q={rng.choice(SEARCH_WORDS)}&size=20"),
+    (15, lambda: f"/practice/{quote(rng.choice(skills))}?seed={rng.randrange(50)}&size=10"),
+  ]
+  weights = [w for w, _ in makers]
+  return lambda: rng.choices(makers, weights)[0][1]()
+
+async def worker(host, port, next_path, budget, latencies, statuses, revalidate, rng):
+  reader, writer = await asyncio.open_connection(host, port)
+  etags = {}
+  try:
+    while budget[0] > 0:
+      budget[0] -= 1
+      path = next_path()
+      etag = etags.get(path) if rng.random() < revalidate else None
+      t = time.perf_counter()
+      status, new_etag, _ = await request(reader, writer, host, path, etag)
+      latencies.append(time.perf_counter() - t)
+      statuses[status] += 1
+      if new_etag:
+        etags[path] = new_etag
+  finally:
+    writer.close()
+
+async def run(url, concurrency, total, revalidate, seed):
+  parts = urlsplit(url)
+  host, port = parts.hostname, parts.port or 80
+  rng = random.Random(seed)
+  next_path = await url_mix(host, port, rng)
+  budget = [total]
+  latencies, statuses = [], Counter()
+  started = time.perf_counter()
+  results = await asyncio.gather(*(worker(host, port, next_path, budget, latencies, statuses, revalidate, rng)
+                                   for _ in range(concurrency)), return_exceptions=True)
+  elapsed = time.perf_counter() - started
+  errors = Counter(type(r).__name__ for r in results if isinstance(r, Exception))
+  latencies.sort()
+  pct = lambda q: round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 2) if latencies else None
+  return {
+    "url": url,
+    "concurrency": concurrency,
+    "requests": len(latencies),
+    "elapsed_s": round(elapsed, 3),
+    "requests_per_s": round(len(latencies) / elapsed, 1) if elapsed else None,
+    "latency_ms": {"mean": round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+                   "p50": pct(0.5), "p90": pct(0.9), "p99": pct(0.99), "max": pct(1.0)},
+    "statuses": dict(sorted(statuses.items())),
+    "connection_errors": dict(errors),
+  }
+
+def main():
+  ap = argparse.ArgumentParser(description="Load-test question_server.py with many concurrent keep-alive clients")
+  ap.add_argument("url", nargs="?", default="http://127.0.0.1:8081")
+  ap.add_argument("--concurrency", type=int, default=200, help="simultaneous connections")
+  ap.add_argument("--requests", type=int, default=20000, help="total requests across all connections")
+  ap.add_argument("--revalidate", type=float, default=0.2,
+                  help="share of repeated URLs sent with If-None-Match (exercises 304s)")
+  ap.add_argument("--seed", type=int, default=0)
+  ap.add_argument("--json", action="store_true", help="print the result as JSON")
+  args = ap.parse_args()
+
+  result = asyncio.run(run(args.url, args.concurrency, args.requests, args.revalidate, args.seed))
+  if args.json:
+    json.dump(result, sys.stdout, indent=2)
+    print()
+    return
+  lat = result["latency_ms"]
+  print(f"{result['requests']} requests over {result['concurrency']} connections in {result['elapsed_s']}s "
+        f"= {result['requests_per_s']:,.0f} req/s")
+  print(f"latency ms: mean {lat['mean']}  p50 {lat['p50']}  p90 {lat['p90']}  p99 {lat['p99']}  max {lat['max']}")
+  print(f"statuses: {result['statuses']}" + (f"  connection errors: {result['connection_errors']}"
+                                             if result["connection_errors"] else ""))
+
+if __name__ == "__main__":
+  main()
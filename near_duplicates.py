@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+near_duplicates.py
+------------------
+Near-duplicate clusters over the bank: curated -wic-NNN variants, upstream reissues
+and questions written against the same passage.
+
+Each item's cleaned stem text is cut into 5-word shingles and reduced to a MinHash
+signature. Signatures are split into LSH bands, and items that share a band bucket
+become candidate pairs. A candidate pair is kept when its estimated Jaccard
+similarity reaches the threshold, and kept pairs are joined into clusters with
+union-find. Work grows with the number of items plus the number of candidate pairs,
+not with all pairs.
+
+Practice-set builders take the resulting {uId: cluster} map and use at most one item
+per cluster in a set.
+
+Usage:
+  python prepare_data.py --input cb-digital-questions.json --out ./data --near-duplicates --practice-sets 10
+  python near_duplicates.py ./data --threshold 0.8          # print clusters of an existing build
+
+  from near_duplicates import find_clusters, cluster_map
+  clusters = find_clusters(items, threshold=0.8)            # [[uId, uId, ...], ...]
+"""
+import json, os, random, re, sys, time, zlib, argparse
+
+from question_db import stem_text
+
+try:
+  import numpy as np
+  NUMPY_AVAILABLE = True
+except ImportError:
+  NUMPY_AVAILABLE = False
+
+NUM_PERM = 128
+SHINGLE_WORDS = 5
+DEFAULT_THRESHOLD = 0.8
+MERSENNE = (1 << 61) - 1
+SHINGLE_MULT = 0x100000001B3
+MASK32 = 0xFFFFFFFF
+MASK64 = (1 << 64) - 1
+# Memory budget for one NumPy block. Each block holds a few (num_perm x shingles) uint64
+# work arrays at once, so the words per block are derived from this and num_perm
+BLOCK_BYTES = 16 << 20
+_WORD = re.compile(r"\w+")
+
+def word_hashes(text, cache):
+  """crc32 of each casefolded word of text (cache maps word -> hash across items)."""
+  out = []
+  for word in _WORD.findall(text.casefold()):
+    h = cache.get(word)
+    if h is None:
+      h = cache[word] = zlib.crc32(word.encode("utf-8"))
+    out.append(h)
+  return out
+
+def shingles(words, k=SHINGLE_WORDS):
+  """32-bit hashes of the k-word windows of a word-hash list (a shorter list is one shingle).
+  A window hashes to w0*M^(k-1) + ... + w(k-1) mod 2^32, which NumPy computes for whole
+  blocks of items at once."""
+  out = []
+  for i in range(max(1, len(words) - k + 1)):
+    h = 0
+    for w in words[i:i + k]:
+      h = h * SHINGLE_MULT + w
+    out.append(h & MASK32)
+  return out
+
+def permutations(num_perm=NUM_PERM, seed=1):
+  """(a, b) coefficients of the hash family ((a*x + b) mod 2^64) mod 2^61-1."""
+  rng = random.Random(seed)
+  return [rng.randrange(1, MERSENNE) for _ in range(num_perm)], [rng.randrange(0, MERSENNE) for _ in range(num_perm)]
+
+def bands_for(threshold, num_perm=NUM_PERM):
+  """(bands, rows) with bands * rows == num_perm whose S-curve midpoint (1/b)^(1/r) is
+  closest to the threshold, so pairs near the threshold are likely to collide."""
+  options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+  return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+def _fold(v):
+  # v mod 2^61-1 without a division (a few multiples of the modulus may be left
+  # over, identically in NumPy and Python)
+  return (v & MERSENNE) + (v >> 61)
+
+def signatures(word_lists, num_perm=NUM_PERM, seed=1):
+  """MinHash signature per word-hash list (None for an empty list)."""
+  a, b = permutations(num_perm, seed)
+  out = [None] * len(word_lists)
+  if not NUMPY_AVAILABLE:
+    for i, words in enumerate(word_lists):
+      if words:
+        hashes = set(shingles(words))
+        # & MASK64 reproduces NumPy's wrapping uint64 arithmetic
+        out[i] = [min(_fold((ai * h + bi) & MASK64) for h in hashes) for ai, bi in zip(a, b)]
+    return out
+
+  a, b = np.array(a, dtype=np.uint64)[:, None], np.array(b, dtype=np.uint64)[:, None]
+  k = SHINGLE_WORDS
+  for i, words in enumerate(word_lists):
+    if 0 < len(words) < k:
+      h = np.array(shingles(words), dtype=np.uint64)[None, :]
+      out[i] = _fold(a * h + b).min(axis=1)
+  long_items = [i for i, words in enumerate(word_lists) if len(words) >= k]
+  block_words = max(k, BLOCK_BYTES // (num_perm * 8 * 4))  # a*h+b, its fold and their temporaries
+  pos = 0
+  while pos < len(long_items):
+    block, total = [], 0
+    while pos < len(long_items) and (not block or total + len(word_lists[long_items[pos]]) <= block_words):
+      block.append(long_items[pos])
+      total += len(word_lists[long_items[pos]])
+      pos += 1
+    w = np.fromiter((h for i in block for h in word_lists[i]), dtype=np.uint64, count=total)
+    # Window hashes over the concatenated words, then keep windows inside one item
+    acc = w[:total - k + 1].copy()
+    for j in range(1, k):
+      acc = acc * np.uint64(SHINGLE_MULT) + w[j:total - k + 1 + j]
+    acc &= np.uint64(MASK32)
+    lengths = np.array([len(word_lists[i]) for i in block], dtype=np.int64)
+    windows = lengths - k + 1
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    offsets = np.concatenate(([0], np.cumsum(windows)[:-1]))
+    h = acc[np.arange(windows.sum()) + np.repeat(starts - offsets, windows)]
+    mins = np.minimum.reduceat(_fold(a * h[None, :] + b), offsets, axis=1)
+    for col, i in enumerate(block):
+      out[i] = mins[:, col].copy()
+  return out
+
+class UnionFind:
+  def __init__(self, n):
+    self.parent = list(range(n))
+
+  def find(self, i):
+    while self.parent[i] != i:
+      self.parent[i] = self.parent[self.parent[i]]
+      i = self.parent[i]
+    return i
+
+  def union(self, i, j):
+    ri, rj = self.find(i), self.find(j)
+    if ri != rj:
+      self.parent[max(ri, rj)] = min(ri, rj)
+
+def similarity(s, t):
+  """Estimated Jaccard similarity: share of agreeing signature positions."""
+  if NUMPY_AVAILABLE:
+    return float(np.count_nonzero(s == t)) / len(s)
+  return sum(1 for x, y in zip(s, t) if x == y) / len(s)
+
+def find_clusters(items, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM, seed=1, stats=None):
+  """Clusters (lists of uIds in item order, two or more each) of items whose cleaned
+  stems have estimated Jaccard similarity >= threshold, directly or transitively."""
+  uids = [x["uId"] for x in items]
+  # Items sharing a stem (several questions on one passage) share one signature
+  texts = [stem_text(x.get("stem_html")) for x in items]
+  distinct = {}
+  slots = [distinct.setdefault(t, len(distinct)) for t in texts]
+  cache = {}
+  distinct_sigs = signatures([word_hashes(t, cache) for t in distinct], num_perm, seed)
+  sigs = [distinct_sigs[k] for k in slots]
+  bands, rows = bands_for(threshold, num_perm)
+
+  uf = UnionFind(len(items))
+  candidates = verified = 0
+  for band in range(bands):
+    lo, hi = band * rows, (band + 1) * rows
+    buckets = {}
+    for i, sig in enumerate(sigs):
+      if sig is not None:
+        part = sig[lo:hi]
+        buckets.setdefault(part.tobytes() if NUMPY_AVAILABLE else tuple(part), []).append(i)
+    for members in buckets.values():
+      if len(members) < 2:
+        continue
+      # Compare each member with one representative per cluster already in the bucket,
+      # so a bucket of k copies costs k - 1 checks rather than k^2 / 2
+      reps = [members[0]]
+      for j in members[1:]:
+        root = uf.find(j)
+        if any(uf.find(r) == root for r in reps):
+          continue
+        for r in reps:
+          candidates += 1
+          if similarity(sigs[r], sigs[j]) >= threshold:
+            verified += 1
+            uf.union(r, j)
+            break
+        else:
+          reps.append(j)
+
+  groups = {}
+  for i in range(len(items)):
+    groups.setdefault(uf.find(i), []).append(uids[i])
+  clusters = [g for g in groups.values() if len(g) > 1]
+  if stats is not None:
+    stats.update(bands=bands, rows=rows, candidate_pairs=candidates, verified_pairs=verified)
+  return clusters
+
+def cluster_map(clusters):
+  """{uId: cluster index} for the items of the given clusters."""
+  return {uid: n for n, cluster in enumerate(clusters) for uid in cluster}
+
+def write_clusters(clusters, out_dir, threshold, stats=None):
+  """Write clusters.json and return the manifest entry."""
+  with open(os.path.join(out_dir, "clusters.json"), "w", encoding="utf-8") as f:
+    json.dump({"threshold": threshold, "num_perm": NUM_PERM, "shingle_words": SHINGLE_WORDS,
+               **(stats or {}), "clusters": clusters}, f, separators=(",",":"))
+  return {"path": "clusters.json", "threshold": threshold, "count": len(clusters),
+          "items": sum(len(c) for c in clusters)}
+
+def load_clusters(out_dir, manifest):
+  """{uId: cluster index} from a build's clusters.json, or {} if it has none."""
+  entry = manifest.get("clusters")
+  if not entry:
+    return {}
+  with open(os.path.join(out_dir, entry["path"]), "r", encoding="utf-8") as f:
+    return cluster_map(json.load(f)["clusters"])
+
+def main():
+  ap = argparse.ArgumentParser(description="Find near-duplicate item clusters with MinHash + LSH")
+  ap.add_argument("source", help="prepare_data.py build dir or a chunk JSON file")
+  ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="estimated Jaccard similarity to link two items")
+  ap.add_argument("--json", action="store_true", help="print the clusters as JSON")
+  args = ap.parse_args()
+
+  if os.path.isdir(args.source):
+    from prepare_data import load_chunks
+    items = list(load_chunks(args.source))
+  else:
+    with open(args.source, "r", encoding="utf-8") as f:
+      items = json.load(f)
+  t = time.perf_counter()
+  stats = {}
+  clusters = find_clusters(items, args.threshold, stats=stats)
+  elapsed = time.perf_counter() - t
+  if args.json:
+    json.dump(clusters, sys.stdout, indent=2)
+    print()
+  else:
+    by_uid = {x["uId"]: x for x in items}
+    for cluster in sorted(clusters, key=len, reverse=True):
+      first = by_uid[cluster[0]]
+      print(f"{len(cluster):>3}  {first.get('skill_cd') or '-':<6} {stem_text(first.get('stem_html'))[:80]}")
+  print(f"{len(clusters)} clusters covering {sum(map(len, clusters))} of {len(items)} items "
+        f"({stats['bands']}x{stats['rows']} bands, {stats['candidate_pairs']} candidate pairs) in {elapsed:.2f}s",
+        file=sys.stderr)
+
+if __name__ == "__main__":
+  main()
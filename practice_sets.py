@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+practice_sets.py
+----------------
+Seeded, difficulty-balanced practice sets per skill, precomputed at build time so a
+client session starts with one small fetch instead of shuffling the whole skill pool.
+
+Each skill's items are grouped by difficulty (E/M/H) and every group gets a seeded
+permutation. Set N takes an even E/M/H share from the next unused items of each
+permutation (topping up from the other levels when one runs short), so consecutive
+sets cover the whole pool before any item repeats. Everything derives from
+(seed, skill, level), so the same bank and seed always give the same sets. Given the
+near-duplicate clusters of near_duplicates.py, a set holds at most one item per cluster.
+
+Usage:
+  python prepare_data.py --input cb-digital-questions.json --out ./data --practice-sets 10
+  python practice_sets.py ./data S.A. 3          # print set 3 for skill S.A. from a build
+
+  from practice_sets import practice_set
+  ids = practice_set(items, "WIC", 3, seed=0)     # same ids as data/practice/WIC/set-003.json
+"""
+import json, os, re, sys, random, argparse
+from collections import defaultdict
+
+LEVELS = ("E", "M", "H")
+DEFAULT_SIZE = 20
+
+def skill_dir(skill_cd):
+  return re.sub(r"[^A-Za-z0-9._-]+", "_", skill_cd) or "_"
+
+def group_by_level(items):
+  """{level: [uId, ...]} in bank order; unknown difficulties are grouped under ''."""
+  groups = defaultdict(list)
+  for x in items:
+    level = x.get("difficulty") or ""
+    groups[level if level in LEVELS else ""].append(x["uId"])
+  return groups
+
+class _Permutation:
+  """Endless seeded stream over one difficulty group; reshuffled with a new seed per pass."""
+
+  def __init__(self, ids, seed, skill_cd, level):
+    self.ids = sorted(ids, key=str)  # bank order must not leak into the sets
+    self.key = f"{seed}:{skill_cd}:{level}"
+    self.round = -1
+    self.order = []
+    self.pos = 0
+
+  def take(self, n, exclude, clusters=None, used=None):
+    """Next n ids not in exclude; with clusters ({uId: cluster}), also none whose
+    cluster is in used. Taken ids (and their clusters) are added to exclude/used."""
+    out = []
+    tries = 0
+    while len(out) < n and tries < 2 * len(self.ids) + n:
+      if self.pos >= len(self.order):
+        self.round += 1
+        self.order = self.ids[:]
+        random.Random(f"{self.key}:{self.round}").shuffle(self.order)
+        self.pos = 0
+      uid = self.order[self.pos]
+      self.pos += 1
+      tries += 1
+      if uid in exclude:
+        continue
+      cluster = clusters.get(uid) if clusters else None
+      if cluster is not None:
+        if cluster in used:
+          continue
+        used.add(cluster)
+      out.append(uid)
+      exclude.add(uid)
+    return out
+
+def iter_practice_sets(groups, skill_cd, seed=0, size=DEFAULT_SIZE, clusters=None):
+  """Yield id lists for sets 0, 1, 2, ... of one skill (endless)."""
+  perms = {level: _Permutation(ids, seed, skill_cd, level) for level, ids in groups.items() if ids}
+  total = sum(len(ids) for ids in groups.values())
+  size = min(size, total)
+  if not size:
+    return
+  n = 0
+  while True:
+    picked, used = set(), set()
+    ids = []
+    levels = [l for l in LEVELS if l in perms]
+    # Even E/M/H split; the remainder goes to the lower levels first
+    quota = {l: size // len(levels) + (1 if i < size % len(levels) else 0) for i, l in enumerate(levels)} if levels else {}
+    for level in levels:
+      ids += perms[level].take(quota[level], picked, clusters, used)
+    # Top up from whatever still has unused items (short levels, ungraded items)
+    for level in levels + [l for l in perms if l not in levels]:
+      if len(ids) >= size:
+        break
+      ids += perms[level].take(size - len(ids), picked, clusters, used)
+    random.Random(f"{seed}:{skill_cd}:set:{n}").shuffle(ids)
+    yield ids
+    n += 1
+
+def practice_sets(items, skill_cd, count, seed=0, size=DEFAULT_SIZE, clusters=None):
+  """The first `count` sets of one skill as lists of uIds."""
+  groups = group_by_level(x for x in items if x.get("skill_cd") == skill_cd)
+  sets = []
+  for ids in iter_practice_sets(groups, skill_cd, seed, size, clusters):
+    if len(sets) >= count:
+      break
+    sets.append(ids)
+  return sets
+
+def practice_set(items, skill_cd, n, seed=0, size=DEFAULT_SIZE, clusters=None):
+  """Set n (0-based) of one skill; identical to the file written at build time."""
+  sets = practice_sets(items, skill_cd, n + 1, seed, size, clusters)
+  return sets[n] if n < len(sets) else []
+
+def write_practice_sets(items, out_dir, count, seed=0, size=DEFAULT_SIZE, clusters=None):
+  """Write practice/<skill>/set-NNN.json for every skill and return the manifest entry."""
+  difficulty = {}
+  by_skill = defaultdict(list)
+  for x in items:
+    if x.get("skill_cd"):
+      by_skill[x["skill_cd"]].append(x)
+      difficulty[x["uId"]] = x.get("difficulty") or ""
+
+  skills = {}
+  for skill_cd, skill_items in sorted(by_skill.items()):
+    rel_dir = f"practice/{skill_dir(skill_cd)}"
+    os.makedirs(os.path.join(out_dir, rel_dir), exist_ok=True)
+    written = 0
+    for n, ids in enumerate(practice_sets(skill_items, skill_cd, count, seed, size, clusters)):
+      mix = defaultdict(int)
+      for uid in ids:
+        mix[difficulty[uid]] += 1
+      with open(os.path.join(out_dir, rel_dir, f"set-{n:03d}.json"), "w", encoding="utf-8") as f:
+        json.dump({"skill_cd": skill_cd, "set": n, "seed": seed, "difficulty": dict(sorted(mix.items())),
+                   "ids": ids}, f, separators=(",",":"))
+      written += 1
+    skills[skill_cd] = {"dir": rel_dir, "count": written}
+  return {"seed": seed, "size": size, "skills": skills}
+
+def load_practice_set(out_dir, skill_cd, n):
+  """Read set n of one skill from a build dir."""
+  with open(os.path.join(out_dir, "practice", skill_dir(skill_cd), f"set-{n:03d}.json"), "r", encoding="utf-8") as f:
+    return json.load(f)
+
+def main():
+  ap = argparse.ArgumentParser(description="Print one precomputed practice set from a build dir")
+  ap.add_argument("out", help="build dir written by prepare_data.py --practice-sets")
+  ap.add_argument("skill", help="skill code, e.g. WIC")
+  ap.add_argument("n", type=int, help="set number (0-based)")
+  args = ap.parse_args()
+  from prepare_data import build_root
+  try:
+    json.dump(load_practice_set(build_root(args.out), args.skill, args.n), sys.stdout, indent=2)
+  except FileNotFoundError:
+    raise SystemExit(f"No set {args.n} for {args.skill} in {args.out}")
+  print()
+
+if __name__ == "__main__":
+  main()
@@ -7,6 +7,11 @@ so the app can be hosted on GitHub Pages (no Flask).
 
 Usage:
   python prepare_data.py --input path/to/cb-digital-questions.json --out ./data --chunk 1000
+  python prepare_data.py --input cb-digital-questions.json --out ./data --cache .normalize-cache.sqlite
+  python prepare_data.py --out ./data --csv podcast_integration/enhanced_csv_output-3.txt --csv-skill WIC
+  python prepare_data.py --input cb-digital-questions.json --out ./data --sqlite questions.sqlite
+  python prepare_data.py --input cb-digital-questions.json --out ./data --chunk-bytes 64k
+  python prepare_data.py --input cb-digital-questions.json --out ./data --versioned --keep-versions 5
 
 It will produce:
   data/
@@ -15,57 +20,121 @@ It will produce:
       part-000.json
       part-001.json
       ...
+      passages.json   (with --passage-pool: shared passages referenced by index)
+    practice/         (with --practice-sets: <skill>/set-NNN.json id lists)
+    rationales/       (with --split-rationales: explanation_html shards + uId index)
+    assets/           (with --extract-assets: inline SVG / base64 figures, named by content hash)
+    facets.json       (with --facet-codes: canonical facet dictionary; items carry "f" codes)
+    clusters.json     (with --near-duplicates: MinHash/LSH near-duplicate clusters of uIds)
+    neighbors/        (with --neighbors: per-skill TF-IDF "more like this" lists keyed by uId)
 
-And (optionally) a derived lookup.json with distinct facets.
+And (optionally) a derived lookup.json with distinct facets, plus stats.json with
+per-skill/per-domain counts. --sqlite also exports every item into one indexed,
+full-text searchable SQLite file (see question_db.py). If <out>/skill-practice-config.json exists (or --config
+is given), its question counts and skill -> shard routing table are rewritten too.
+
+With --versioned the build is never written over the live one. It is staged, named by
+the hash of its contents and moved to data/versions/<hash>/ (chunk files carry their own
+hash too, part-000.<hash>.json), with its own copy of the practice config. Then
+data/current.json, the only mutable file, is swapped to point at it in one os.replace.
+Clients read the pointer and get one build whole, and everything under versions/ (and
+assets/) can be served with a year-long immutable max-age.
 """
-import json, os, argparse, math, re
-from collections import defaultdict
+import json, os, argparse, math, re, csv, html, hashlib, inspect, shutil, sqlite3, base64, binascii, zlib
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+from batch_grader import numeric_keys, parse_numeric
+from build_metrics import StageMetrics
+from facets import FacetDictionary, decode as decode_facets, load_sources as load_facet_sources, strip_coded
+from near_duplicates import DEFAULT_THRESHOLD as NEAR_DUPLICATE_THRESHOLD, cluster_map, find_clusters, write_clusters
+from practice_sets import DEFAULT_SIZE, write_practice_sets
+from question_db import write_sqlite
+from similar_items import DEFAULT_K as NEIGHBORS_K, require_scipy, write_neighbors
+
+INPUT_FORMATS = ("auto", "json", "keyed", "ndjson")
+SNIFF_BYTES = 64 * 1024
+_KEY = re.compile(r'\s*"((?:[^"\\]|\\.)*)"\s*:\s*')
+_SEP = re.compile(r'[\s,]*')
+
+def sniff_format(head:str):
+  """Guess the export format from the start of the file:
+  json   - a JSON array, or an object of {id: item}
+  keyed  - "id": {...}, "id": {...}, ... without the enclosing braces
+  ndjson - one item object per line"""
+  head = head.lstrip("\ufeff \t\r\n")
+  if head.startswith("["):
+    return "json"
+  if head.startswith('"'):
+    return "keyed"
+  if head.startswith("{"):
+    first, nl, rest = head.partition("\n")
+    if nl and rest.lstrip().startswith("{"):
+      try:
+        if isinstance(json.loads(first.strip().rstrip(",")), dict):
+          return "ndjson"
+      except ValueError:
+        pass
+    return "json"
+  raise SystemExit(f"Could not detect input format: expected '[', '{{' or '\"' at byte 0, found {head[:20]!r} "
+                   "(use --format to override)")
+
+def parse_error(input_path, txt, pos, msg):
+  """SystemExit naming the line, column and byte offset of a parse failure."""
+  line = txt.count("\n", 0, pos) + 1
+  col = pos - txt.rfind("\n", 0, pos)
+  offset = len(txt[:pos].encode("utf-8"))
+  return SystemExit(f"Could not parse {input_path}: {msg}: line {line} column {col} (byte {offset})")
+
+def keyed_items(pairs):
+  items = []
+  for k, v in pairs:
+    if isinstance(v, dict):
+      v.setdefault("uId", k)
+    items.append(v)
+  return items
+
+def load_any(input_path:str, fmt:str="auto"):
+  """Load a raw export as a list of item dicts, parsing it exactly once.
 
-def load_any(input_path:str):
-  txt = open(input_path, "r", encoding="utf-8").read().strip()
-  # Try to detect structure: either a dict of {id: obj} or a clean JSON array
-  if txt.startswith("{") and txt.endswith("}"):
+  The format is sniffed from the first 64 KB unless fmt names it (see sniff_format);
+  parse errors report the byte position instead of falling back to other formats."""
+  with open(input_path, "r", encoding="utf-8-sig") as f:
+    txt = f.read()
+  if fmt == "auto":
+    fmt = sniff_format(txt[:SNIFF_BYTES])
+  decoder = json.JSONDecoder()
+
+  if fmt == "json":
     try:
       data = json.loads(txt)
-      # If it's a dict of id->obj, convert to list
-      if isinstance(data, dict):
-        items = []
-        for k, v in data.items():
-          if isinstance(v, dict):
-            v.setdefault("uId", k)
-          items.append(v)
-        return items
-      elif isinstance(data, list):
-        return data
-    except Exception:
-      pass
-
-  # Fallback: attempt to wrap dict-without-braces pattern (keyed entries separated by commas)
-  try:
-    wrapped = "{%s}" % txt.strip().strip(",")
-    wrapped = re.sub(r',\s*}', '}', wrapped)  # trailing comma fix
-    data = json.loads(wrapped)
+    except json.JSONDecodeError as e:
+      raise parse_error(input_path, txt, e.pos, e.msg)
     if isinstance(data, dict):
-      items = []
-      for k, v in data.items():
-        if isinstance(v, dict):
-          v.setdefault("uId", k)
-        items.append(v)
-      return items
-  except Exception:
-    pass
-
-  # Last resort: NDJSON (one object per line)
-  try:
-    items = []
-    for line in txt.splitlines():
-      line = line.strip().rstrip(",")
-      if not line: continue
-      obj = json.loads(line)
-      items.append(obj)
-    return items
-  except Exception as e:
-    raise SystemExit(f"Could not parse input JSON: {e}")
+      return keyed_items(data.items())
+    if isinstance(data, list):
+      return data
+    raise SystemExit(f"Could not parse {input_path}: top-level JSON must be an array or object")
+
+  # keyed and ndjson are scanned value by value; stray commas between entries are tolerated
+  items = []
+  pos = _SEP.match(txt, 0).end()
+  while pos < len(txt):
+    try:
+      if fmt == "keyed":
+        m = _KEY.match(txt, pos)
+        if not m:
+          raise parse_error(input_path, txt, pos, 'expected "id": before item')
+        key = json.loads(f'"{m.group(1)}"')
+        obj, pos = decoder.raw_decode(txt, m.end())
+        items.extend(keyed_items([(key, obj)]))
+      else:
+        obj, pos = decoder.raw_decode(txt, pos)
+        items.append(obj)
+    except json.JSONDecodeError as e:
+      raise parse_error(input_path, txt, e.pos, e.msg)
+    pos = _SEP.match(txt, pos).end()
+  return items
 
 def normalize_module(module_str):
   """Normalize module values to match frontend expectations"""
@@ -98,6 +167,7 @@ def normalize(x:dict)->dict:
   # Handle different question types
   choices = None
   correct_choice_index = None
+  answer_keys = None  # grid-in keys as written upstream
   
   # Check if this is a multiple choice question (Reading & Writing)
   answer_options = content.get("answerOptions", [])
@@ -121,6 +191,7 @@ def normalize(x:dict)->dict:
       # For grid-in questions, don't create fake choices - leave empty for proper UI
       choices = None
       correct_choice_index = None
+      answer_keys = [str(k).strip() for k in math_keys if str(k).strip()]
   elif content.get("answer"):
     # This is a Math question with numerical answer (format 2)
     answer = content.get("answer", "")
@@ -167,6 +238,7 @@ def normalize(x:dict)->dict:
         # Simple answer format - this is a grid-in question
         choices = None
         correct_choice_index = None
+        answer_keys = [str(answer).strip()]
   
   # Get explanation from various locations  
   explanation = (x.get("explanation_html") or 
@@ -188,53 +260,983 @@ def normalize(x:dict)->dict:
     "choices": choices,
     "correct_choice_index": correct_choice_index,
     "explanation_html": explanation,
-    "question_type": "mcq" if answer_options else "numerical"
+    "question_type": "mcq" if answer_options else "numerical",
+    # Equivalent numeric keys collapse to one reduced fraction ("3/2" and "1.5" -> "3/2")
+    "answer_keys": answer_keys,
+    "numeric_keys": numeric_keys(answer_keys) if answer_keys else None
   }
 
-def build_lookup(items):
+def normalizer_version():
+  """Hash of the normalization code; editing it invalidates every cached record."""
+  src = "".join(inspect.getsource(fn) for fn in (normalize_module, normalize, numeric_keys, parse_numeric))
+  return hashlib.sha256(src.encode("utf-8")).hexdigest()[:16]
+
+def raw_item_hash(x):
+  canonical = json.dumps(x, sort_keys=True, separators=(",",":"), ensure_ascii=False, default=str)
+  return hashlib.sha256(canonical.encode("utf-8")).digest()
+
+class NormalizeCache:
+  """sqlite cache of normalize() results keyed by the raw item's canonical hash.
+
+  The normalizer version is stored alongside; when it changes the cache is emptied,
+  so a fix to normalize() is picked up on the next run without manual cleanup."""
+
+  def __init__(self, path, version=None):
+    self.version = version or normalizer_version()
+    self.hits = self.misses = 0
+    self.db = sqlite3.connect(path)
+    self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    self.db.execute("CREATE TABLE IF NOT EXISTS items (hash BLOB PRIMARY KEY, record TEXT)")
+    row = self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    if not row or row[0] != self.version:
+      self.db.execute("DELETE FROM items")
+      self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (self.version,))
+      self.db.commit()
+
+  def normalize_all(self, raw, batch=500):
+    """normalize() every raw item, serving unchanged ones from the cache; entries for
+    items no longer in the export are dropped."""
+    keys = [raw_item_hash(x) for x in raw]
+    cached = {}
+    for i in range(0, len(keys), batch):
+      chunk = keys[i:i+batch]
+      sql = "SELECT hash, record FROM items WHERE hash IN (%s)" % ",".join("?" * len(chunk))
+      cached.update(self.db.execute(sql, chunk))
+    out, fresh = [], []
+    for key, x in zip(keys, raw):
+      record = cached.get(key)
+      if record is not None:
+        out.append(json.loads(record))
+        continue
+      item = normalize(x)
+      out.append(item)
+      fresh.append((key, json.dumps(item, separators=(",",":"), ensure_ascii=False)))
+    self.hits, self.misses = len(raw) - len(fresh), len(fresh)
+
+    self.db.executemany("INSERT OR REPLACE INTO items VALUES (?, ?)", fresh)
+    self.db.execute("CREATE TEMP TABLE IF NOT EXISTS seen (hash BLOB PRIMARY KEY)")
+    self.db.execute("DELETE FROM seen")
+    self.db.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((k,) for k in keys))
+    self.db.execute("DELETE FROM items WHERE hash NOT IN (SELECT hash FROM seen)")
+    self.db.commit()
+    return out
+
+  def close(self):
+    self.db.close()
+
+# Passage pool: long fragments shared by several items (a stimulus reused across
+# questions, a repeated explanation) are stored once in chunks/passages.json and
+# pooled fields become segment lists, where ints index the table and strs are inline.
+POOLED_FIELDS = ("stem_html", "explanation_html")
+POOL_MIN_CHARS = 200
+
+def split_fragments(text):
+  """Split an HTML field after the stimulus/stem newline and each closing </p>; joining restores it."""
+  return [frag for frag in re.split(r"(?<=\n)|(?<=</p>)", text) if frag]
+
+def fragment_key(frag):
+  return hashlib.sha1(frag.encode("utf-8")).digest()
+
+def build_passage_pool(item_lists, passages=None, min_chars=POOL_MIN_CHARS):
+  """Count long fragments across all items; those seen at least twice join the pool.
+  Existing passages keep their ids so earlier chunks stay valid."""
+  passages = list(passages or [])
+  ids = {fragment_key(p): i for i, p in enumerate(passages)}
+  seen = Counter()
+  for items in item_lists:
+    for x in items:
+      for field in POOLED_FIELDS:
+        value = x.get(field)
+        if not isinstance(value, str) or len(value) < min_chars:
+          continue
+        for frag in split_fragments(value):
+          if len(frag) < min_chars:
+            continue
+          key = fragment_key(frag)
+          if key in ids:
+            continue
+          seen[key] += 1
+          if seen[key] == 2:
+            ids[key] = len(passages)
+            passages.append(frag)
+  return passages, ids
+
+def pool_item(x, ids):
+  """Return x with pooled fields rewritten as segment lists (unchanged if nothing is shared)."""
+  out = x
+  for field in POOLED_FIELDS:
+    value = x.get(field)
+    if not isinstance(value, str) or len(value) < POOL_MIN_CHARS:
+      continue
+    segments = []
+    for frag in split_fragments(value):
+      ref = ids.get(fragment_key(frag)) if len(frag) >= POOL_MIN_CHARS else None
+      if ref is not None:
+        segments.append(ref)
+      elif segments and isinstance(segments[-1], str):
+        segments[-1] += frag
+      else:
+        segments.append(frag)
+    if any(isinstance(seg, int) for seg in segments):
+      if out is x:
+        out = dict(x)
+      out[field] = segments
+  return out
+
+class PassagePool:
+  """Reader for a build's passages.json; the table is only loaded once a pooled field is resolved."""
+
+  def __init__(self, path):
+    self.path = path
+    self._passages = None
+
+  @property
+  def passages(self):
+    if self._passages is None:
+      with open(self.path, "r", encoding="utf-8") as f:
+        self._passages = json.load(f)
+    return self._passages
+
+  def resolve(self, value):
+    if isinstance(value, list):
+      return "".join(self.passages[seg] if isinstance(seg, int) else seg for seg in value)
+    return value
+
+  def resolve_item(self, x):
+    pooled = [f for f in POOLED_FIELDS if isinstance(x.get(f), list)]
+    if not pooled:
+      return x
+    return {**x, **{f: self.resolve(x[f]) for f in pooled}}
+
+def write_passage_pool(out_dir, manifest, passages):
+  rel = "chunks/passages.json"
+  if not passages:
+    # Nothing is shared, so no item refers to the pool and clients shouldn't fetch it
+    manifest.pop("passages", None)
+    if os.path.exists(os.path.join(out_dir, rel)):
+      os.remove(os.path.join(out_dir, rel))
+    print("No passages are shared between items; skipped the passage pool")
+    return
+  with open(os.path.join(out_dir, rel), "w", encoding="utf-8") as f:
+    json.dump(passages, f, separators=(",",":"), ensure_ascii=False)
+  manifest["passages"] = {"path": rel, "count": len(passages)}
+  print(f"Pooled {len(passages)} shared passages into {rel}")
+
+def build_lookup_and_stats(parts):
+  """Single pass over (shard path, items) pairs: distinct facets for lookup.json plus
+  per-skill/per-domain counts and the shards each skill's questions live in."""
   facets = defaultdict(set)
+  skills = {}
+  domains = {}
+  total = 0
+  for rel, part in parts:
+    for x in part:
+      total += 1
+      facets["module"].add(x.get("module") or "")
+      facets["domain"].add(x.get("primary_class_cd_desc") or "")
+      facets["difficulty"].add(x.get("difficulty") or "")
+      facets["skill"].add(x.get("skill_desc") or "")
+
+      skill_cd = x.get("skill_cd") or ""
+      domain = x.get("primary_class_cd_desc") or ""
+      difficulty = x.get("difficulty") or ""
+      s = skills.get(skill_cd)
+      if s is None:
+        s = skills[skill_cd] = {"skill_desc": x.get("skill_desc") or "", "domain": domain,
+                                "module": x.get("module") or "", "count": 0,
+                                "difficulty": Counter(), "shards": Counter()}
+      s["count"] += 1
+      s["difficulty"][difficulty] += 1
+      s["shards"][rel] += 1
+      d = domains.get(domain)
+      if d is None:
+        d = domains[domain] = {"module": x.get("module") or "", "count": 0,
+                               "skills": set(), "difficulty": Counter()}
+      d["count"] += 1
+      d["skills"].add(skill_cd)
+      d["difficulty"][difficulty] += 1
+
+  lookup = {k: sorted([v for v in vals if v]) for k, vals in facets.items()}
+  stats = {
+    "count": total,
+    "skills": {k: {**v, "difficulty": dict(v["difficulty"]),
+                   "shards": dict(v["shards"].most_common())}
+               for k, v in sorted(skills.items()) if k},
+    "domains": {k: {**v, "skills": sorted(c for c in v["skills"] if c), "difficulty": dict(v["difficulty"])}
+                for k, v in sorted(domains.items()) if k},
+  }
+  return lookup, stats
+
+def build_lookup(items):
+  return build_lookup_and_stats([("", items)])[0]
+
+def update_practice_config(config_path, stats, url_prefix, manifest=None):
+  """Rewrite skill-practice-config.json question counts, the skill -> shard routing table
+  and the passage pool / practice set locations recorded in the build manifest."""
+  with open(config_path, "r", encoding="utf-8") as f:
+    config = json.load(f)
+  spc = config.get("skillPracticeConfig", config)
+  mappings = spc.get("skillMappings", {})
+  url = lambda rel: f"{url_prefix}/{rel}" if url_prefix else rel
+
+  for code, mapping in mappings.items():
+    mapping["questionCount"] = stats["skills"].get(code, {}).get("count", 0)
+  for domain in spc.get("domainOrganization", {}).values():
+    domain["questionCount"] = sum(stats["skills"].get(code, {}).get("count", 0) for code in domain.get("skills", []))
+
+  # Route each practice skill to the shards holding its questions, fullest first
+  routing = {}
+  shard_load = Counter()
+  for code in mappings:
+    shards = stats["skills"].get(code, {}).get("shards", {})
+    routing[code] = [url(rel) for rel in shards]
+    for rel, n in shards.items():
+      shard_load[url(rel)] += n
+  data_settings = spc.setdefault("dataSettings", {})
+  data_settings["skillShards"] = routing
+  if shard_load:
+    ranked = [p for p, _ in shard_load.most_common()]
+    data_settings["primaryDataSource"] = ranked[0]
+    data_settings["fallbackDataSources"] = ranked[1:]
+  manifest = manifest or {}
+  if manifest.get("passages"):
+    data_settings["passagePool"] = url(manifest["passages"]["path"])
+  else:
+    data_settings.pop("passagePool", None)
+  if manifest.get("facets"):
+    data_settings["facets"] = url(manifest["facets"]["path"])
+  else:
+    data_settings.pop("facets", None)
+  if manifest.get("rationales"):
+    rationales = manifest["rationales"]
+    data_settings["rationales"] = {"perShard": rationales["per_shard"],
+                                   "shards": [url(s["path"]) for s in rationales["shards"]]}
+  else:
+    data_settings.pop("rationales", None)
+  if manifest.get("clusters"):
+    data_settings["duplicateClusters"] = url(manifest["clusters"]["path"])
+  else:
+    data_settings.pop("duplicateClusters", None)
+  if manifest.get("neighbors"):
+    data_settings["neighbors"] = {code: url(s["path"]) for code, s in manifest["neighbors"]["skills"].items()
+                                  if code in mappings}
+  else:
+    data_settings.pop("neighbors", None)
+  if manifest.get("practice"):
+    practice = manifest["practice"]
+    data_settings["practiceSets"] = {
+      "seed": practice["seed"],
+      "skills": {code: {"dir": url(s["dir"]), "count": s["count"]}
+                 for code, s in practice["skills"].items() if code in mappings},
+    }
+  else:
+    data_settings.pop("practiceSets", None)
+  spc["lastUpdated"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+  with open(config_path, "w", encoding="utf-8") as f:
+    json.dump(config, f, indent=2)
+    f.write("\n")
+
+def read_curated_csv(path):
+  """Stream rows of a curated question CSV (QuestionID, Passage, Choices, CorrectAnswer,
+  Rationale, Strategy_Step1..5); rows without a passage or answer are skipped."""
+  with open(path, "r", encoding="utf-8-sig", newline="") as f:
+    for row in csv.DictReader(f):
+      if (row.get("QuestionID") or "").strip() and row.get("Passage") and row.get("CorrectAnswer"):
+        yield row
+
+def curated_strategy(row):
+  steps = [(row.get(f"Strategy_Step{i}") or "").strip() for i in range(1, 6)]
+  pattern = re.search(r"Pattern:\s*([A-Z_]+)", steps[0])
+  strategy = {"pattern": pattern.group(1) if pattern else ""}
+  strategy.update({f"step{i}": step for i, step in enumerate(steps, 1)})
+  return strategy
+
+def curated_item(row, base, skill_cd, skill_desc, domain, n):
+  """Merge a curated CSV row onto its bank item, or build the item from the row alone."""
+  qid = row["QuestionID"].strip()
+  if base is not None:
+    item = dict(base)
+  else:
+    passage = re.sub(r"^ID:\s*\S+\s*", "", row["Passage"].strip())
+    options = [re.sub(r"^[A-Z]\.\s*", "", c.strip()) for c in (row.get("Choices") or "").split("|")]
+    letter = row["CorrectAnswer"].strip().upper()[:1]
+    rationale = re.sub(r"^Rationale\s*", "", (row.get("Rationale") or "").strip())
+    item = {
+      "uId": qid, "questionId": qid, "module": "reading-writing",
+      "primary_class_cd_desc": domain, "skill_cd": skill_cd, "skill_desc": skill_desc,
+      "difficulty": "", "score_band_range_cd": None,
+      "stem_html": f"<p>{html.escape(passage, quote=False)}</p>",
+      "choices": [f"<p>{html.escape(o, quote=False)}</p>" for o in options if o],
+      "correct_choice_index": ord(letter) - ord("A") if letter.isalpha() else None,
+      "explanation_html": f"<p>{html.escape(rationale, quote=False)}</p>" if rationale else "",
+      "question_type": "mcq",
+    }
+  item["uId"] = f"{qid}-{skill_cd.lower()}-{n:03d}"
+  item["strategy"] = curated_strategy(row)
+  return item
+
+def build_curated_set(csv_path, index, skill_cd=None):
+  """Join a curated CSV to normalized items through a questionId -> item index."""
+  rows = read_curated_csv(csv_path)
+  first = next(rows, None)
+  if first is None:
+    return None, []
+  base = index.get(first["QuestionID"].strip())
+  skill_cd = skill_cd or (base or {}).get("skill_cd") or "SET"
+  # Unjoined rows borrow the skill/domain names of any bank item with the same skill code
+  like = next((x for x in index.values() if x.get("skill_cd") == skill_cd), base or {})
+  skill_desc = like.get("skill_desc") or skill_cd
+  domain = like.get("primary_class_cd_desc") or skill_desc
+  items = [curated_item(first, base, skill_cd, skill_desc, domain, 1)]
+  for n, row in enumerate(rows, 2):
+    items.append(curated_item(row, index.get(row["QuestionID"].strip()), skill_cd, skill_desc, domain, n))
+  joined = sum(1 for x in items if x["questionId"] in index)
+  name = re.sub(r"[^a-z0-9]+", "-", skill_desc.lower()).strip("-") or "curated"
+  return {"name": name, "path": f"chunks/{name}.json", "count": len(items), "skill_cd": skill_cd,
+          "joined": joined, "source": os.path.basename(csv_path)}, items
+
+# Inline figures: <svg>...</svg> blocks and base64 data: URIs in stems, choices and
+# explanations are written once to assets/<sha256[:16]>.<ext> and referenced by URL,
+# so the browser (and service worker) can cache each figure independently of chunks.
+ASSET_FIELDS = ("stem_html", "explanation_html")
+# Opening and closing svg tags; svg_spans pairs them by depth so nested <svg>s stay inside
+# their outer figure instead of ending it at the first </svg>
+_SVG_TAG = re.compile(r"<(/?)svg\b[^>]*?(/?)>", re.I)
+_DATA_URI = re.compile(r"data:image/(png|jpe?g|gif|webp|svg\+xml);base64,([A-Za-z0-9+/=\s]+)", re.I)
+_SVG_ATTR = lambda name: re.compile(r'\s%s="([^"]*)"' % name, re.I)
+_SVG_LABEL, _SVG_WIDTH, _SVG_HEIGHT = _SVG_ATTR("aria-label"), _SVG_ATTR("width"), _SVG_ATTR("height")
+_SVG_STYLE = _SVG_ATTR("style")
+ASSET_EXT = {"png": "png", "jpg": "jpg", "jpeg": "jpg", "gif": "gif", "webp": "webp", "svg+xml": "svg"}
+
+def svg_spans(text):
+  """(start, end) of every outermost <svg> element in text; an unclosed one is left alone."""
+  spans, depth, start = [], 0, 0
+  for m in _SVG_TAG.finditer(text):
+    if m.group(1):
+      if depth:
+        depth -= 1
+        if not depth:
+          spans.append((start, m.end()))
+    elif m.group(2):
+      if not depth:
+        spans.append((m.start(), m.end()))
+    else:
+      if not depth:
+        start = m.start()
+      depth += 1
+  return spans
+
+class AssetExtractor:
+  """Moves inline figures into content-addressed files under <out>/assets/."""
+
+  def __init__(self, out_dir, url_prefix):
+    self.dir = os.path.join(out_dir, "assets")
+    self.url_prefix = url_prefix
+    self.files = {}  # file name -> size
+    self.references = 0
+    os.makedirs(self.dir, exist_ok=True)
+
+  def _store(self, data, ext):
+    name = f"{hashlib.sha256(data).hexdigest()[:16]}.{ext}"
+    if name not in self.files:
+      path = os.path.join(self.dir, name)
+      if not os.path.exists(path):
+        with open(path, "wb") as f:
+          f.write(data)
+      self.files[name] = len(data)
+    self.references += 1
+    return f"{self.url_prefix}/assets/{name}" if self.url_prefix else f"assets/{name}"
+
+  def _svg(self, svg):
+    if "xmlns=" not in svg[:svg.find(">")]:
+      svg = svg.replace("<svg", '<svg xmlns="http://www.w3.org/2000/svg"', 1)
+    url = self._store(svg.encode("utf-8"), "svg")
+    tag = svg[:svg.find(">")]
+    attrs = [f'src="{url}"']
+    label = _SVG_LABEL.search(tag)
+    attrs.append(f'alt="{label.group(1)}"' if label else 'alt=""')
+    size = [f"{k}:{v.group(1)}" + ("px" if re.fullmatch(r"[\d.]+", v.group(1)) else "")
+            for k, v in (("width", _SVG_WIDTH.search(tag)), ("height", _SVG_HEIGHT.search(tag))) if v]
+    style = _SVG_STYLE.search(tag)
+    if style and style.group(1).strip():
+      size.append(style.group(1).strip().rstrip(";"))  # inline style wins over width/height
+    if size:
+      attrs.append(f'style="{";".join(size)}"')
+    return f'<img {" ".join(attrs)} class="figure-svg">'
+
+  def _data_uri(self, m):
+    try:
+      data = base64.b64decode(re.sub(r"\s+", "", m.group(2)), validate=True)
+    except (binascii.Error, ValueError):
+      return m.group(0)
+    return self._store(data, ASSET_EXT[m.group(1).lower()])
+
+  def rewrite(self, text):
+    if not text or ("<svg" not in text and "data:image/" not in text):
+      return text
+    parts, pos = [], 0
+    for start, end in svg_spans(text):
+      parts += [text[pos:start], self._svg(text[start:end])]
+      pos = end
+    parts.append(text[pos:])
+    return _DATA_URI.sub(self._data_uri, "".join(parts))
+
+  def extract(self, x):
+    """Return x with figures replaced by asset URLs (x itself if it has none)."""
+    out = x
+    for field in ASSET_FIELDS + ("choices",):
+      value = x.get(field)
+      if field == "choices" and isinstance(value, list):
+        new = [self.rewrite(c) if isinstance(c, str) else c for c in value]
+      elif isinstance(value, str):
+        new = self.rewrite(value)
+      else:
+        continue
+      if new != value:
+        if out is x:
+          out = dict(x)
+        out[field] = new
+    return out
+
+  def manifest_entry(self):
+    return {"dir": "assets", "count": len(self.files), "references": self.references,
+            "bytes": sum(self.files.values()), "files": sorted(f"assets/{name}" for name in self.files)}
+
+# Rationale shards: with --split-rationales, chunk items carry an "ordinal" instead of
+# explanation_html; rationale ordinal n lives at index n % per_shard of
+# rationales/part-{n // per_shard:03d}.json, fetched only when a student needs it.
+def split_rationales(items, out_dir, per_shard):
+  """Write rationale shards and return (body items, manifest entry)."""
+  per_shard = max(1, per_shard)
+  rel_dir = "rationales"
+  os.makedirs(os.path.join(out_dir, rel_dir), exist_ok=True)
+  bodies = []
+  shards = []
+  index = {}
+  for start in range(0, len(items), per_shard):
+    rel = f"{rel_dir}/part-{start // per_shard:03d}.json"
+    texts = []
+    for n, x in enumerate(items[start:start + per_shard], start):
+      body = {k: v for k, v in x.items() if k != "explanation_html"}
+      body["ordinal"] = n
+      bodies.append(body)
+      texts.append(x.get("explanation_html") or "")
+      index[x["uId"]] = n
+    with open(os.path.join(out_dir, rel), "w", encoding="utf-8") as f:
+      json.dump(texts, f, separators=(",",":"), ensure_ascii=False)
+    shards.append({"path": rel, "start": start, "count": len(texts), "bytes": os.path.getsize(os.path.join(out_dir, rel))})
+  with open(os.path.join(out_dir, rel_dir, "index.json"), "w", encoding="utf-8") as f:
+    json.dump(index, f, separators=(",",":"))
+  return bodies, {"per_shard": per_shard, "count": len(items), "index": f"{rel_dir}/index.json", "shards": shards}
+
+class RationaleShards:
+  """Reader for a build's rationale shards; each shard is read the first time one of its
+  ordinals is asked for, and the most recent one is kept (chunks are read in order)."""
+
+  def __init__(self, out_dir, entry):
+    self.out_dir = out_dir
+    self.entry = entry
+    self._shard = None
+    self._texts = None
+
+  def __getitem__(self, ordinal):
+    shard = ordinal // self.entry["per_shard"]
+    if shard != self._shard:
+      with open(os.path.join(self.out_dir, self.entry["shards"][shard]["path"]), "r", encoding="utf-8") as f:
+        self._texts = json.load(f)
+      self._shard = shard
+    return self._texts[ordinal % self.entry["per_shard"]]
+
+  def attach(self, x):
+    """The item as an unsplit build would have it: explanation_html back, no ordinal."""
+    if "ordinal" not in x:
+      return x
+    item = {k: v for k, v in x.items() if k != "ordinal"}
+    item["explanation_html"] = self[x["ordinal"]]
+    return item
+
+def manifest_pool(out_dir, manifest):
+  """PassagePool for a build's manifest, or None if the build is not pooled."""
+  passages = manifest.get("passages")
+  return PassagePool(os.path.join(out_dir, passages["path"])) if passages else None
+
+def load_items(out_dir, rel, pool=None):
+  """Yield the items of one chunk file, resolving pooled fields as each item is read."""
+  with open(os.path.join(out_dir, rel), "r", encoding="utf-8") as f:
+    items = json.load(f)
   for x in items:
-    facets["module"].add(x.get("module") or "")
-    facets["domain"].add(x.get("primary_class_cd_desc") or "")
-    facets["difficulty"].add(x.get("difficulty") or "")
-    facets["skill"].add(x.get("skill_desc") or "")
-  return {k: sorted([v for v in vals if v]) for k, vals in facets.items()}
+    yield pool.resolve_item(x) if pool else x
+
+def build_root(out_dir):
+  """Directory holding the manifest of the build in out_dir: the version current.json
+  points at for --versioned builds, else out_dir itself."""
+  pointer = os.path.join(out_dir, POINTER)
+  if not os.path.exists(pointer):
+    return out_dir
+  with open(pointer, "r", encoding="utf-8") as f:
+    return os.path.join(out_dir, json.load(f)["path"])
+
+def load_chunks(out_dir):
+  """Yield the normalized items of an existing build, shard by shard."""
+  out_dir = build_root(out_dir)
+  with open(os.path.join(out_dir, "manifest.json"), "r", encoding="utf-8") as f:
+    manifest = json.load(f)
+  pool = manifest_pool(out_dir, manifest)
+  rationales = RationaleShards(out_dir, manifest["rationales"]) if manifest.get("rationales") else None
+  facets = None
+  if manifest.get("facets"):
+    with open(os.path.join(out_dir, manifest["facets"]["path"]), "r", encoding="utf-8") as f:
+      facets = json.load(f)
+  for chunk in manifest["chunks"]:
+    for x in load_items(out_dir, chunk["path"], pool):
+      if rationales:
+        x = rationales.attach(x)
+      yield decode_facets(x, facets) if facets else x
+
+def build_curated_sets(csv_paths, items, skill_cd=None):
+  """Build (entry, items) for each curated CSV, joined to the bank by questionId."""
+  index = {x["questionId"]: x for x in items if x.get("questionId")}
+  built = []
+  for csv_path in csv_paths:
+    entry, curated = build_curated_set(csv_path, index, skill_cd)
+    if entry is None:
+      print(f"No curated rows in {csv_path}")
+      continue
+    built.append((entry, curated))
+  return built
+
+def kept_curated_sets(out_dir, manifest, built):
+  """Load the sets of an earlier build that are not being re-ingested, so they can be rewritten."""
+  fresh = {entry["name"] for entry, _ in built}
+  pool = manifest_pool(out_dir, manifest)
+  return [(entry, list(load_items(out_dir, entry["path"], pool)))
+          for entry in manifest.get("sets", [])
+          if entry["name"] not in fresh and os.path.exists(os.path.join(out_dir, entry["path"]))]
+
+def write_curated_sets(built, out_dir, manifest, pool_ids=None):
+  """Write one enriched chunk per curated set and record it under manifest["sets"]."""
+  sets = {s["name"]: s for s in manifest.get("sets", [])}
+  for entry, curated in built:
+    if pool_ids:
+      curated = [pool_item(x, pool_ids) for x in curated]
+    with open(os.path.join(out_dir, entry["path"]), "w", encoding="utf-8") as f:
+      json.dump(curated, f, indent=2, ensure_ascii=False)
+    sets[entry["name"]] = entry
+    print(f"Wrote {entry['count']} curated items ({entry['joined']} joined to the bank) into {entry['path']}")
+  manifest["sets"] = list(sets.values())
+
+def write_chunks(items, out_dir, chunk_size, manifest, encode=None, chunk_bytes=None):
+  """Write items into chunks/part-NNN.json of chunk_size items each, list them in
+  manifest["chunks"] and return the (path, items) pairs. encode, if given, maps each
+  item to its stored form (passage pooling, facet stripping). With chunk_bytes, chunks
+  are packed to a gzip size budget instead (see pack_by_gzip_size)."""
+  if chunk_bytes:
+    return pack_by_gzip_size(items, out_dir, chunk_bytes, manifest, encode)
+  csize = max(1, chunk_size)
+  parts = []
+  for i in range(math.ceil(len(items) / csize)):
+    part = items[i*csize:(i+1)*csize]
+    rel = f"chunks/part-{i:03d}.json"
+    with open(os.path.join(out_dir, rel), "w", encoding="utf-8") as f:
+      json.dump([encode(x) for x in part] if encode else part, f, separators=(",",":"))
+    manifest["chunks"].append({"path": rel, "count": len(part)})
+    parts.append((rel, part))
+  return parts
+
+POINTER = "current.json"
+VERSIONS = "versions"
+
+def staging_dir(out_dir):
+  """Empty directory under versions/ to build the next version in."""
+  path = os.path.join(out_dir, VERSIONS, f".staging-{os.getpid()}")
+  shutil.rmtree(path, ignore_errors=True)
+  os.makedirs(path)
+  return path
+
+def hash_chunk_names(out_dir, manifest, parts):
+  """Rename chunks/part-NNN.json to part-NNN.<content hash>.json in place, in the
+  manifest and in the returned (path, items) pairs."""
+  renamed = []
+  for chunk, (rel, part) in zip(manifest["chunks"], parts):
+    with open(os.path.join(out_dir, rel), "rb") as f:
+      digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    new_rel = f"{os.path.splitext(rel)[0]}.{digest}.json"
+    os.replace(os.path.join(out_dir, rel), os.path.join(out_dir, new_rel))
+    chunk["path"] = new_rel
+    renamed.append((new_rel, part))
+  return renamed
+
+def tree_digest(root, extra=b""):
+  """sha256 hex digest of every file under root (relative path and contents, in path
+  order) plus extra."""
+  h = hashlib.sha256()
+  for dirpath, dirnames, filenames in os.walk(root):
+    dirnames.sort()
+    for name in sorted(filenames):
+      path = os.path.join(dirpath, name)
+      h.update(os.path.relpath(path, root).replace(os.sep, "/").encode("utf-8") + b"\0")
+      with open(path, "rb") as f:
+        h.update(hashlib.sha256(f.read()).digest())
+  h.update(extra)
+  return h.hexdigest()
+
+def publish_version(out_dir, staging, manifest, stats, config_path=None, url_prefix=""):
+  """Move a finished staging build to versions/<content hash>/ and point current.json
+  at it. The version directory gets its own practice config, with shard URLs under the
+  version, so the template at config_path is left untouched. current.json is replaced
+  atomically; a version already published with the same contents is reused as is.
+  Returns the pointer."""
+  template = b""
+  if config_path and os.path.exists(config_path):
+    with open(config_path, "rb") as f:
+      template = f.read()
+  version = tree_digest(staging, template)[:16]
+  rel = f"{VERSIONS}/{version}"
+  final = os.path.join(out_dir, rel)
+  if os.path.exists(final):
+    shutil.rmtree(staging)
+  else:
+    if template:
+      version_config = os.path.join(staging, "skill-practice-config.json")
+      shutil.copyfile(config_path, version_config)
+      update_practice_config(version_config, stats, f"{url_prefix}/{rel}" if url_prefix else rel, manifest)
+    os.rename(staging, final)
+  os.utime(final)  # publish time, for --keep-versions
+  pointer = {"version": version, "path": rel, "manifest": f"{rel}/manifest.json", "count": manifest["count"],
+             "published": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}
+  if os.path.exists(os.path.join(final, "skill-practice-config.json")):
+    pointer["config"] = f"{rel}/skill-practice-config.json"
+  tmp = os.path.join(out_dir, POINTER + ".tmp")
+  with open(tmp, "w", encoding="utf-8") as f:
+    json.dump(pointer, f, indent=2)
+    f.flush()
+    os.fsync(f.fileno())
+  os.replace(tmp, os.path.join(out_dir, POINTER))
+  return pointer
+
+def prune_versions(out_dir, keep):
+  """Delete all but the keep most recently published versions (never the current one).
+  Older versions stay around so clients that loaded their pointer before a publish can
+  finish reading; keep enough to outlast a session."""
+  current = os.path.basename(build_root(out_dir))
+  root = os.path.join(out_dir, VERSIONS)
+  versions = sorted((d for d in os.listdir(root) if not d.startswith(".") and d != current),
+                    key=lambda d: os.path.getmtime(os.path.join(root, d)), reverse=True)
+  removed = versions[max(0, keep - 1):]
+  for d in removed:
+    shutil.rmtree(os.path.join(root, d))
+  return removed
+
+GZIP_LEVEL = 6  # what static hosts typically serve
+
+def parse_size(text):
+  """Byte count from "65536", "64k" or "1m"."""
+  m = re.fullmatch(r"\s*(\d+)\s*([kKmM]?)[bB]?\s*", text)
+  if not m:
+    raise argparse.ArgumentTypeError(f"not a size: {text!r} (e.g. 65536, 64k, 1m)")
+  return int(m.group(1)) * {"": 1, "k": 1024, "m": 1024 * 1024}[m.group(2).lower()]
+
+def pack_by_gzip_size(items, out_dir, budget, manifest, encode=None):
+  """Pack consecutive items into chunks whose gzipped size stays within budget bytes
+  (a single larger item gets a chunk of its own), so shards have near-uniform transfer
+  sizes however long the passages or figures in them are.
+
+  Each chunk's JSON is fed to a streaming gzip compressor as items are added; deflate
+  output does not depend on how the input is split, so copying the compressor and
+  flushing the copy gives the exact size the finished file would have. That exact
+  check is skipped while the last exact size plus every raw byte added since (deflate
+  never grows data by more than a few bytes per block) is still under the budget.
+  Manifest entries record bytes and gzip_bytes per chunk."""
+  slack = 64  # gzip trailer and stored-block headers
+  parts = []
+  start = 0
+
+  def close(z, produced):
+    return produced + len(z.compress(b"]")) + len(z.flush())
+
+  def finish(end, bodies, gz):
+    data = b"[" + b",".join(bodies) + b"]"
+    rel = f"chunks/part-{len(parts):03d}.json"
+    with open(os.path.join(out_dir, rel), "wb") as f:
+      f.write(data)
+    manifest["chunks"].append({"path": rel, "count": end - start, "bytes": len(data), "gzip_bytes": gz})
+    parts.append((rel, items[start:end]))
+
+  z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+  produced = len(z.compress(b"["))
+  exact, pending = 20, 1  # last exact size, raw bytes added since it was measured
+  bodies = []
+  for i, x in enumerate(items):
+    body = json.dumps(encode(x) if encode else x, separators=(",",":")).encode("utf-8")
+    piece = (b"," if bodies else b"") + body
+    # Keep the stream as it was before this item in case the item has to move on
+    before = (z.copy(), produced) if bodies and exact + pending + len(piece) + slack > budget else None
+    produced += len(z.compress(piece))
+    pending += len(piece)
+    bodies.append(body)
+    if before is None:
+      continue
+    size = close(z.copy(), produced)
+    if size <= budget:
+      exact, pending = size, 0
+      continue
+    # This item overflows the budget: close the chunk before it and start over with it
+    finish(i, bodies[:-1], close(*before))
+    start = i
+    z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    produced = len(z.compress(b"[" + body))
+    exact, pending = 20, 1 + len(body)
+    bodies = [body]
+  if bodies:
+    finish(len(items), bodies, close(z, produced))
+  return parts
 
 def main():
   ap = argparse.ArgumentParser()
-  ap.add_argument("--input", required=True)
+  ap.add_argument("--input", help="raw question export; optional with --csv, which then joins against the existing build in --out")
+  ap.add_argument("--format", choices=INPUT_FORMATS, default="auto",
+                  help="input layout: json array/object, keyed (\"id\": {...} entries without braces), ndjson")
   ap.add_argument("--out", default="./data")
   ap.add_argument("--chunk", type=int, default=1000)
+  ap.add_argument("--chunk-bytes", type=parse_size, metavar="SIZE",
+                  help="instead of --chunk items per file, pack chunks up to SIZE gzipped bytes each (e.g. 64k); "
+                       "per-chunk bytes and gzip_bytes are recorded in the manifest")
+  ap.add_argument("--config", help="skill-practice-config.json to update (default: <out>/skill-practice-config.json if present)")
+  ap.add_argument("--url-prefix", help="prefix for shard URLs written to the config (default: --out relative to cwd)")
+  ap.add_argument("--csv", action="append", default=[], help="curated question CSV to join by questionId (repeatable)")
+  ap.add_argument("--csv-skill", help="skill code for curated items (default: the joined items' skill_cd)")
+  ap.add_argument("--cache", help="sqlite file caching normalized items between runs (e.g. .normalize-cache.sqlite)")
+  ap.add_argument("--practice-sets", type=int, default=0, metavar="N",
+                  help="precompute N seeded, difficulty-balanced practice sets per skill under practice/")
+  ap.add_argument("--set-size", type=int,
+                  help="questions per practice set (default: the config's maxQuestionsPerSession, else 20)")
+  ap.add_argument("--seed", type=int, default=0, help="seed for --practice-sets")
+  ap.add_argument("--near-duplicates", type=float, nargs="?", const=NEAR_DUPLICATE_THRESHOLD, default=0,
+                  metavar="THRESHOLD",
+                  help="cluster near-duplicate stems (MinHash/LSH, estimated Jaccard >= THRESHOLD, default "
+                       f"{NEAR_DUPLICATE_THRESHOLD}) into clusters.json; practice sets take one item per cluster")
+  ap.add_argument("--neighbors", type=int, nargs="?", const=NEIGHBORS_K, default=0, metavar="K",
+                  help=f"write the K (default {NEIGHBORS_K}) most similar items of the same skill per item "
+                       "to neighbors/<skill>.json (TF-IDF cosine; needs numpy and scipy)")
+  ap.add_argument("--passage-pool", action="store_true",
+                  help="store passages/explanations shared by several items once in chunks/passages.json")
+  ap.add_argument("--extract-assets", action="store_true",
+                  help="move inline <svg> and base64 images into content-addressed files under assets/")
+  ap.add_argument("--facet-codes", action="store_true",
+                  help="canonicalize module/domain/skill/difficulty against the taxonomy, store integer codes "
+                       "per item and the shared dictionary in facets.json")
+  ap.add_argument("--taxonomy", help="sat-taxonomy.json for --facet-codes (default: <out>/sat-taxonomy.json)")
+  ap.add_argument("--split-rationales", type=int, nargs="?", const=200, default=0, metavar="PER_SHARD",
+                  help="move explanation_html out of the chunks into rationales/part-NNN.json shards "
+                       "(default 200 rationales each), linked by item ordinal")
+  ap.add_argument("--sqlite", metavar="PATH",
+                  help="also export the items to an SQLite file with facet indexes and FTS5 stem search (see question_db.py)")
+  ap.add_argument("--versioned", action="store_true",
+                  help="write the build to versions/<content hash>/ with hashed chunk names and publish it by "
+                       "atomically replacing current.json; published files are never modified")
+  ap.add_argument("--keep-versions", type=int, default=0, metavar="N",
+                  help="with --versioned, delete all but the N most recently published versions (default: keep all)")
+  ap.add_argument("--metrics-out", metavar="PATH", help="write per-stage wall/CPU time, peak RSS growth, items/s and bytes written as JSON")
+  ap.add_argument("--profile", nargs="?", const="auto", metavar="STAGE",
+                  help="cProfile one stage (default: every stage, keeping the slowest) into <metrics-out>.prof")
   args = ap.parse_args()
+  if not args.input and not args.csv:
+    ap.error("--input is required unless --csv is given")
+  if args.neighbors:
+    require_scipy()
+  if os.path.exists(os.path.join(args.out, POINTER)):
+    # Published versions are never written in place, so once versioned, always versioned
+    args.versioned = True
+  elif args.versioned and not args.input:
+    ap.error(f"--versioned without --input needs a published version ({POINTER}) to add curated sets to")
 
   os.makedirs(args.out, exist_ok=True)
-  chunks_dir = os.path.join(args.out, "chunks")
-  os.makedirs(chunks_dir, exist_ok=True)
+  config_path = args.config or os.path.join(args.out, "skill-practice-config.json")
+  url_prefix = args.url_prefix if args.url_prefix is not None else os.path.relpath(args.out).replace(os.sep, "/")
+  # The live build, and the directory this run writes to (a fresh one with --versioned)
+  previous_dir = build_root(args.out)
+  out_dir = staging_dir(args.out) if args.versioned else args.out
+  os.makedirs(os.path.join(out_dir, "chunks"), exist_ok=True)
 
-  raw = load_any(args.input)
-  items = [normalize(x) for x in raw if (x.get("uId") or x.get("id") or x.get("questionId"))]
+  if not args.input:
+    # Curated-only rebuild: join the CSVs against the current build and update its manifest
+    if args.versioned:
+      # ... in a copy of it, published as a new version
+      shutil.rmtree(out_dir)
+      shutil.copytree(previous_dir, out_dir, ignore=shutil.ignore_patterns("skill-practice-config.json"))
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+      manifest = json.load(f)
+    built = build_curated_sets(args.csv, load_chunks(out_dir), args.csv_skill)
+    pool_ids = None
+    if args.passage_pool or manifest.get("passages"):
+      # Extend the existing pool; bank chunks keep referring to the same ids
+      pool = manifest_pool(out_dir, manifest)
+      passages, pool_ids = build_passage_pool([c for _, c in built], pool.passages if pool else None)
+      write_passage_pool(out_dir, manifest, passages)
+    write_curated_sets(built, out_dir, manifest, pool_ids)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+      json.dump(manifest, f, indent=2)
+    if args.versioned:
+      with open(os.path.join(out_dir, "stats.json"), "r", encoding="utf-8") as f:
+        stats = json.load(f)
+      pointer = publish_version(args.out, out_dir, manifest, stats, config_path, url_prefix)
+      print(f"Published version {pointer['version']}; {POINTER} now points at {pointer['path']}")
+    return
+
+  metrics = StageMetrics(args.out, enabled=bool(args.metrics_out), profile=args.profile)
+  with metrics.stage("load") as stage:
+    raw = load_any(args.input, args.format)
+    raw = [x for x in raw if (x.get("uId") or x.get("id") or x.get("questionId"))]
+    stage.items = len(raw)
+    stage.result["input_bytes"] = os.path.getsize(args.input)
+  with metrics.stage("normalize", len(raw)) as stage:
+    if args.cache:
+      cache = NormalizeCache(args.cache)
+      items = cache.normalize_all(raw)
+      cache.close()
+      stage.result.update(cache_hits=cache.hits, cache_misses=cache.misses)
+      print(f"Normalize cache: {cache.hits} hits, {cache.misses} misses ({args.cache})")
+    else:
+      items = [normalize(x) for x in raw]
 
-  # shard
   N = len(items)
-  csize = max(1, args.chunk)
-  n_parts = math.ceil(N / csize)
   manifest = {"version":1, "count": N, "chunks":[]}
-  for i in range(n_parts):
-    part = items[i*csize:(i+1)*csize]
-    rel = f"chunks/part-{i:03d}.json"
-    with open(os.path.join(chunks_dir, f"part-{i:03d}.json"), "w", encoding="utf-8") as f:
-      json.dump(part, f, separators=(",",":"))
-    manifest["chunks"].append({"path": rel, "count": len(part)})
 
-  with open(os.path.join(args.out, "manifest.json"), "w", encoding="utf-8") as f:
-    json.dump(manifest, f, indent=2)
+  facet_dictionary = None
+  if args.facet_codes:
+    with metrics.stage("facets", N):
+      taxonomy_path = args.taxonomy or os.path.join(args.out, "sat-taxonomy.json")
+      facet_dictionary = FacetDictionary.build(items, *load_facet_sources(taxonomy_path, config_path))
+      items = [facet_dictionary.encode(x) for x in items]
+      with open(os.path.join(out_dir, "facets.json"), "w", encoding="utf-8") as f:
+        json.dump(facet_dictionary.to_json(), f, indent=2, ensure_ascii=False)
+      manifest["facets"] = {"path": "facets.json",
+                            "counts": {k: len(v) for k, v in facet_dictionary.entries.items()}}
+    print("Facet dictionary: " + ", ".join(f"{n} {k}" for k, n in manifest["facets"]["counts"].items()))
+
+  # Curated sets from earlier builds stay listed unless their CSV is re-ingested
+  with metrics.stage("curated") as stage:
+    built = build_curated_sets(args.csv, items, args.csv_skill) if args.csv else []
+    previous_manifest = os.path.join(previous_dir, "manifest.json")
+    if os.path.exists(previous_manifest):
+      with open(previous_manifest, "r", encoding="utf-8") as f:
+        previous = json.load(f)
+      built = kept_curated_sets(previous_dir, previous, built) + built
+    if facet_dictionary:
+      built = [(entry, [facet_dictionary.encode(x) for x in curated]) for entry, curated in built]
+    stage.items = sum(len(c) for _, c in built)
+
+  if args.extract_assets:
+    # Assets are content-addressed already, so versions share one assets/ dir
+    with metrics.stage("assets", N) as stage:
+      extractor = AssetExtractor(args.out, url_prefix)
+      items = [extractor.extract(x) for x in items]
+      built = [(entry, [extractor.extract(x) for x in curated]) for entry, curated in built]
+      manifest["assets"] = extractor.manifest_entry()
+      stage.result["assets"] = manifest["assets"]["count"]
+    print(f"Extracted {extractor.references} inline figures into {manifest['assets']['count']} assets "
+          f"({manifest['assets']['bytes']} bytes) under assets/")
+
+  bodies = items
+  if args.split_rationales:
+    with metrics.stage("rationales", N):
+      bodies, manifest["rationales"] = split_rationales(items, out_dir, args.split_rationales)
+    print(f"Split {N} rationales into {len(manifest['rationales']['shards'])} shards under rationales/")
+
+  pool_ids = None
+  if args.passage_pool:
+    with metrics.stage("passage_pool", N):
+      passages, pool_ids = build_passage_pool([bodies] + [c for _, c in built])
+      write_passage_pool(out_dir, manifest, passages)
+
+  # shard
+  with metrics.stage("write_chunks", N):
+    encoders = ([lambda x: pool_item(x, pool_ids)] if pool_ids else []) + ([strip_coded] if facet_dictionary else [])
+    def encode(x):
+      for fn in encoders:
+        x = fn(x)
+      return x
+    parts = write_chunks(bodies, out_dir, args.chunk, manifest, encode if encoders else None, args.chunk_bytes)
+    if args.versioned:
+      parts = hash_chunk_names(out_dir, manifest, parts)
+    n_parts = len(parts)
+    if built:
+      write_curated_sets(built, out_dir, manifest, pool_ids)
+  if args.chunk_bytes:
+    sizes = sorted(c["gzip_bytes"] for c in manifest["chunks"])
+    print(f"Packed {n_parts} chunks to a {args.chunk_bytes}-byte gzip budget: "
+          f"{sizes[0]}/{sizes[len(sizes) // 2]}/{sizes[-1]} bytes min/median/max")
+
+  clusters = None
+  if args.near_duplicates:
+    with metrics.stage("near_duplicates", N) as stage:
+      found = find_clusters(items + [x for _, curated in built for x in curated], args.near_duplicates,
+                            stats=stage.result)
+      manifest["clusters"] = write_clusters(found, out_dir, args.near_duplicates, stage.result)
+      clusters = cluster_map(found)
+    print(f"Found {manifest['clusters']['count']} near-duplicate clusters covering "
+          f"{manifest['clusters']['items']} items (clusters.json)")
+
+  if args.neighbors:
+    with metrics.stage("neighbors", N):
+      manifest["neighbors"] = write_neighbors(items, out_dir, args.neighbors)
+    print(f"Wrote {args.neighbors} neighbors per item for {len(manifest['neighbors']['skills'])} skills into neighbors/")
+
+  if args.practice_sets:
+    with metrics.stage("practice_sets", N):
+      size = args.set_size
+      if not size and os.path.exists(config_path):
+        with open(config_path, "r", encoding="utf-8") as f:
+          config = json.load(f)
+        size = config.get("skillPracticeConfig", config).get("dataSettings", {}).get("maxQuestionsPerSession")
+      manifest["practice"] = write_practice_sets(items, out_dir, args.practice_sets, args.seed, size or DEFAULT_SIZE,
+                                                 clusters)
+    print(f"Wrote {args.practice_sets} practice sets for {len(manifest['practice']['skills'])} skills into practice/")
+
+  if args.sqlite:
+    with metrics.stage("sqlite", N) as stage:
+      summary = write_sqlite(items, args.sqlite, [(entry["name"], curated) for entry, curated in built])
+      stage.result["sqlite_bytes"] = summary["bytes"]
+    print(f"Exported {summary['count']} items to {args.sqlite} ({summary['bytes']} bytes"
+          f"{', FTS5 stem index' if summary['fts5'] else ', no FTS5 in this sqlite3 build'})")
+
+  with metrics.stage("manifest"):
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+      json.dump(manifest, f, indent=2)
+
+  # optional lookup, plus per-skill/per-domain stats from the same pass
+  with metrics.stage("lookup_stats", N):
+    lookup, stats = build_lookup_and_stats(parts)
+    with open(os.path.join(out_dir, "lookup.json"), "w", encoding="utf-8") as f:
+      json.dump(lookup, f, indent=2)
+    with open(os.path.join(out_dir, "stats.json"), "w", encoding="utf-8") as f:
+      json.dump(stats, f, indent=2)
+
+  if args.versioned:
+    with metrics.stage("publish"):
+      pointer = publish_version(args.out, out_dir, manifest, stats, config_path, url_prefix)
+      removed = prune_versions(args.out, args.keep_versions) if args.keep_versions else []
+    print(f"Published version {pointer['version']}; {POINTER} now points at {pointer['path']}"
+          + (f" (removed {len(removed)} older versions)" if removed else ""))
+  elif os.path.exists(config_path):
+    with metrics.stage("config"):
+      update_practice_config(config_path, stats, url_prefix, manifest)
+    print(f"Updated question counts and skill shard routing in {config_path}")
 
-  # optional lookup
-  lookup = build_lookup(items)
-  with open(os.path.join(args.out, "lookup.json"), "w", encoding="utf-8") as f:
-    json.dump(lookup, f, indent=2)
+  if metrics.enabled:
+    profile_path = None
+    if args.profile:
+      profile_path = (os.path.splitext(args.metrics_out)[0] if args.metrics_out else "prepare_data") + ".prof"
+    report = metrics.write(args.metrics_out, profile_path)
+    metrics.print_summary()
+    if args.metrics_out:
+      print(f"Metrics written to {args.metrics_out}")
+    if report["profile"]:
+      print(f"cProfile of the {report['profile']['stage']} stage written to {profile_path} (python -m pstats {profile_path})")
 
-  print(f"Wrote {N} items across {n_parts} chunks into {args.out}")
+  print(f"Wrote {N} items across {n_parts} chunks into {build_root(args.out)}")
   print("Done. Ship the entire 'data' dir to GitHub along with index.html/styles.css/app.js.")
 if __name__ == "__main__":
   main()
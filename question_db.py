@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+question_db.py
+--------------
+SQLite export of the normalized bank, so analysts and internal tools can ask "hard
+geometry items with figures" without re-loading chunk JSON. One row per item with
+B-tree indexes on the facet columns, the full item as JSON, and an FTS5 index over the
+cleaned stem text (tags, entities and inline figures stripped).
+
+Usage:
+  python prepare_data.py --input cb-digital-questions.json --out ./data --sqlite questions.sqlite
+  python question_db.py questions.sqlite --domain "Geometry and Trigonometry" --difficulty H --figures
+  python question_db.py questions.sqlite --search "area AND triangle" --module math --limit 5
+
+  from question_db import QuestionDB
+  db = QuestionDB("questions.sqlite")
+  items = db.find(module="math", difficulty="H", has_figure=True)
+  hits = db.search("quadratic", skill_cd=["H.A.", "H.B."])
+"""
+import json, os, re, sys, html, sqlite3, time, argparse
+
+SCHEMA_VERSION = 1
+# Filterable columns, each with its own B-tree index
+INDEXED_COLUMNS = ("module", "domain", "skill_cd", "difficulty", "question_type")
+FILTER_COLUMNS = INDEXED_COLUMNS + ("has_figure", "score_band", "curated_set")
+_BLOCK = re.compile(r"<(svg|script|style)\b.*?</\1\s*>", re.S | re.I)
+_TAG = re.compile(r"<[^>]+>")
+_FIGURE = re.compile(r"<svg\b|<img\b[^>]*>", re.I)
+# Inline equations are rendered as <img role="math" class="math-img"> and are not figures
+_MATH_IMG = re.compile(r"""\brole\s*=\s*["']?math\b|\bmath-img\b""", re.I)
+
+def stem_text(stem_html):
+  """Plain text of a stem for full-text search."""
+  text = _TAG.sub(" ", _BLOCK.sub(" ", stem_html or ""))
+  return re.sub(r"\s+", " ", html.unescape(text)).strip()
+
+def _has_figure(markup):
+  return any(not _MATH_IMG.search(m.group(0)) for m in _FIGURE.finditer(markup))
+
+def has_figure(x):
+  return _has_figure(x.get("stem_html") or "") or any(_has_figure(c) for c in x.get("choices") or [] if isinstance(c, str))
+
+def _band(value):
+  try:
+    return int(value)
+  except (TypeError, ValueError):
+    return None
+
+def item_row(x, curated_set=None):
+  return (x.get("uId"), x.get("questionId"), x.get("module") or "", x.get("primary_class_cd_desc") or "",
+          x.get("skill_cd") or "", x.get("skill_desc") or "", x.get("difficulty") or "",
+          _band(x.get("score_band_range_cd")), x.get("question_type") or "", int(has_figure(x)),
+          curated_set, stem_text(x.get("stem_html")), json.dumps(x, ensure_ascii=False, separators=(",",":")))
+
+def fts5_available(conn):
+  try:
+    conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+    conn.execute("DROP TABLE temp.fts5_probe")
+    return True
+  except sqlite3.OperationalError:
+    return False
+
+def write_sqlite(items, path, curated=()):
+  """Write items (plus (set name, items) pairs from curated sets) into a fresh SQLite
+  file at path and return a summary for the manifest. The file is built next to path
+  and moved into place, so readers never open a half-written database."""
+  tmp = path + ".tmp"
+  if os.path.exists(tmp):
+    os.remove(tmp)
+  conn = sqlite3.connect(tmp)
+  # A rebuild starts from scratch, so durability during the build buys nothing
+  conn.execute("PRAGMA journal_mode=OFF")
+  conn.execute("PRAGMA synchronous=OFF")
+  fts = fts5_available(conn)
+  with conn:
+    conn.execute("""CREATE TABLE items (
+      id INTEGER PRIMARY KEY, uId TEXT, questionId TEXT, module TEXT, domain TEXT,
+      skill_cd TEXT, skill_desc TEXT, difficulty TEXT, score_band INTEGER, question_type TEXT,
+      has_figure INTEGER, curated_set TEXT, stem_text TEXT, item TEXT)""")
+    conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.executemany("INSERT INTO items (uId, questionId, module, domain, skill_cd, skill_desc, difficulty, "
+                     "score_band, question_type, has_figure, curated_set, stem_text, item) "
+                     "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                     [item_row(x) for x in items] +
+                     [item_row(x, name) for name, curated_items in curated for x in curated_items])
+    # Indexes after the bulk insert: one sort per index instead of per-row B-tree updates
+    conn.execute("CREATE INDEX idx_items_uId ON items (uId)")
+    for column in INDEXED_COLUMNS:
+      conn.execute(f"CREATE INDEX idx_items_{column} ON items ({column})")
+    if fts:
+      conn.execute("CREATE VIRTUAL TABLE stems USING fts5(stem_text, content='items', content_rowid='id')")
+      conn.execute("INSERT INTO stems (stems) VALUES ('rebuild')")
+    conn.executemany("INSERT INTO meta VALUES (?, ?)", [("schema_version", str(SCHEMA_VERSION)), ("fts5", str(int(fts)))])
+  conn.execute("ANALYZE")  # lets the planner pick the most selective facet index
+  count = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+  conn.close()
+  os.replace(tmp, path)
+  return {"count": count, "fts5": fts, "bytes": os.path.getsize(path)}
+
+class QuestionDB:
+  """Read-only filtered and full-text lookups over a write_sqlite() file.
+
+  Filters are keyword arguments over FILTER_COLUMNS; a list or tuple value matches any
+  of its elements. Lookups return the stored items as dicts."""
+
+  def __init__(self, path):
+    if not os.path.exists(path):
+      raise FileNotFoundError(path)
+    self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+    self.fts5 = meta.get("fts5") == "1"
+
+  def close(self):
+    self.conn.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+  @staticmethod
+  def _where(filters, prefix="items."):
+    clauses, params = [], []
+    for column, value in filters.items():
+      if column not in FILTER_COLUMNS:
+        raise ValueError(f"Unknown filter {column!r}; expected one of {', '.join(FILTER_COLUMNS)}")
+      if isinstance(value, bool):
+        value = int(value)
+      if isinstance(value, (list, tuple, set)):
+        value = list(value)
+        clauses.append(f"{prefix}{column} IN ({','.join('?' * len(value))})")
+        params += value
+      elif value is None:
+        clauses.append(f"{prefix}{column} IS NULL")
+      else:
+        clauses.append(f"{prefix}{column} = ?")
+        params.append(value)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+  def find(self, limit=None, offset=0, **filters):
+    where, params = self._where(filters)
+    sql = f"SELECT item FROM items{where} ORDER BY id"
+    if limit is not None:
+      sql += " LIMIT ? OFFSET ?"
+      params += [limit, offset]
+    return [json.loads(item) for item, in self.conn.execute(sql, params)]
+
+  def uids(self, **filters):
+    where, params = self._where(filters)
+    return [uid for uid, in self.conn.execute(f"SELECT uId FROM items{where} ORDER BY id", params)]
+
+  def count(self, **filters):
+    where, params = self._where(filters)
+    return self.conn.execute(f"SELECT COUNT(*) FROM items{where}", params).fetchone()[0]
+
+  def get(self, uid):
+    row = self.conn.execute("SELECT item FROM items WHERE uId = ? ORDER BY id LIMIT 1", (uid,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+  def search(self, query, limit=50, **filters):
+    """Items whose cleaned stem matches an FTS5 query, best bm25 rank first."""
+    if not self.fts5:
+      raise RuntimeError("This database was built without FTS5 support in sqlite3")
+    where, params = self._where(filters)
+    where = where.replace(" WHERE ", " AND ", 1)
+    sql = (f"SELECT items.item FROM stems JOIN items ON items.id = stems.rowid "
+           f"WHERE stems MATCH ?{where} ORDER BY stems.rank LIMIT ?")
+    return [json.loads(item) for item, in self.conn.execute(sql, [query] + params + [limit])]
+
+  def facets(self):
+    """{column: {value: count}} for the indexed columns."""
+    return {column: dict(self.conn.execute(f"SELECT {column}, COUNT(*) FROM items GROUP BY {column} ORDER BY {column}"))
+            for column in INDEXED_COLUMNS}
+
+def main():
+  ap = argparse.ArgumentParser(description="Query a question SQLite export written by prepare_data.py --sqlite")
+  ap.add_argument("db", help="SQLite file")
+  ap.add_argument("--module")
+  ap.add_argument("--domain")
+  ap.add_argument("--skill", dest="skill_cd")
+  ap.add_argument("--difficulty", help="E, M or H (comma-separate several)")
+  ap.add_argument("--type", dest="question_type", choices=("mcq", "numerical"))
+  ap.add_argument("--figures", dest="has_figure", action="store_true", default=None, help="only items with figures")
+  ap.add_argument("--search", metavar="QUERY", help="FTS5 query over the cleaned stem text")
+  ap.add_argument("--limit", type=int, default=20)
+  ap.add_argument("--count", action="store_true", help="print the number of matches only")
+  ap.add_argument("--json", action="store_true", help="print matching items as JSON")
+  args = ap.parse_args()
+
+  filters = {k: v for k, v in vars(args).items()
+             if k in FILTER_COLUMNS and v is not None}
+  filters = {k: (v.split(",") if isinstance(v, str) and "," in v else v) for k, v in filters.items()}
+  with QuestionDB(args.db) as db:
+    t = time.perf_counter()
+    if args.count:
+      result = db.count(**filters) if not args.search else len(db.search(args.search, limit=-1, **filters))
+    elif args.search:
+      result = db.search(args.search, args.limit, **filters)
+    else:
+      result = db.find(args.limit, **filters)
+    ms = (time.perf_counter() - t) * 1000
+  if args.count:
+    print(result)
+  elif args.json:
+    json.dump(result, sys.stdout, indent=2, ensure_ascii=False)
+    print()
+  else:
+    for x in result:
+      print(f"{x['uId']:<38}{x.get('skill_cd') or '-':<8}{x.get('difficulty') or '-':<3}{stem_text(x.get('stem_html'))[:90]}")
+  print(f"({ms:.2f} ms)", file=sys.stderr)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+question_server.py
+------------------
+Asyncio HTTP service over a prepare_data.py build, so clients can ask for the items
+they need instead of downloading every chunk and filtering locally.
+
+Items are loaded once through the build's manifest (pooled passages, split rationales
+and facet codes are resolved) and kept as pre-serialized JSON bytes plus integer
+posting lists per facet value and per stem token. Responses to deterministic URLs are
+gzipped once, given a strong ETag and kept in an LRU cache; If-None-Match revalidation
+returns 304 without touching the items. Connections are kept alive (HTTP/1.1).
+
+Endpoints (all GET/HEAD, JSON):
+  /health                                   item and skill counts
+  /manifest.json                            the build's manifest
+  /facets                                   {facet: {value: count}}
+  /items/<uId>                              one item
+  /skills/<skill_cd>?difficulty=H&page=0&size=50
+  /search?q=triangle area&skill=S.C.&difficulty=H&module=math&domain=...&type=mcq&page=0&size=50
+  /practice/<skill_cd>?size=20&seed=7&set=0 difficulty-balanced set (random seed if none given,
+                                            which only has a set 0), one item per near-duplicate
+                                            cluster; set is capped at MAX_PRACTICE_SET
+
+Usage:
+  python question_server.py ./data --port 8081
+  python question_server.py ./data --port 8081 --reuse-port &   # one process per core
+  python load_test.py http://127.0.0.1:8081 --concurrency 1000 --requests 50000
+"""
+import asyncio, gzip, hashlib, html, json, os, random, re, time, traceback, argparse
+from array import array
+from collections import OrderedDict, defaultdict
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from near_duplicates import load_clusters
+from prepare_data import build_root, load_chunks
+from practice_sets import DEFAULT_SIZE, LEVELS, iter_practice_sets
+
+try:
+  import uvloop
+  UVLOOP_AVAILABLE = True
+except ImportError:
+  UVLOOP_AVAILABLE = False
+
+FACETS = {"module": "module", "domain": "primary_class_cd_desc", "skill": "skill_cd",
+          "difficulty": "difficulty", "type": "question_type"}
+MAX_PAGE_SIZE = 200
+MAX_PRACTICE_SET = 100  # jumping straight to set N replays sets 0..N-1, so keep the walk short
+PRACTICE_CURSORS = 256  # live (skill, seed, size) set streams kept for paging forward
+MAX_HEADER_BYTES = 16 * 1024
+KEEPALIVE_TIMEOUT = 15
+_TOKEN = re.compile(r"[a-z0-9]+")
+_MARKUP = re.compile(r"<(svg|script|style)\b.*?</\1\s*>|<[^>]+>", re.S | re.I)
+STATUS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+          405: "Method Not Allowed", 431: "Request Header Fields Too Large", 500: "Internal Server Error"}
+
+class HTTPError(Exception):
+  def __init__(self, status, message):
+    super().__init__(message)
+    self.status = status
+
+def tokens(stem_html):
+  return set(_TOKEN.findall(html.unescape(_MARKUP.sub(" ", stem_html or "")).lower()))
+
+def intersect(postings):
+  """Indices present in every posting list, in bank order (smallest list drives)."""
+  if not postings:
+    return []
+  postings = sorted(postings, key=len)
+  result = postings[0]
+  for other in postings[1:]:
+    keep = set(other)
+    result = [i for i in result if i in keep]
+    if not result:
+      break
+  return list(result)
+
+def accepts_gzip(accept_encoding):
+  """True if an Accept-Encoding header allows gzip; "gzip;q=0" (or "*;q=0" without an
+  explicit gzip entry) refuses it."""
+  weights = {}
+  for part in accept_encoding.lower().split(","):
+    coding, _, params = part.partition(";")
+    q = 1.0
+    for param in params.split(";"):
+      name, _, value = param.partition("=")
+      if name.strip() == "q":
+        try:
+          q = float(value)
+        except ValueError:
+          q = 0.0
+    weights[coding.strip()] = q
+  return weights.get("gzip", weights.get("x-gzip", weights.get("*", 0.0))) > 0
+
+class Bank:
+  """Items of one build in compact, query-ready form."""
+
+  def __init__(self, out_dir):
+    out_dir = build_root(out_dir)
+    with open(os.path.join(out_dir, "manifest.json"), "rb") as f:
+      self.manifest_bytes = f.read()
+    self.clusters = load_clusters(out_dir, json.loads(self.manifest_bytes))
+    self.bodies = []             # item index -> JSON bytes
+    self.by_uid = {}
+    self.postings = defaultdict(lambda: array("I"))   # (facet, value) -> item indices
+    self.words = defaultdict(lambda: array("I"))      # stem token -> item indices
+    self.levels = defaultdict(lambda: defaultdict(list))  # skill_cd -> {difficulty: [uId]}
+    self.cursors = OrderedDict()  # (skill_cd, seed, size) -> [next set number, set stream]
+    for i, x in enumerate(load_chunks(out_dir)):
+      self.bodies.append(json.dumps(x, ensure_ascii=False, separators=(",",":")).encode("utf-8"))
+      self.by_uid.setdefault(x["uId"], i)
+      for facet, field in FACETS.items():
+        if x.get(field):
+          self.postings[(facet, x[field])].append(i)
+      for token in tokens(x.get("stem_html")):
+        self.words[token].append(i)
+      if x.get("skill_cd"):
+        level = x.get("difficulty") or ""
+        self.levels[x["skill_cd"]][level if level in LEVELS else ""].append(x["uId"])
+    self.facet_counts = {facet: dict(sorted((v, len(p)) for (f, v), p in self.postings.items() if f == facet))
+                         for facet in FACETS}
+
+  def __len__(self):
+    return len(self.bodies)
+
+  def select(self, filters, query=""):
+    postings = []
+    for facet, value in filters.items():
+      postings.append(self.postings.get((facet, value), ()))
+    for token in _TOKEN.findall(query.lower()):
+      postings.append(self.words.get(token, ()))
+    if not postings:
+      return range(len(self.bodies))
+    return intersect(postings)
+
+  def page(self, indices, page, size):
+    start = page * size
+    body = b",".join(self.bodies[i] for i in indices[start:start + size])
+    head = json.dumps({"total": len(indices), "page": page, "size": size}, separators=(",",":"))
+    return head[:-1].encode() + b',"items":[' + body + b"]}"
+
+  def practice(self, skill_cd, seed, n, size, keep_cursor=True):
+    levels = self.levels.get(skill_cd)
+    if not levels:
+      raise HTTPError(404, f"No items for skill {skill_cd}")
+    ids = self._practice_ids(levels, skill_cd, seed, n, size, keep_cursor)
+    body = b",".join(self.bodies[self.by_uid[uid]] for uid in ids)
+    head = json.dumps({"skill_cd": skill_cd, "seed": seed, "set": n, "size": len(ids)}, separators=(",",":"))
+    return head[:-1].encode() + b',"items":[' + body + b"]}"
+
+  def _practice_ids(self, levels, skill_cd, seed, n, size, keep_cursor=True):
+    """Set n of a skill. Each set depends on what the earlier sets of its seed handed
+    out, so it is reached by walking the stream from set 0; the stream is kept per
+    (skill, seed, size) so a client paging through sets 0, 1, 2, ... costs one set
+    selection per request instead of n + 1. One-off random seeds don't keep a cursor."""
+    key = (skill_cd, seed, size)
+    cursor = self.cursors.pop(key, None)
+    if cursor is None or cursor[0] > n:
+      cursor = [0, iter_practice_sets(levels, skill_cd, seed, size, self.clusters)]
+    ids = []
+    while cursor[0] <= n:
+      ids = next(cursor[1], [])
+      cursor[0] += 1
+    if not keep_cursor:
+      return ids
+    self.cursors[key] = cursor
+    if len(self.cursors) > PRACTICE_CURSORS:
+      self.cursors.popitem(last=False)
+    return ids
+
+class Response:
+  __slots__ = ("body", "gzipped", "etag", "cacheable")
+
+  def __init__(self, body, cacheable=True):
+    self.body = body
+    self.cacheable = cacheable
+    # Random practice sets are one-off; a fast level keeps them cheap
+    self.gzipped = gzip.compress(body, 6 if cacheable else 1, mtime=0)
+    self.etag = '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+
+class QuestionServer:
+  def __init__(self, bank, cache_size=4096):
+    self.bank = bank
+    self.cache = OrderedDict()
+    self.cache_size = cache_size
+    self.requests = 0
+
+  def warm(self):
+    """Pre-render the first page of every skill and skill/difficulty listing."""
+    for skill in self.bank.levels:
+      self.respond(f"/skills/{skill}", {})
+      for level in self.bank.levels[skill]:
+        if level:
+          self.respond(f"/skills/{skill}", {"difficulty": [level]})
+
+  @staticmethod
+  def _int(params, name, default, low=0, high=None):
+    try:
+      value = int(params.get(name, [default])[0])
+    except ValueError:
+      raise HTTPError(400, f"{name} must be an integer")
+    return min(max(value, low), high) if high is not None else max(value, low)
+
+  def render(self, path, params):
+    bank = self.bank
+    parts = [unquote(p) for p in path.strip("/").split("/")]
+    if parts == ["health"]:
+      return json.dumps({"items": len(bank), "skills": len(bank.levels)}).encode(), True
+    if parts == ["manifest.json"]:
+      return bank.manifest_bytes, True
+    if parts == ["facets"]:
+      return json.dumps(bank.facet_counts, ensure_ascii=False, separators=(",",":")).encode("utf-8"), True
+    if len(parts) == 2 and parts[0] == "items":
+      i = bank.by_uid.get(parts[1])
+      if i is None:
+        raise HTTPError(404, f"No item {parts[1]}")
+      return bank.bodies[i], True
+    page = self._int(params, "page", 0)
+    size = self._int(params, "size", 50, 1, MAX_PAGE_SIZE)
+    if len(parts) == 2 and parts[0] == "skills":
+      filters = {"skill": parts[1]}
+      if params.get("difficulty"):
+        filters["difficulty"] = params["difficulty"][0]
+      if ("skill", parts[1]) not in bank.postings:
+        raise HTTPError(404, f"No items for skill {parts[1]}")
+      return bank.page(bank.select(filters), page, size), True
+    if parts == ["search"]:
+      filters = {facet: params[facet][0] for facet in FACETS if params.get(facet)}
+      return bank.page(bank.select(filters, params.get("q", [""])[0]), page, size), True
+    if len(parts) == 2 and parts[0] == "practice":
+      seeded = "seed" in params
+      seed = self._int(params, "seed", 0) if seeded else random.randrange(2**31)
+      n = self._int(params, "set", 0, 0, MAX_PRACTICE_SET)
+      if n and not seeded:
+        # Later sets only differ from set 0 in skipping what earlier sets of the same
+        # seed handed out; with a fresh seed there is nothing to skip
+        raise HTTPError(400, "set needs a seed; use the seed returned with set 0")
+      size = self._int(params, "size", DEFAULT_SIZE, 1, MAX_PAGE_SIZE)
+      return bank.practice(parts[1], seed, n, size, keep_cursor=seeded), seeded
+    raise HTTPError(404, f"No route for {path}")
+
+  def respond(self, path, params):
+    key = (path, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+    response = self.cache.get(key)
+    if response is not None:
+      self.cache.move_to_end(key)
+      return response
+    body, cacheable = self.render(path, params)
+    response = Response(body, cacheable)
+    if cacheable:
+      self.cache[key] = response
+      if len(self.cache) > self.cache_size:
+        self.cache.popitem(last=False)
+    return response
+
+  async def handle(self, reader, writer):
+    try:
+      while True:
+        try:
+          head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+          return
+        except asyncio.LimitOverrunError:
+          await self.send_error(writer, HTTPError(431, "Request headers too large"), False)
+          return
+        keep_alive = await self.serve(head, writer)
+        if not keep_alive:
+          return
+    finally:
+      writer.close()
+
+  async def serve(self, head, writer):
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+      method, target, version = lines[0].split(" ", 2)
+    except ValueError:
+      await self.send_error(writer, HTTPError(400, "Malformed request line"), False)
+      return False
+    headers = {}
+    for line in lines[1:]:
+      name, _, value = line.partition(":")
+      headers[name.strip().lower()] = value.strip()
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    self.requests += 1
+    if method not in ("GET", "HEAD"):
+      await self.send_error(writer, HTTPError(405, f"{method} not allowed"), keep_alive)
+      return keep_alive
+    url = urlsplit(target)
+    try:
+      response = self.respond(url.path, parse_qs(url.query))
+    except HTTPError as e:
+      await self.send_error(writer, e, keep_alive)
+      return keep_alive
+    except Exception:
+      traceback.print_exc()
+      await self.send_error(writer, HTTPError(500, "Internal server error"), False)
+      return False
+
+    use_gzip = accepts_gzip(headers.get("accept-encoding", ""))
+    etag = response.etag[:-1] + '-gz"' if use_gzip else response.etag
+    out = ["Content-Type: application/json; charset=utf-8",
+           "Vary: Accept-Encoding",
+           "Access-Control-Allow-Origin: *",
+           f"Cache-Control: {'no-cache' if response.cacheable else 'no-store'}"]
+    if response.cacheable:
+      out.append(f"ETag: {etag}")
+    if response.cacheable and etag in (t.strip() for t in headers.get("if-none-match", "").split(",")):
+      status, body = 304, b""
+    else:
+      status, body = 200, (response.gzipped if use_gzip else response.body)
+      if use_gzip:
+        out.append("Content-Encoding: gzip")
+    out.append(f"Content-Length: {len(body)}")
+    if not keep_alive:
+      out.append("Connection: close")
+    head = "".join(f"{h}\r\n" for h in out)
+    writer.write(f"HTTP/1.1 {status} {STATUS[status]}\r\n{head}\r\n".encode("latin-1") + (body if method == "GET" else b""))
+    await writer.drain()
+    return keep_alive
+
+  async def send_error(self, writer, error, keep_alive):
+    body = json.dumps({"error": str(error)}).encode()
+    close = "" if keep_alive else "Connection: close\r\n"
+    writer.write(f"HTTP/1.1 {error.status} {STATUS[error.status]}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n{close}\r\n".encode("latin-1") + body)
+    try:
+      await writer.drain()
+    except ConnectionError:
+      pass
+
+async def serve_forever(server, host, port, reuse_port=False):
+  srv = await asyncio.start_server(server.handle, host, port, backlog=4096, limit=MAX_HEADER_BYTES,
+                                   reuse_port=reuse_port or None)
+  print(f"Serving {len(server.bank)} items on http://{host}:{port} "
+        f"({'uvloop' if UVLOOP_AVAILABLE else 'asyncio'} event loop, pid {os.getpid()})")
+  async with srv:
+    await srv.serve_forever()
+
+def main():
+  ap = argparse.ArgumentParser(description="Serve a prepare_data.py build through facet, search and practice-set endpoints")
+  ap.add_argument("out", nargs="?", default="./data", help="build dir with manifest.json")
+  ap.add_argument("--host", default="127.0.0.1")
+  ap.add_argument("--port", type=int, default=8081)
+  ap.add_argument("--reuse-port", action="store_true", help="SO_REUSEPORT, so several processes can share the port")
+  ap.add_argument("--cache-size", type=int, default=4096, help="rendered responses kept in memory")
+  args = ap.parse_args()
+
+  t = time.perf_counter()
+  bank = Bank(args.out)
+  server = QuestionServer(bank, args.cache_size)
+  server.warm()
+  print(f"Loaded {len(bank)} items and pre-rendered {len(server.cache)} skill listings in "
+        f"{time.perf_counter() - t:.2f}s")
+  if UVLOOP_AVAILABLE:
+    uvloop.install()
+  try:
+    asyncio.run(serve_forever(server, args.host, args.port, args.reuse_port))
+  except KeyboardInterrupt:
+    print(f"Stopped after {server.requests} requests")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Lesson Manifest Builder for SATify
+Scans lessons/ and content/lessons/ and rewrites lessons/manifest.json with
+content hashes, file sizes and a precomputed skill code -> lesson id index.
+
+Curated fields already in the manifest (titles, skill codes, status, display
+order, ...) are kept; computed fields are refreshed on every run.
+
+Usage:
+    python build_lesson_manifest.py
+    python build_lesson_manifest.py --root .. --output ../lessons/manifest.json
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+LESSON_DIRS = ['lessons', 'content/lessons']
+
+
+def file_hash(data: bytes) -> str:
+    """Short content hash used for cache keys."""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def load_skill_mappings(root: Path) -> Dict[str, Any]:
+    """Load skillMappings from data/skill-practice-config.json (empty if missing)."""
+    config_path = root / 'data' / 'skill-practice-config.json'
+    if not config_path.exists():
+        return {}
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('skillPracticeConfig', {}).get('skillMappings', {})
+
+
+def scan_lessons(directory: Path, root: Path) -> List[Dict[str, Any]]:
+    """Read every lesson JSON directly under directory and describe it."""
+    found = []
+    for path in sorted(directory.glob('*.json')):
+        if path.name == 'manifest.json':
+            continue
+        data = path.read_bytes()
+        try:
+            lesson = json.loads(data)
+        except json.JSONDecodeError as e:
+            print(f"⚠️ Skipping {path.relative_to(root)}: invalid JSON ({e})")
+            continue
+        if not isinstance(lesson, dict) or not lesson.get('slides'):
+            continue
+        found.append({
+            'id': lesson.get('id') or path.stem,
+            'lesson': lesson,
+            'filepath': path.relative_to(root).as_posix(),
+            'hash': file_hash(data),
+            'size': len(data),
+        })
+    return found
+
+
+def describe(found: Dict[str, Any], existing: Optional[Dict[str, Any]],
+             skill_mappings: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge computed fields for one lesson file into its manifest entry."""
+    lesson = found['lesson']
+    if existing:
+        entry = dict(existing)
+    else:
+        skill_codes = lesson.get('skill_codes', [])
+        mapping = skill_mappings.get(skill_codes[0], {}) if skill_codes else {}
+        entry = {
+            'id': found['id'],
+            'title': lesson.get('title', ''),
+            'subtitle': lesson.get('subtitle', ''),
+            'level': lesson.get('level', ''),
+            'duration': lesson.get('duration', ''),
+            'skill_codes': skill_codes,
+            'domain_id': mapping.get('domainId', ''),
+            'domain_title': mapping.get('domainTitle', ''),
+            'skill_title': mapping.get('skillTitle', ''),
+            'status': 'draft',
+            'created_date': date.today().isoformat(),
+        }
+    if existing and existing.get('hash') not in (None, found['hash']):
+        entry['last_modified'] = date.today().isoformat()
+    entry.update({
+        'filepath': found['filepath'],
+        'slide_count': len(lesson.get('slides', [])),
+        'learning_objectives_count': len(lesson.get('learning_objectives', [])),
+        'hash': found['hash'],
+        'size': found['size'],
+    })
+    return entry
+
+
+def build_skill_index(lessons: Dict[str, Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Map each skill code to its lesson ids, in display order."""
+    index: Dict[str, List[str]] = {}
+    ordered = sorted(lessons.values(), key=lambda l: (l.get('display_order', float('inf')), l['id']))
+    for lesson in ordered:
+        for code in lesson.get('skill_codes', []):
+            index.setdefault(code, []).append(lesson['id'])
+    return index
+
+
+def build_manifest(root: Path, manifest_path: Path) -> Dict[str, Any]:
+    """Build the lesson manifest, keeping curated metadata from manifest_path."""
+    manifest: Dict[str, Any] = {}
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    existing = manifest.get('lessons', {})
+    existing_content = manifest.get('content_lessons', {})
+    skill_mappings = load_skill_mappings(root)
+
+    # lessons/ is the published library; content/lessons/ holds the older
+    # copies, which are tracked by path so their ids don't shadow lessons/.
+    lessons: Dict[str, Dict[str, Any]] = {}
+    for found in scan_lessons(root / LESSON_DIRS[0], root):
+        if found['id'] in lessons:
+            print(f"⚠️ Duplicate lesson id {found['id']} in {found['filepath']}")
+            continue
+        lessons[found['id']] = describe(found, existing.get(found['id']), skill_mappings)
+
+    content_lessons: Dict[str, Dict[str, Any]] = {}
+    for found in scan_lessons(root / LESSON_DIRS[1], root):
+        key = Path(found['filepath']).stem
+        content_lessons[key] = describe(found, existing_content.get(key), skill_mappings)
+
+    # Keep manifest ordering stable for curated entries, then append new ones
+    ordered = {k: lessons[k] for k in existing if k in lessons}
+    ordered.update({k: v for k, v in lessons.items() if k not in ordered})
+
+    build_hash = file_hash(''.join(l['hash'] for l in ordered.values()).encode()
+                           + ''.join(l['hash'] for l in content_lessons.values()).encode())
+    if manifest.get('content_hash') != build_hash:
+        manifest['updated'] = date.today().isoformat()
+    manifest.setdefault('version', '2.1')
+    manifest['content_hash'] = build_hash
+    manifest['lessons'] = ordered
+    manifest['content_lessons'] = content_lessons
+    manifest['skill_index'] = build_skill_index(ordered)
+    manifest['stats'] = {
+        'total_lessons': len(ordered),
+        'published_lessons': sum(1 for l in ordered.values() if l.get('status') == 'published'),
+        'draft_lessons': sum(1 for l in ordered.values() if l.get('status') == 'draft'),
+        'domains_covered': len({l.get('domain_id') for l in ordered.values() if l.get('domain_id')}),
+        'skill_codes_covered': list(manifest['skill_index']),
+        'total_bytes': sum(l['size'] for l in ordered.values()),
+    }
+    return manifest
+
+
+def main():
+    """Command-line interface for the manifest builder."""
+    parser = argparse.ArgumentParser(description="Rebuild lessons/manifest.json with hashes and a skill index")
+    parser.add_argument('--root', default=str(REPO_ROOT), help="repository root (default: parent of scripts/)")
+    parser.add_argument('--output', help="manifest path (default: <root>/lessons/manifest.json)")
+    args = parser.parse_args()
+
+    root = Path(args.root).resolve()
+    output = Path(args.output) if args.output else root / 'lessons' / 'manifest.json'
+    if not (root / LESSON_DIRS[0]).exists():
+        print(f"❌ Directory not found: {root / LESSON_DIRS[0]}")
+        sys.exit(1)
+
+    manifest = build_manifest(root, output)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+    print(f"✅ Manifest written: {output}")
+    print(f"   - Lessons: {len(manifest['lessons'])} (+{len(manifest['content_lessons'])} in content/lessons)")
+    print(f"   - Skills indexed: {len(manifest['skill_index'])}")
+    print(f"   - Content hash: {manifest['content_hash']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -258,7 +258,7 @@ class LessonConverter:
 
         return lines
 
-    def _generate_word_content(self, lesson_data: Dict[str, Any], doc: Document):
+    def _generate_word_content(self, lesson_data: Dict[str, Any], doc: "Document"):
         """Generate Word document content from JSON lesson data."""
         # Title
         title = doc.add_heading(lesson_data.get('title', 'Untitled Lesson'), 0)
@@ -304,7 +304,7 @@ class LessonConverter:
         for i, slide in enumerate(lesson_data.get('slides', []), 1):
             self._format_slide_as_word(slide, doc, i)
 
-    def _format_slide_as_word(self, slide: Dict[str, Any], doc: Document, slide_num: int):
+    def _format_slide_as_word(self, slide: Dict[str, Any], doc: "Document", slide_num: int):
         """Format a single slide in Word document."""
         # Slide header
         doc.add_heading(f"Slide {slide_num}: {slide.get('title', 'Untitled')}", level=2)
@@ -667,7 +667,7 @@ class LessonConverter:
 
         return steps
 
-    def _extract_text_from_word(self, doc: Document) -> str:
+    def _extract_text_from_word(self, doc: "Document") -> str:
         """Extract text content from Word document."""
         text_lines = []
 
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Bulk Lesson Validator for SATify
+Checks every lesson JSON file in parallel against a schema built from the slide
+types the lesson player and Creator Studio render (the `switch (slide.type)` cases
+in js/lesson-renderer.js and js/creator-studio.js) and cross-checks skill codes
+against data/skill-practice-config.json and Creator Studio's code table. Results
+are printed as JSON and the exit status is non-zero when any file has errors, so it
+can run in pre-commit.
+
+Three lesson layouts are accepted: lessons/ (skill_codes, slides), Creator Studio
+exports (skill_id, slides) and content/lessons/ (metadata.skillsTargeted,
+content.slides). Editor drafts and raw Word imports (*.docx.json) are skipped when
+scanning directories.
+
+Usage:
+    python validate_lessons.py                       # lessons, content and backups
+    python validate_lessons.py ../lessons/lesson_01.json
+    python validate_lessons.py --format text ../lessons/
+"""
+
+import argparse
+import json
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_PATHS = ['lessons', 'content/lessons', 'backup/lessons', 'backup/creator-studio-lessons',
+                 'lessons_backup_20250918_221929']
+SLIDE_RENDERERS = ['js/lesson-renderer.js', 'js/creator-studio.js']
+SKIPPED_DIRS = {'drafts'}
+SKIPPED_SUFFIXES = ('.docx.json',)
+
+_SLIDE_SWITCH = re.compile(r"switch\s*\(\s*slide\.type\s*\)\s*\{")
+_CASE = re.compile(r"case\s+'([^']+)'\s*:")
+_CODE_TABLE = re.compile(r"skillCodeToDomain\s*=\s*\{([^}]*)\}")
+_CODE_KEY = re.compile(r"'([A-Z]{2,4})'\s*:")
+
+
+def switch_body(source: str, start: int) -> str:
+    """Text of the brace-delimited block whose opening brace ends at start."""
+    depth, i = 1, start
+    while depth and i < len(source):
+        depth += {'{': 1, '}': -1}.get(source[i], 0)
+        i += 1
+    return source[start:i]
+
+
+def renderer_slide_types(root: Path) -> frozenset:
+    """Slide types with their own rendering branch in the lesson player or Creator Studio."""
+    types = set()
+    for rel in SLIDE_RENDERERS:
+        source = (root / rel).read_text(encoding='utf-8')
+        for m in _SLIDE_SWITCH.finditer(source):
+            types.update(_CASE.findall(switch_body(source, m.end())))
+    return frozenset(types)
+
+
+def compile_schema(skill_codes: frozenset, slide_types: frozenset) -> Callable[[Any], Dict[str, List[str]]]:
+    """Build a validator closure; type tables and lookup sets are created once."""
+    lesson_fields = (('id', str), ('title', str))
+    optional_lesson_fields = (('learning_objectives', list), ('success_criteria', dict))
+    slide_fields = (('id', str), ('type', str), ('title', str))
+    # Slides carry either rendered content or an embedded question (mastery checks)
+    content_fields = (('content', dict),)
+    question_fields = (('question', str), ('options', list), ('correct_answer', str))
+
+    def validate(lesson: Any) -> Dict[str, List[str]]:
+        errors: List[str] = []
+        warnings: List[str] = []
+        if not isinstance(lesson, dict):
+            return {'errors': ['lesson must be a JSON object'], 'warnings': []}
+
+        for field, kind in lesson_fields:
+            if field not in lesson:
+                errors.append(f"missing field '{field}'")
+            elif not isinstance(lesson[field], kind):
+                errors.append(f"field '{field}' must be {kind.__name__}")
+        for field, kind in optional_lesson_fields:
+            if field in lesson and not isinstance(lesson[field], kind):
+                errors.append(f"field '{field}' must be {kind.__name__}")
+
+        # Skills: skill_codes, a Creator Studio skill_id slug, or content/lessons metadata
+        codes = lesson.get('skill_codes', (lesson.get('metadata') or {}).get('skillsTargeted'))
+        if codes is None and 'skill_id' not in lesson:
+            errors.append("missing field 'skill_codes'")
+        elif codes is not None and not isinstance(codes, list):
+            errors.append("field 'skill_codes' must be list")
+        elif codes is not None:
+            for code in codes:
+                if code not in skill_codes:
+                    warnings.append(f"unknown skill code '{code}'")
+
+        slides = lesson['slides'] if 'slides' in lesson else (lesson.get('content') or {}).get('slides')
+        if slides is None:
+            errors.append("missing field 'slides'")
+        elif not isinstance(slides, list):
+            errors.append("field 'slides' must be list")
+        else:
+            if not slides:
+                errors.append('lesson has no slides')
+            seen = set()
+            for i, slide in enumerate(slides):
+                where = f"slides[{i}]"
+                if not isinstance(slide, dict):
+                    errors.append(f"{where} must be an object")
+                    continue
+                for field, kind in slide_fields + (question_fields if 'question' in slide else content_fields):
+                    if field not in slide:
+                        errors.append(f"{where} missing field '{field}'")
+                    elif not isinstance(slide[field], kind):
+                        errors.append(f"{where}.{field} must be {kind.__name__}")
+                slide_id = slide.get('id')
+                if slide_id in seen:
+                    errors.append(f"{where} duplicate slide id '{slide_id}'")
+                seen.add(slide_id)
+                if isinstance(slide.get('type'), str) and slide['type'] not in slide_types:
+                    warnings.append(f"{where} unsupported slide type '{slide['type']}'")
+                duration = slide.get('duration_estimate')
+                if duration is not None and (not isinstance(duration, int) or duration < 0):
+                    errors.append(f"{where}.duration_estimate must be a non-negative integer")
+
+        return {'errors': errors, 'warnings': warnings}
+
+    return validate
+
+
+def load_skill_codes(root: Path) -> frozenset:
+    """Skill codes defined in data/skill-practice-config.json, plus the domain-level codes
+    (EOI, SEC, PBC) Creator Studio maps lessons by."""
+    config_path = root / 'data' / 'skill-practice-config.json'
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    codes = set(config.get('skillPracticeConfig', {}).get('skillMappings', {}))
+    table = _CODE_TABLE.search((root / 'js' / 'creator-studio.js').read_text(encoding='utf-8'))
+    if table:
+        codes.update(_CODE_KEY.findall(table.group(1)))
+    return frozenset(codes)
+
+
+def collect_files(paths: List[str], root: Path) -> List[Path]:
+    """Expand files and directories (recursively) into lesson JSON files."""
+    files = []
+    for p in paths:
+        path = Path(p)
+        if not path.is_absolute() and not path.exists():
+            path = root / p
+        if path.is_dir():
+            files.extend(f for f in sorted(path.rglob('*.json'))
+                         if f.name != 'manifest.json' and not f.name.endswith(SKIPPED_SUFFIXES)
+                         and not SKIPPED_DIRS.intersection(f.relative_to(path).parts[:-1]))
+        elif path.exists():
+            files.append(path)
+        else:
+            print(f"⚠️ Not found: {p}", file=sys.stderr)
+    return files
+
+
+def validate_file(path: Path, validate: Callable[[Any], Dict[str, List[str]]]) -> Dict[str, Any]:
+    """Validate one file, reporting JSON syntax errors with their position."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lesson = json.load(f)
+    except json.JSONDecodeError as e:
+        return {'file': str(path), 'errors': [f"invalid JSON at line {e.lineno} column {e.colno}: {e.msg}"],
+                'warnings': []}
+    except OSError as e:
+        return {'file': str(path), 'errors': [f"cannot read file: {e}"], 'warnings': []}
+    result = validate(lesson)
+    return {'file': str(path), **result}
+
+
+def validate_all(files: List[Path], validate: Callable[[Any], Dict[str, List[str]]],
+                 workers: int = 8) -> List[Dict[str, Any]]:
+    """Validate files concurrently, returning results in input order."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda f: validate_file(f, validate), files))
+
+
+def main():
+    """Command-line interface for the bulk validator."""
+    parser = argparse.ArgumentParser(description="Validate SATify lesson JSON files in bulk")
+    parser.add_argument('paths', nargs='*', help="files or directories (default: lessons, content and backups)")
+    parser.add_argument('--root', default=str(REPO_ROOT), help="repository root (default: parent of scripts/)")
+    parser.add_argument('--format', choices=['json', 'text'], default='json')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--strict', action='store_true', help="treat warnings as errors")
+    args = parser.parse_args()
+
+    root = Path(args.root).resolve()
+    validate = compile_schema(load_skill_codes(root), renderer_slide_types(root))
+    files = collect_files(args.paths or DEFAULT_PATHS, root)
+    results = validate_all(files, validate, args.workers)
+
+    failed = [r for r in results if r['errors'] or (args.strict and r['warnings'])]
+    summary = {
+        'files': len(results),
+        'failed': len(failed),
+        'errors': sum(len(r['errors']) for r in results),
+        'warnings': sum(len(r['warnings']) for r in results),
+    }
+
+    if args.format == 'json':
+        json.dump({'summary': summary, 'results': results}, sys.stdout, indent=2)
+        print()
+    else:
+        for r in results:
+            mark = '❌' if r in failed else ('⚠️' if r['warnings'] else '✅')
+            print(f"{mark} {r['file']}")
+            for msg in r['errors']:
+                print(f"    error: {msg}")
+            for msg in r['warnings']:
+                print(f"    warning: {msg}")
+        print()
+        print(f"📊 {summary['files']} files, {summary['failed']} failed, "
+              f"{summary['errors']} errors, {summary['warnings']} warnings")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
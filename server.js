@@ -17,7 +17,18 @@ const PORT = process.env.PORT || 3001;
 
 // Middleware
 app.use(express.json({ limit: '10mb' }));
-app.use(express.static('.'));
+app.use(express.static('.', {
+    setHeaders: (res, filePath) => {
+        // prepare_data.py --versioned: data/versions/ and data/assets/ are content-addressed
+        // and never change; data/current.json, the pointer to the live build, is revalidated
+        const rel = path.relative(path.resolve('.'), filePath).split(path.sep).join('/');
+        if (rel.startsWith('data/versions/') || rel.startsWith('data/assets/')) {
+            res.setHeader('Cache-Control', 'public, max-age=31536000, immutable');
+        } else if (rel === 'data/current.json') {
+            res.setHeader('Cache-Control', 'no-cache');
+        }
+    }
+}));
 
 // Serve the main app on the same server to avoid CORS issues
 app.get('/', (req, res) => {
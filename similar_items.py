@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+similar_items.py
+----------------
+"More like this" neighbors per skill, precomputed at build time, so offering close
+siblings after a missed item is one small fetch instead of a scan of the bank.
+
+Cleaned stems of each skill become TF-IDF vectors in a SciPy CSR matrix: sublinear
+term frequency, smoothed idf, L2-normalized rows, and terms found in over half of a
+skill's stems dropped. Cosine similarity is then a sparse product. Rows are
+multiplied against the skill matrix in blocks, and each block's top k (argpartition)
+is kept, so memory stays at block x skill size. Output is one shard per skill,
+neighbors/<skill>.json: {uId: [[neighbor uId, cosine], ...]}, best first.
+
+Usage:
+  python prepare_data.py --input cb-digital-questions.json --out ./data --neighbors 5
+  python similar_items.py ./data <uId>            # neighbors of one item from a build
+
+  from similar_items import skill_neighbors
+  neighbors = skill_neighbors(items, k=5)        # {uId: [(uId, score), ...]}
+"""
+import json, os, re, sys, time, argparse
+from collections import defaultdict
+
+from practice_sets import skill_dir
+from question_db import stem_text
+
+try:
+  import numpy as np
+  import scipy.sparse as sp
+  SCIPY_AVAILABLE = True
+except ImportError:
+  SCIPY_AVAILABLE = False
+
+DEFAULT_K = 5
+BLOCK_ROWS = 512
+MIN_SCORE = 0.05
+# Terms in more than this share of a skill's stems are dropped: they barely move the
+# ranking but make every row overlap, which turns the sparse product dense
+MAX_DF = 0.5
+_TERM = re.compile(r"[^\W\d_]{2,}|\d+")
+
+def require_scipy():
+  if not SCIPY_AVAILABLE:
+    raise SystemExit("Neighbor lists need NumPy and SciPy: pip install numpy scipy")
+
+def tfidf_matrix(texts, max_df=MAX_DF):
+  """L2-normalized TF-IDF CSR matrix (rows = texts) with 1 + log(tf) weights."""
+  vocab = {}
+  indptr, indices, counts = [0], [], []
+  for text in texts:
+    tf = defaultdict(int)
+    for term in _TERM.findall(text.casefold()):
+      tf[vocab.setdefault(term, len(vocab))] += 1
+    indices += tf.keys()
+    counts += tf.values()
+    indptr.append(len(indices))
+  n = len(texts)
+  X = sp.csr_matrix((np.log(np.asarray(counts, dtype=np.float32)) + 1, np.asarray(indices, dtype=np.int32),
+                     np.asarray(indptr, dtype=np.int64)), shape=(n, max(len(vocab), 1)))
+  df = np.bincount(X.indices, minlength=X.shape[1])
+  idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+  if n >= 10:
+    idf[df > max_df * n] = 0
+  X = X @ sp.diags(idf)
+  X.eliminate_zeros()
+  norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+  norms[norms == 0] = 1
+  return sp.csr_matrix(sp.diags(1 / norms) @ X)
+
+def top_k(X, k, block_rows=BLOCK_ROWS, min_score=MIN_SCORE):
+  """(indices, scores) of each row's k most cosine-similar other rows, best first."""
+  n = X.shape[0]
+  k = min(k, n - 1)
+  XT = X.T.tocsc()
+  all_idx, all_scores = [], []
+  for start in range(0, n, block_rows):
+    stop = min(start + block_rows, n)
+    S = (X[start:stop] @ XT).toarray()
+    S[np.arange(stop - start), np.arange(start, stop)] = -1  # not its own neighbor
+    if k <= 0:
+      all_idx += [[]] * (stop - start)
+      all_scores += [[]] * (stop - start)
+      continue
+    part = np.argpartition(-S, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(S, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    idx = np.take_along_axis(part, order, axis=1)
+    scores = np.take_along_axis(part_scores, order, axis=1)
+    for row_idx, row_scores in zip(idx, scores):
+      keep = row_scores >= min_score
+      all_idx.append(row_idx[keep].tolist())
+      all_scores.append(row_scores[keep].tolist())
+  return all_idx, all_scores
+
+def skill_neighbors(items, k=DEFAULT_K, block_rows=BLOCK_ROWS):
+  """{uId: [(uId, cosine), ...]} within each item's skill (items without a skill are skipped)."""
+  require_scipy()
+  by_skill = defaultdict(list)
+  for x in items:
+    if x.get("skill_cd"):
+      by_skill[x["skill_cd"]].append(x)
+  out = {}
+  for skill_items in by_skill.values():
+    uids = [x["uId"] for x in skill_items]
+    idx, scores = top_k(tfidf_matrix([stem_text(x.get("stem_html")) for x in skill_items]), k, block_rows)
+    for uid, row_idx, row_scores in zip(uids, idx, scores):
+      out[uid] = [(uids[j], s) for j, s in zip(row_idx, row_scores)]
+  return out
+
+def write_neighbors(items, out_dir, k=DEFAULT_K):
+  """Write neighbors/<skill>.json for every skill and return the manifest entry."""
+  neighbors = skill_neighbors(items, k)
+  by_skill = defaultdict(dict)
+  for x in items:
+    if x["uId"] in neighbors:
+      by_skill[x["skill_cd"]][x["uId"]] = [[uid, round(score, 3)] for uid, score in neighbors[x["uId"]]]
+  os.makedirs(os.path.join(out_dir, "neighbors"), exist_ok=True)
+  skills = {}
+  for skill_cd, rows in sorted(by_skill.items()):
+    rel = f"neighbors/{skill_dir(skill_cd)}.json"
+    with open(os.path.join(out_dir, rel), "w", encoding="utf-8") as f:
+      json.dump(rows, f, separators=(",",":"))
+    skills[skill_cd] = {"path": rel, "count": len(rows)}
+  return {"k": k, "skills": skills}
+
+def main():
+  ap = argparse.ArgumentParser(description="Print the precomputed (or freshly computed) neighbors of one item")
+  ap.add_argument("out", help="prepare_data.py build dir")
+  ap.add_argument("uid", help="item uId")
+  ap.add_argument("-k", type=int, default=DEFAULT_K)
+  args = ap.parse_args()
+
+  from prepare_data import build_root, load_chunks
+  items = {x["uId"]: x for x in load_chunks(args.out)}
+  if args.uid not in items:
+    raise SystemExit(f"No item {args.uid} in {args.out}")
+  skill_cd = items[args.uid].get("skill_cd")
+  root = build_root(args.out)
+  with open(os.path.join(root, "manifest.json"), "r", encoding="utf-8") as f:
+    entry = json.load(f).get("neighbors", {}).get("skills", {}).get(skill_cd)
+  t = time.perf_counter()
+  if entry:
+    with open(os.path.join(root, entry["path"]), "r", encoding="utf-8") as f:
+      rows = json.load(f).get(args.uid, [])[:args.k]
+  else:
+    rows = skill_neighbors([x for x in items.values() if x.get("skill_cd") == skill_cd], args.k)[args.uid]
+  print(f"{stem_text(items[args.uid].get('stem_html'))[:100]}")
+  for uid, score in rows:
+    print(f"  {score:.3f}  {uid:<38}{stem_text(items[uid].get('stem_html'))[:70]}")
+  print(f"({'precomputed shard' if entry else 'computed'} in {(time.perf_counter() - t) * 1000:.1f} ms)", file=sys.stderr)
+
+if __name__ == "__main__":
+  main()
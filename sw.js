@@ -21,8 +21,9 @@ const STATIC_ASSETS = [
   'https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js'
 ];
 
-// Data assets to cache on demand
+// Data assets to cache on demand (a --versioned build has only the pointer at the top level)
 const DATA_ASSETS = [
+  '/data/current.json',
   '/data/manifest.json',
   '/data/lookup.json'
 ];
@@ -38,8 +39,9 @@ self.addEventListener('install', (event) => {
       }),
       // Cache data assets
       caches.open(DATA_CACHE_NAME).then((cache) => {
-        return cache.addAll(DATA_ASSETS);
-      })
+        return Promise.all(DATA_ASSETS.map(url => cache.add(url).catch(() => {})));
+      }),
+      precacheFigures()
     ]).then(() => {
       console.log('Service Worker installed successfully');
       // Force activation of new service worker
@@ -79,7 +81,9 @@ self.addEventListener('fetch', (event) => {
   
   // Handle different types of requests
   if (request.method === 'GET') {
-    if (isStaticAsset(request.url)) {
+    if (isFigureAsset(request.url) || isVersionedData(request.url)) {
+      event.respondWith(handleImmutableAsset(request));
+    } else if (isStaticAsset(request.url)) {
       event.respondWith(handleStaticAsset(request));
     } else if (isDataAsset(request.url)) {
       event.respondWith(handleDataAsset(request));
@@ -98,6 +102,45 @@ function isStaticAsset(url) {
          url.includes('jsdelivr');
 }
 
+// Figures extracted by prepare_data.py --extract-assets are named by content hash,
+// so a cached copy never goes stale
+function isFigureAsset(url) {
+  return url.includes('/data/assets/');
+}
+
+// Builds published by prepare_data.py --versioned are never modified; only
+// /data/current.json, which points at the live one, goes through the network
+function isVersionedData(url) {
+  return url.includes('/data/versions/');
+}
+
+async function precacheFigures() {
+  try {
+    const pointer = await fetch('/data/current.json').then(r => r.ok ? r.json() : null, () => null);
+    const response = await fetch(pointer ? `/data/${pointer.manifest}` : '/data/manifest.json');
+    const manifest = await response.json();
+    if (manifest.assets && manifest.assets.files) {
+      const cache = await caches.open(DATA_CACHE_NAME);
+      await cache.addAll(manifest.assets.files.map(path => `/data/${path}`));
+    }
+  } catch (error) {
+    console.log('Figure precache skipped:', error);
+  }
+}
+
+async function handleImmutableAsset(request) {
+  const cachedResponse = await caches.match(request);
+  if (cachedResponse) {
+    return cachedResponse;
+  }
+  const networkResponse = await fetch(request);
+  if (networkResponse && networkResponse.status === 200) {
+    const cache = await caches.open(DATA_CACHE_NAME);
+    cache.put(request, networkResponse.clone());
+  }
+  return networkResponse;
+}
+
 function isDataAsset(url) {
   return url.includes('/data/') && 
          (url.includes('.json') || url.includes('chunks/'));